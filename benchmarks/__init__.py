@@ -0,0 +1,13 @@
+"""
+Benchmarks for the cache cleaner engine.
+
+Builds deterministic synthetic cache trees in a temporary directory and
+times get_dir_size(), clean_directory() and scan_large_files() against
+them, with the cleaner's home directory pointed at the generated tree.
+Runs anywhere Python does, including plain Linux on tmpfs or ext4:
+
+    python -m benchmarks                       # all trees and operations
+    python -m benchmarks --scale 0.2 --repeat 1
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.15
+"""
@@ -0,0 +1,279 @@
+"""
+Benchmark runner: times cleaner operations on generated trees.
+
+Every measurement runs in a fresh child process, so its peak RSS belongs to
+that one operation. Wall time is the best of --repeat runs; syscall counts
+come from one extra run under SyscallCounter, so the counting wrapper
+doesn't slow down the timed runs. Operations that delete get a freshly
+generated tree for every run.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .syscalls import SyscallCounter
+from .trees import TREES, Tree, generate
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if os.fspath(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, os.fspath(REPO_ROOT))
+
+
+class Operation(NamedTuple):
+    """A cleaner call to benchmark, and which trees it runs against"""
+    trees: tuple
+    dry_run: bool = True
+    indexed: bool = False
+    destructive: bool = False
+
+
+def _get_dir_size(cleaner, tree: Tree):
+    cleaner.get_dir_size(tree.root)
+
+
+def _clean_directory(cleaner, tree: Tree):
+    cleaner.clean_directory(tree.root)
+
+
+def _scan_large_files(cleaner, tree: Tree):
+    cleaner.scan_large_files(min_size_mb=100, top=10)
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "get_dir_size": Operation(("npm", "derived_data", "chrome", "media")),
+    "get_dir_size_indexed": Operation(("npm", "derived_data", "chrome", "media"), indexed=True),
+    "clean_dry_run": Operation(("npm", "derived_data", "chrome")),
+    "clean_dry_run_indexed": Operation(("npm", "derived_data", "chrome"), indexed=True),
+    "clean": Operation(("npm", "derived_data", "chrome"), dry_run=False, destructive=True),
+    "scan_large_files": Operation(("media",)),
+}
+
+_CALLS: Dict[str, Callable[[Any, Tree], None]] = {
+    "get_dir_size": _get_dir_size,
+    "get_dir_size_indexed": _get_dir_size,
+    "clean_dry_run": _clean_directory,
+    "clean_dry_run_indexed": _clean_directory,
+    "clean": _clean_directory,
+    "scan_large_files": _scan_large_files,
+}
+
+
+def _peak_rss() -> int:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure(name: str, tree: Tree, home: str, jobs: int, count_syscalls: bool) -> Dict[str, Any]:
+    """Child process body: build a cleaner for home and time one operation"""
+    from cache_cleaner import MacOSCacheCleaner
+
+    operation = OPERATIONS[name]
+    index_path = Path(home).parent / f"{tree.name}-index.sqlite3" if operation.indexed else None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        cleaner = MacOSCacheCleaner(dry_run=operation.dry_run, jobs=jobs, index_path=index_path,
+                                    checkpoint_path=None, home_dir=Path(home))
+        if operation.indexed:
+            # Warm the index; the timed call is the repeat scan it speeds up
+            _CALLS[name](cleaner, tree)
+        counter = SyscallCounter() if count_syscalls else contextlib.nullcontext()
+        with counter:
+            start = time.perf_counter()
+            _CALLS[name](cleaner, tree)
+            wall = time.perf_counter() - start
+        if cleaner.index is not None:
+            cleaner.index.close()
+    result = {"wall": wall, "peak_rss": _peak_rss()}
+    if count_syscalls:
+        result["syscalls"] = counter.total
+        result["syscall_counts"] = dict(sorted(counter.counts.items()))
+    return result
+
+
+class Bench:
+    """Generates trees under a scratch directory and runs operations in child processes"""
+
+    def __init__(self, base: Path, scale: float, seed: int, jobs: int):
+        self.base = base
+        self.scale = scale
+        self.seed = seed
+        self.jobs = jobs
+        self._trees: Dict[str, Tree] = {}
+        self._dirty: set = set()
+        self._context = multiprocessing.get_context('spawn')
+
+    def home(self, tree_name: str) -> Path:
+        return self.base / tree_name / "home"
+
+    def tree(self, tree_name: str, fresh: bool = False) -> Tree:
+        """The generated tree, rebuilt if asked to or if a deleting run has touched it"""
+        if fresh or tree_name in self._dirty or tree_name not in self._trees:
+            shutil.rmtree(self.base / tree_name, ignore_errors=True)
+            self._trees[tree_name] = generate(tree_name, self.home(tree_name), self.scale,
+                                              self.seed)
+            self._dirty.discard(tree_name)
+        return self._trees[tree_name]
+
+    def _run_child(self, name: str, tree: Tree, count_syscalls: bool) -> Dict[str, Any]:
+        operation = OPERATIONS[name]
+        if operation.destructive:
+            # Never let a deleting run loose outside the scratch directory
+            assert os.fspath(tree.root).startswith(os.fspath(self.base) + os.sep)
+            self._dirty.add(tree.name)
+        with self._context.Pool(1) as pool:
+            return pool.apply(_measure, (name, tree, os.fspath(self.home(tree.name)),
+                                         self.jobs, count_syscalls))
+
+    def run(self, name: str, tree_name: str, repeat: int, count_syscalls: bool) -> Dict[str, Any]:
+        walls = []
+        peak = 0
+        for _ in range(repeat):
+            tree = self.tree(tree_name)
+            result = self._run_child(name, tree, False)
+            walls.append(result["wall"])
+            peak = max(peak, result["peak_rss"])
+        tree = self.tree(tree_name)
+        result = {
+            "operation": name,
+            "tree": tree_name,
+            "files": tree.files,
+            "bytes": tree.size,
+            "wall": min(walls),
+            "walls": walls,
+            "files_per_s": tree.files / min(walls) if min(walls) > 0 else 0.0,
+            "peak_rss": peak,
+        }
+        if count_syscalls:
+            counted = self._run_child(name, tree, True)
+            result["syscalls"] = counted["syscalls"]
+            result["syscall_counts"] = counted["syscall_counts"]
+        return result
+
+
+def _key(result: Dict[str, Any]) -> str:
+    return f"{result['operation']}:{result['tree']}"
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(f"{'operation':<24}{'tree':<14}{'files':>9}{'wall s':>10}{'files/s':>12}"
+          f"{'syscalls':>11}{'peak RSS':>11}")
+    for r in results:
+        syscalls = r.get("syscalls", "-")
+        print(f"{r['operation']:<24}{r['tree']:<14}{r['files']:>9}{r['wall']:>10.3f}"
+              f"{r['files_per_s']:>12.0f}{syscalls:>11}{r['peak_rss'] / 2**20:>9.1f}MB")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print each metric against the baseline; returns the number of regressions.
+
+    Wall time and peak RSS regress when they grow by more than threshold.
+    Syscall counts are deterministic for a given scale and seed, so any
+    increase is a regression.
+    """
+    meta = baseline.get("meta", {})
+    previous = baseline.get("results", {})
+    current_meta = results and results[0].get("meta")
+    regressions = 0
+    print(f"\nAgainst baseline (threshold {threshold:.0%}):")
+    if current_meta and any(meta.get(k) != current_meta.get(k) for k in ("scale", "seed")):
+        print(f"  Warning: baseline used scale {meta.get('scale')} seed {meta.get('seed')}, "
+              "so syscall counts aren't comparable")
+    for r in results:
+        base = previous.get(_key(r))
+        if base is None:
+            print(f"  {_key(r):<40} new")
+            continue
+        notes = []
+        wall_ratio = r["wall"] / base["wall"] if base["wall"] else 1.0
+        if wall_ratio > 1 + threshold:
+            notes.append("wall time")
+        rss_ratio = r["peak_rss"] / base["peak_rss"] if base["peak_rss"] else 1.0
+        if rss_ratio > 1 + threshold:
+            notes.append("peak RSS")
+        syscalls = ""
+        if "syscalls" in r and "syscalls" in base:
+            syscalls = f"  syscalls {r['syscalls'] - base['syscalls']:+d}"
+            if r["syscalls"] > base["syscalls"]:
+                notes.append("syscalls")
+        regressions += bool(notes)
+        status = "REGRESSION: " + ", ".join(notes) if notes else "ok"
+        print(f"  {_key(r):<40} wall x{wall_ratio:.2f}  RSS x{rss_ratio:.2f}{syscalls}  {status}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark the cache cleaner on synthetic trees')
+    parser.add_argument('--trees', nargs='+', choices=list(TREES), default=list(TREES),
+                        help='Trees to generate (default: all)')
+    parser.add_argument('--operations', nargs='+', choices=list(OPERATIONS),
+                        default=list(OPERATIONS), help='Operations to time (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplier for the number of files in each tree (default: 1.0)')
+    parser.add_argument('--seed', type=int, default=0, help='Generator seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help='Timed runs per operation; the best is reported (default: 3)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Cleaner walker and unlink threads (default: 1)')
+    parser.add_argument('--dir', type=Path, metavar='DIR',
+                        help='Where to generate the trees, e.g. a tmpfs or ext4 mount '
+                             '(default: the system temp directory)')
+    parser.add_argument('--no-syscalls', action='store_true',
+                        help='Skip the extra run that counts syscalls')
+    parser.add_argument('--save', type=Path, metavar='FILE', help='Write the results as JSON')
+    parser.add_argument('--baseline', type=Path, metavar='FILE',
+                        help='Compare against results saved with --save; exits 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed wall time and RSS growth against the baseline (default: 0.10)')
+    parser.add_argument('--keep', action='store_true', help='Leave the generated trees in place')
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    if args.scale <= 0:
+        parser.error('--scale must be positive')
+
+    base = Path(tempfile.mkdtemp(prefix='cache-cleaner-bench-', dir=args.dir)).resolve()
+    meta = {"scale": args.scale, "seed": args.seed, "jobs": args.jobs,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S')}
+    results = []
+    try:
+        bench = Bench(base, args.scale, args.seed, args.jobs)
+        for tree_name in args.trees:
+            tree = bench.tree(tree_name)
+            print(f"Generated {tree_name}: {tree.files} files, {tree.size / 2**20:.0f} MB "
+                  f"(sparse) in {base / tree_name}", file=sys.stderr)
+            for name in args.operations:
+                if tree_name in OPERATIONS[name].trees:
+                    result = bench.run(name, tree_name, args.repeat, not args.no_syscalls)
+                    result["meta"] = meta
+                    results.append(result)
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+    print_results(results)
+    if args.save:
+        args.save.write_text(json.dumps({
+            "meta": meta,
+            "results": {_key(r): {k: v for k, v in r.items() if k != "meta"} for r in results},
+        }, indent=2) + "\n")
+        print(f"\nSaved results to {args.save}")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print(f"\n{regressions} regression(s)")
+            return 1
+    return 0
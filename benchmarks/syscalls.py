@@ -0,0 +1,120 @@
+"""
+Counting wrapper around the os functions the cleaner makes syscalls through.
+
+Each call of a wrapped function counts as one syscall, and so does the first
+stat() of every DirEntry returned by os.scandir() (later calls are answered
+from the entry's cache). d_type lookups (is_dir, is_file, is_symlink) are
+free on the file systems the cleaner targets and aren't counted.
+"""
+
+import collections
+import os
+import threading
+from typing import Dict
+
+
+class _CountedEntry:
+    """DirEntry stand-in that counts its first stat()"""
+
+    __slots__ = ('_entry', '_counter', '_statted')
+
+    def __init__(self, entry: os.DirEntry, counter: 'SyscallCounter'):
+        self._entry = entry
+        self._counter = counter
+        self._statted = set()
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    @property
+    def path(self) -> str:
+        return self._entry.path
+
+    def inode(self) -> int:
+        return self._entry.inode()
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks not in self._statted:
+            self._statted.add(follow_symlinks)
+            self._counter.add('stat' if follow_symlinks else 'lstat')
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __fspath__(self) -> str:
+        return self._entry.path
+
+
+class _CountedScandir:
+    """Iterator returned by the wrapped os.scandir()"""
+
+    def __init__(self, iterator, counter: 'SyscallCounter'):
+        self._iterator = iterator
+        self._counter = counter
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> _CountedEntry:
+        return _CountedEntry(next(self._iterator), self._counter)
+
+    def close(self):
+        self._iterator.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SyscallCounter:
+    """Context manager that counts calls of CALLS on the os module, per function"""
+
+    CALLS = ('scandir', 'stat', 'lstat', 'fstat', 'open', 'close', 'unlink', 'rmdir',
+             'statvfs', 'listdir')
+
+    def __init__(self):
+        self.counts: Dict[str, int] = collections.Counter()
+        self._lock = threading.Lock()
+        self._saved: Dict[str, object] = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _wrap(self, name: str, func):
+        def counted(*args, **kwargs):
+            self.add(name)
+            return func(*args, **kwargs)
+        return counted
+
+    def __enter__(self) -> 'SyscallCounter':
+        for name in self.CALLS:
+            func = getattr(os, name, None)
+            if func is None:
+                continue
+            self._saved[name] = func
+            if name == 'scandir':
+                scandir = self._wrap(name, func)
+                setattr(os, name, lambda *args: _CountedScandir(scandir(*args), self))
+            else:
+                setattr(os, name, self._wrap(name, func))
+        return self
+
+    def __exit__(self, *exc):
+        for name, func in self._saved.items():
+            setattr(os, name, func)
+        self._saved = {}
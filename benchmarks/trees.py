@@ -0,0 +1,141 @@
+"""
+Deterministic generators for synthetic cache trees.
+
+Every generator lays out a tree under a fake home directory the way the real
+tool does on macOS, seeded so the same scale and seed always give the same
+names, sizes and ages. File contents are sparse (the size comes from
+truncate()), so large trees are cheap to create on tmpfs or ext4 and only
+the metadata the cleaner reads is realistic.
+"""
+
+import hashlib
+import os
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+
+DAY = 24 * 3600
+
+
+class Tree(NamedTuple):
+    """A generated tree: its root and what was written below it"""
+    name: str
+    root: Path
+    files: int
+    size: int
+
+
+class _Writer:
+    """Creates sparse files with ages drawn from one seeded generator"""
+
+    def __init__(self, rng: random.Random, now: float, stale_fraction: float):
+        self.rng = rng
+        self.now = now
+        self.stale_fraction = stale_fraction
+        self.files = 0
+        self.size = 0
+
+    def age(self) -> float:
+        """Seconds since last use: past the 7-day cutoff for stale_fraction of files"""
+        if self.rng.random() < self.stale_fraction:
+            return self.rng.uniform(8, 400) * DAY
+        return self.rng.uniform(0, 6) * DAY
+
+    def write(self, path: Path, size: int, age: Optional[float] = None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        when = self.now - (self.age() if age is None else age)
+        os.utime(path, (when, when))
+        self.files += 1
+        self.size += size
+
+    def small_size(self, median: int) -> int:
+        """Cache entry sizes are roughly log-normal around median"""
+        return max(1, int(self.rng.lognormvariate(0, 1.2) * median))
+
+
+def _digest(rng: random.Random) -> str:
+    return hashlib.sha256(rng.getrandbits(64).to_bytes(8, 'little')).hexdigest()
+
+
+def npm_cacache(home: Path, writer: _Writer, scale: float) -> Path:
+    """~/.npm/_cacache: content addressed by hash, two levels of 256-way fan-out"""
+    root = home / ".npm/_cacache"
+    for _ in range(max(1, int(6000 * scale))):
+        digest = _digest(writer.rng)
+        age = writer.age()
+        writer.write(root / "content-v2/sha512" / digest[:2] / digest[2:4] / digest[4:],
+                     writer.small_size(24 * 1024), age)
+        key = _digest(writer.rng)
+        writer.write(root / "index-v5" / key[:2] / key[2:4] / key[4:], 300, age)
+    return root
+
+
+def derived_data(home: Path, writer: _Writer, scale: float) -> Path:
+    """Xcode DerivedData: a few projects, each nested ten levels deep.
+
+    Ages are drawn per project, so whole project directories are either
+    entirely stale or entirely recent, as they are after switching projects.
+    """
+    root = home / "Library/Developer/Xcode/DerivedData"
+    for p in range(max(1, int(6 * scale))):
+        project = f"App{p}-{_digest(writer.rng)[:28]}"
+        age = writer.age()
+        build = (root / project / "Build/Intermediates.noindex" / f"App{p}.build"
+                 / "Debug-iphonesimulator")
+        for t in range(8):
+            objects = build / f"Target{t}.build/Objects-normal/arm64"
+            for o in range(60):
+                writer.write(objects / f"Source{o}.o", writer.small_size(40 * 1024), age)
+                writer.write(objects / f"Source{o}.d", 2048, age)
+            writer.write(build / f"Target{t}.build/Target{t}.hmap", 16 * 1024, age)
+        records = root / project / "Index.noindex/DataStore/v5/records"
+        for r in range(400):
+            digest = _digest(writer.rng)
+            writer.write(records / digest[:2] / f"{digest[2:16]}.swift-record", 4096, age)
+    return root
+
+
+def chrome_cache(home: Path, writer: _Writer, scale: float) -> Path:
+    """Chrome's disk cache: many small entries in a few very wide directories"""
+    root = home / "Library/Caches/com.google.Chrome"
+    cache_data = root / "Default/Cache/Cache_Data"
+    for i in range(max(1, int(15000 * scale))):
+        writer.write(cache_data / f"f_{i:06x}", writer.small_size(8 * 1024))
+    for i in range(max(1, int(3000 * scale))):
+        digest = _digest(writer.rng)
+        writer.write(root / "Default/Code Cache/js" / f"{digest[:16]}_0",
+                     writer.small_size(16 * 1024))
+    return root
+
+
+def media_files(home: Path, writer: _Writer, scale: float) -> Path:
+    """Large videos and disk images among ordinary documents in ~/Downloads and ~/Movies"""
+    for i in range(max(1, int(40 * scale))):
+        folder = home / ("Movies" if i % 2 else "Downloads")
+        ext = writer.rng.choice(["mov", "mp4", "dmg", "zip"])
+        writer.write(folder / f"media-{i:04d}.{ext}",
+                     int(writer.rng.uniform(20, 2048) * 1024 * 1024))
+    for i in range(max(1, int(2000 * scale))):
+        folder = home / "Documents" / f"Project{i % 40}" / f"Folder{i % 7}"
+        writer.write(folder / f"doc-{i:05d}.pdf", writer.small_size(200 * 1024))
+    return home
+
+
+TREES: Dict[str, Callable[[Path, _Writer, float], Path]] = {
+    "npm": npm_cacache,
+    "derived_data": derived_data,
+    "chrome": chrome_cache,
+    "media": media_files,
+}
+
+
+def generate(name: str, home: Path, scale: float = 1.0, seed: int = 0,
+             stale_fraction: float = 0.6, now: Optional[float] = None) -> Tree:
+    """Write one tree under home and return its root and totals"""
+    # Seeded by name too, so each tree is the same whichever others are generated
+    writer = _Writer(random.Random(f"{name}:{seed}"), now or time.time(), stale_fraction)
+    root = TREES[name](home, writer, scale)
+    return Tree(name, root, writer.files, writer.size)
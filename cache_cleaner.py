@@ -10,55 +10,2109 @@ Version: 1.0.0
 """
 
 import os
+import re
+import json
 import shutil
+import signal
+import socket
+import socketserver
 import sys
 import argparse
+import asyncio
+import contextlib
+import ctypes
+import errno
+import fnmatch
+import functools
+import glob
+import heapq
+import io
 import subprocess
+import multiprocessing
+import queue
+import select
+import sqlite3
+import struct
+from stat import S_ISDIR, S_ISLNK
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO,
+                    Tuple, Union)
 import time
 
+
+class ScanEntry(NamedTuple):
+    """A non-directory entry found during a scan, with its single cached lstat"""
+    path: str
+    name: str
+    is_symlink: bool
+    stat: os.stat_result
+
+
+def scan_directory(path: Union[str, Path]) -> Tuple[List[ScanEntry], List[str]]:
+    """List one directory, returning its files and the paths of its subdirectories.
+
+    File types come from the DirEntry (no extra syscall on APFS, HFS+ or ext4)
+    and every file is lstat'ed exactly once. Symlinks are never followed.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                    files.append(ScanEntry(entry.path, entry.name, entry.is_symlink(),
+                                           entry.stat(follow_symlinks=False)))
+            except OSError:
+                continue
+    return files, subdirs
+
+
+def count_directory(path: Union[str, Path]) -> Tuple[int, List[str]]:
+    """List one directory, returning how many files it has and the paths of its subdirectories.
+
+    Nothing is stat'ed: file types come from the DirEntry alone.
+    """
+    files = 0
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    files += 1
+            except OSError:
+                continue
+    return files, subdirs
+
+
+def scan_tree(root: Union[str, Path]) -> Iterator[ScanEntry]:
+    """Yield every file below root in a single os.scandir pass.
+
+    Unreadable directories are skipped silently, like Path.rglob does.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            files, subdirs = scan_directory(stack.pop())
+        except OSError:
+            continue
+        yield from files
+        stack.extend(subdirs)
+
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+class LinkedFile(NamedTuple):
+    """A hard-linked file, kept apart so its inode can be charged only once"""
+    dev: int
+    ino: int
+    nlink: int
+    size: int
+    mtime: float
+
+
+class SpaceAccounting:
+    """Decides how many bytes a file is worth when sizing or deleting it.
+
+    "apparent" charges st_size for every link, as the cleaner always has.
+    "allocated" charges the blocks actually allocated (st_blocks * 512), so
+    sparse files aren't overstated, and charges a hard-linked inode once,
+    when the last of its links is removed.
+    """
+
+    MODES = ('apparent', 'allocated')
+
+    def __init__(self, mode: str = 'apparent'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown accounting mode: {mode}")
+        self.mode = mode
+        self.allocated = mode == 'allocated'
+
+    def usage(self, st: os.stat_result) -> int:
+        """Bytes a single file occupies"""
+        blocks = getattr(st, 'st_blocks', None)
+        if self.allocated and blocks is not None:
+            return blocks * 512
+        return st.st_size
+
+    def is_linked(self, st: os.stat_result) -> bool:
+        """Whether the file must go through a LinkTally"""
+        return self.allocated and st.st_nlink > 1
+
+    def linked(self, st: os.stat_result) -> LinkedFile:
+        return LinkedFile(st.st_dev, st.st_ino, st.st_nlink, self.usage(st), st.st_mtime)
+
+
+class LinkTally:
+    """Tracks hard-linked inodes by (st_dev, st_ino), packed into a single int.
+
+    size_once() charges an inode the first time any of its links is seen;
+    remove() charges it when as many links have been removed as it had.
+    Files with a single link never need to be tracked.
+    """
+
+    def __init__(self):
+        self._links: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def size_once(self, linked: LinkedFile) -> int:
+        key = linked.dev << 64 | linked.ino
+        with self._lock:
+            if key in self._links:
+                return 0
+            self._links[key] = 1
+        return linked.size
+
+    def remove(self, linked: LinkedFile) -> int:
+        key = linked.dev << 64 | linked.ino
+        with self._lock:
+            removed = self._links.get(key, 0) + 1
+            self._links[key] = removed
+        return linked.size if removed == linked.nlink else 0
+
+
+class DirSummary(NamedTuple):
+    """Aggregate of the files directly inside one directory.
+
+    age_histogram holds (day, bytes) pairs, where day is the file mtime in
+    whole days since the epoch, so it stays valid as the files get older.
+    Hard-linked files are left out of size and age_histogram and listed in
+    linked instead, when the accounting mode de-duplicates them.
+    """
+    path: str
+    size: int
+    files: int
+    newest_mtime: float
+    age_histogram: Tuple[Tuple[int, int], ...]
+    linked: Tuple[LinkedFile, ...] = ()
+
+    @classmethod
+    def from_files(cls, path: str, files: List[ScanEntry],
+                   accounting: Optional[SpaceAccounting] = None) -> 'DirSummary':
+        accounting = accounting or SpaceAccounting()
+        histogram: Dict[int, int] = {}
+        linked = []
+        size = 0
+        newest = 0.0
+        for entry in files:
+            st = entry.stat
+            newest = max(newest, st.st_mtime)
+            if accounting.is_linked(st):
+                linked.append(accounting.linked(st))
+                continue
+            usage = accounting.usage(st)
+            size += usage
+            day = int(st.st_mtime // SECONDS_PER_DAY)
+            histogram[day] = histogram.get(day, 0) + usage
+        return cls(path, size, len(files), newest, tuple(sorted(histogram.items())),
+                   tuple(linked))
+
+    def size_older_than(self, cutoff: float) -> Optional[int]:
+        """Bytes in unlinked files modified before cutoff, or None if the histogram can't tell"""
+        if self.newest_mtime < cutoff:
+            return self.size
+        cutoff_day = int(cutoff // SECONDS_PER_DAY)
+        total = 0
+        for day, size in self.age_histogram:
+            if day > cutoff_day:
+                break
+            if day == cutoff_day:
+                return None
+            total += size
+        return total
+
+
+def summarize_directory(path: str, accounting: Optional[SpaceAccounting] = None
+                        ) -> Tuple[DirSummary, List[str]]:
+    """List one directory and summarize its files"""
+    files, subdirs = scan_directory(path)
+    return DirSummary.from_files(path, files, accounting), subdirs
+
+
+class ScanIndex:
+    """Persistent per-directory scan results, stored in a small SQLite file.
+
+    Each row records a directory's identity (device, inode, mtime), the
+    DirSummary of its files and the names of its subdirectories. A row is
+    reused only when:
+
+    - the directory still has the same device, inode and mtime (adding,
+      removing or renaming an entry changes the mtime),
+    - it was written less than MAX_AGE seconds ago, which bounds how long
+      a file rewritten in place can go unnoticed, and
+    - the file was written with the current SCHEMA_VERSION.
+
+    Rows not refreshed for EXPIRE_AFTER seconds are dropped when the index
+    is opened, and a real clean forgets every row under the cleaned root.
+
+    Below a root an IndexWatcher keeps current (see trust()), rows are
+    reused without any of these checks unless the watcher has reported
+    their directory as changed and not yet summarized it again.
+    """
+
+    SCHEMA_VERSION = 2
+    MAX_AGE = 6 * 3600
+    EXPIRE_AFTER = 30 * SECONDS_PER_DAY
+    _HISTOGRAM = struct.Struct('<iq')
+    _LINKED = struct.Struct('<QQIqd')
+
+    def __init__(self, path: Union[str, Path], rebuild: bool = False,
+                 accounting: Optional[SpaceAccounting] = None):
+        self.path = Path(path)
+        self.accounting = accounting or SpaceAccounting()
+        # Sizes depend on the accounting mode, so each mode keeps its own table
+        self._table = f"dirs_{self.accounting.mode}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(os.fspath(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._rows: Dict[str, tuple] = {}
+        self._pending: List[tuple] = []
+        # Roots whose rows are kept current from file system events, and the
+        # directories below them changed since they were last summarized,
+        # with the time of the change
+        self._trusted: List[str] = []
+        self._changed: Dict[str, float] = {}
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if rebuild or version != self.SCHEMA_VERSION:
+            self._db.execute('DROP TABLE IF EXISTS dirs')
+            for mode in SpaceAccounting.MODES:
+                self._db.execute(f'DROP TABLE IF EXISTS dirs_{mode}')
+        for mode in SpaceAccounting.MODES:
+            self._db.execute(
+                f'CREATE TABLE IF NOT EXISTS dirs_{mode} ('
+                ' path TEXT PRIMARY KEY, dev INTEGER, ino INTEGER, mtime_ns INTEGER,'
+                ' scanned_at REAL, size INTEGER, files INTEGER, newest REAL,'
+                ' histogram BLOB, linked BLOB, subdirs TEXT) WITHOUT ROWID')
+            self._db.execute(f'DELETE FROM dirs_{mode} WHERE scanned_at < ?',
+                             (time.time() - self.EXPIRE_AFTER,))
+        self._db.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        self._db.commit()
+
+    @staticmethod
+    def _subtree_bounds(root: str) -> Tuple[str, str]:
+        # Every path below root sorts between "root/" and "root0" ('0' follows '/')
+        root = root.rstrip(os.sep)
+        return root + os.sep, root + chr(ord(os.sep) + 1)
+
+    def load(self, root: Union[str, Path]):
+        """Read the rows for a subtree into memory ahead of a walk"""
+        root = os.fspath(root)
+        if self.is_trusted(root):
+            return  # already in memory, and newer than what the file holds
+        low, high = self._subtree_bounds(root)
+        with self._lock:
+            cursor = self._db.execute(
+                'SELECT path, dev, ino, mtime_ns, scanned_at, size, files, newest,'
+                f' histogram, linked, subdirs FROM {self._table}'
+                ' WHERE path = ? OR (path > ? AND path < ?)',
+                (root, low, high))
+            for row in cursor:
+                self._rows[row[0]] = row[1:]
+
+    def estimate(self, root: Union[str, Path]) -> Optional[Tuple[int, int]]:
+        """Files and bytes below root as last indexed, or None if it never was.
+
+        Answered with one query, without checking the rows are still current.
+        """
+        root = os.fspath(root)
+        low, high = self._subtree_bounds(root)
+        with self._lock:
+            rows, files, size = self._db.execute(
+                f'SELECT COUNT(*), SUM(files), SUM(size) FROM {self._table}'
+                ' WHERE path = ? OR (path > ? AND path < ?)', (root, low, high)).fetchone()
+        return (files, size) if rows else None
+
+    def cached(self, path: str) -> Optional[Tuple[DirSummary, List[str]]]:
+        """The loaded row for an unchanged directory, at the cost of one lstat, or None"""
+        trusted = self._trusted_row(path)
+        if trusted is not None:
+            return trusted
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return None
+        return self._lookup(path, st)
+
+    def _trusted_row(self, path: str) -> Optional[Tuple[DirSummary, List[str]]]:
+        if not self._trusted or path in self._changed or not self.is_trusted(path):
+            return None
+        row = self._rows.get(path)
+        return self._decode(path, row) if row is not None else None
+
+    def _lookup(self, path: str, st: os.stat_result) -> Optional[Tuple[DirSummary, List[str]]]:
+        row = self._rows.get(path)
+        if row is None or path in self._changed:
+            return None
+        dev, ino, mtime_ns, scanned_at = row[:4]
+        if ((dev, ino, mtime_ns) != (st.st_dev, st.st_ino, st.st_mtime_ns)
+                or time.time() - scanned_at >= self.MAX_AGE):
+            return None
+        return self._decode(path, row)
+
+    def _decode(self, path: str, row: tuple) -> Tuple[DirSummary, List[str]]:
+        size, files, newest, histogram, linked, subdirs = row[4:]
+        pairs = tuple(self._HISTOGRAM.iter_unpack(histogram))
+        links = tuple(LinkedFile(*f) for f in self._LINKED.iter_unpack(linked))
+        names = subdirs.split('\0') if subdirs else []
+        return (DirSummary(path, size, files, newest, pairs, links),
+                [os.path.join(path, name) for name in names])
+
+    def summarize(self, path: str) -> Tuple[DirSummary, List[str]]:
+        """TreeWalker lister: answer from the index if the directory is unchanged"""
+        trusted = self._trusted_row(path)
+        if trusted is not None:
+            return trusted
+        st = os.lstat(path)
+        cached = self._lookup(path, st)
+        if cached is not None:
+            return cached
+        return self._record(path, st)
+
+    def refresh(self, path: str) -> Tuple[DirSummary, List[str]]:
+        """Summarize a directory afresh, whatever the index holds for it.
+
+        The directory counts as changed until flush() installs the new row.
+        """
+        return self._record(path, os.lstat(path))
+
+    def _record(self, path: str, st: os.stat_result) -> Tuple[DirSummary, List[str]]:
+        # Stamped before listing, so of two listings racing a change the later one wins
+        scanned_at = time.time()
+        summary, subdirs = summarize_directory(path, self.accounting)
+        histogram = b''.join(self._HISTOGRAM.pack(day, size)
+                             for day, size in summary.age_histogram)
+        linked = b''.join(self._LINKED.pack(*f) for f in summary.linked)
+        names = '\0'.join(os.path.basename(subdir) for subdir in subdirs)
+        self._pending.append((path, st.st_dev, st.st_ino, st.st_mtime_ns, scanned_at,
+                              summary.size, summary.files, summary.newest_mtime,
+                              histogram, linked, names))
+        return summary, subdirs
+
+    def trust(self, root: Union[str, Path]):
+        """Reuse the rows below root without checking their directories.
+
+        Only for a root whose rows were all just summarized and whose every
+        change is reported through invalidate(), as IndexWatcher does.
+        """
+        root = os.fspath(root)
+        if root not in self._trusted:
+            # Replaced rather than appended to, so lookups never see it change
+            self._trusted = self._trusted + [root]
+
+    def distrust(self, root: Union[str, Path]):
+        """Go back to checking the directories below root"""
+        root = os.fspath(root)
+        self._trusted = [r for r in self._trusted if r != root]
+
+    def is_trusted(self, path: Union[str, Path]) -> bool:
+        path = os.fspath(path)
+        return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+                   for root in self._trusted)
+
+    def invalidate(self, path: str):
+        """Stop reusing path's row until a later summary of it is flushed"""
+        with self._lock:
+            self._changed[path] = time.time()
+
+    def flush(self):
+        """Write the directories summarized since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            # A slow walk mustn't overwrite what a later listing found
+            pending = [row for row in pending
+                       if row[0] not in self._rows or self._rows[row[0]][3] <= row[4]]
+            if pending:
+                self._db.executemany(
+                    f'INSERT OR REPLACE INTO {self._table}'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', pending)
+                self._db.commit()
+                for row in pending:
+                    self._rows[row[0]] = row[1:]
+                    # Changed again while it was being listed: still stale
+                    if row[0] in self._changed and row[4] > self._changed[row[0]]:
+                        del self._changed[row[0]]
+
+    def forget(self, root: Union[str, Path]):
+        """Drop every row for root and the directories below it"""
+        root = os.fspath(root)
+        low, high = self._subtree_bounds(root)
+        with self._lock:
+            for mode in SpaceAccounting.MODES:
+                self._db.execute(f'DELETE FROM dirs_{mode}'
+                                 ' WHERE path = ? OR (path > ? AND path < ?)', (root, low, high))
+            self._db.commit()
+            for path in [p for p in self._rows if p == root or low <= p < high]:
+                del self._rows[path]
+            self._changed = {p: t for p, t in self._changed.items()
+                             if not (p == root or low <= p < high)}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+class CleaningCancelled(Exception):
+    """Raised at a batch boundary once a run has been asked to stop"""
+
+
+class CancelToken:
+    """Cooperative stop flag shared by the walker, the unlink workers and the cleaner.
+
+    Nothing is interrupted mid-operation: loops look at the flag between
+    directories and between deletion batches, and stop picking up new work.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise CleaningCancelled()
+
+
+class TreeWalker:
+    """Walks directory trees on a bounded, reusable pool of threads.
+
+    Directories waiting to be listed sit on one shared LIFO work queue; any
+    idle worker takes the most recently discovered directory, so a deep
+    subtree found by one thread is picked up by the others instead of
+    serializing behind it. With jobs=1 the walk runs on the caller's thread.
+
+    If a cancel token is set, the walk stops taking new directories once it
+    is cancelled and returns what it has summed so far.
+    """
+
+    def __init__(self, jobs: int = 1):
+        self.jobs = max(1, jobs)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Called with (files, bytes) for every directory visited
+        self.on_progress: Optional[Callable[[int, int], None]] = None
+        self.cancel: Optional[CancelToken] = None
+
+    def walk(self, root: Union[str, Path], visit: Callable[[List[ScanEntry], Any], int],
+             descend: Optional[Callable[[str, Any], Any]] = None, context: Any = None,
+             on_done: Optional[Callable[[str, Any], None]] = None) -> int:
+        """Call visit with the files of every directory below root and sum the results.
+
+        Every directory carries a context value, starting with `context` at the
+        root. descend(path, parent_context) returns the context for a
+        subdirectory, or None to skip it; without descend, children simply
+        inherit their parent's context. visit receives (files, context).
+
+        on_done(path, context) is called in post-order, once a directory and
+        every directory walked below it have been visited.
+        """
+        return self._run(os.fspath(root), context, scan_directory, visit, descend, on_done)
+
+    def walk_summaries(self, root: Union[str, Path], visit: Callable[['DirSummary', Any], int],
+                       descend: Optional[Callable[[str, Any], Any]] = None, context: Any = None,
+                       index: Optional['ScanIndex'] = None,
+                       accounting: Optional[SpaceAccounting] = None,
+                       on_done: Optional[Callable[[str, Any], None]] = None) -> int:
+        """Like walk(), but visit receives a DirSummary of each directory's files.
+
+        With an index, directories that haven't changed since they were last
+        summarized are answered from it without listing or stat'ing their files,
+        and the index's accounting mode applies.
+        """
+        if index is None:
+            return self._run(os.fspath(root), context,
+                             lambda path: summarize_directory(path, accounting), visit, descend,
+                             on_done)
+        index.load(root)
+        try:
+            return self._run(os.fspath(root), context, index.summarize, visit, descend, on_done)
+        finally:
+            index.flush()
+
+    def count(self, root: Union[str, Path]) -> int:
+        """Number of files below root, from directory listings alone"""
+        return self._run(os.fspath(root), None, count_directory, lambda files, _: files, None,
+                         progress=False)
+
+    def _run(self, root: str, context: Any, lister, visit, descend, on_done=None,
+             progress: bool = True) -> int:
+        if context is None:
+            context = root
+        if progress and self.on_progress is not None:
+            visit = self._counting(visit, self.on_progress)
+        tracker = _SubtreeTracker(on_done) if on_done is not None else None
+        if self.jobs == 1:
+            total = 0
+            stack = [(root, context, None)]
+            while stack and not (self.cancel is not None and self.cancel.cancelled):
+                path, ctx, parent = stack.pop()
+                try:
+                    listing, subdirs = lister(path)
+                except OSError:
+                    if tracker is not None:
+                        tracker.start(path, ctx, parent, 0)
+                        tracker.finish(path)
+                    continue
+                children = self._children(subdirs, ctx, descend)
+                if tracker is not None:
+                    tracker.start(path, ctx, parent, len(children))
+                stack.extend((child, child_ctx, path) for child, child_ctx in children)
+                try:
+                    total += visit(listing, ctx)
+                except OSError:
+                    pass  # like an unlistable directory, it still finishes
+                if tracker is not None:
+                    tracker.finish(path)
+            return total
+        return self._run_parallel(root, context, lister, visit, descend, tracker)
+
+    @staticmethod
+    def _counting(visit, on_progress):
+        def counted(listing, ctx):
+            if isinstance(listing, DirSummary):
+                on_progress(listing.files, listing.size + sum(f.size for f in listing.linked))
+            else:
+                on_progress(len(listing), sum(f.stat.st_size for f in listing))
+            return visit(listing, ctx)
+        return counted
+
+    @staticmethod
+    def _children(subdirs: List[str], ctx: Any, descend) -> List[Tuple[str, Any]]:
+        if descend is None:
+            return [(subdir, ctx) for subdir in subdirs]
+        children = []
+        for subdir in subdirs:
+            child_ctx = descend(subdir, ctx)
+            if child_ctx is not None:
+                children.append((subdir, child_ctx))
+        return children
+
+    def _run_parallel(self, root: str, context: Any, lister, visit, descend,
+                      tracker: Optional['_SubtreeTracker']) -> int:
+        work = queue.LifoQueue()
+        work.put((root, context, None))
+        totals = []
+        errors = []
+
+        def worker():
+            subtotal = 0
+            while True:
+                item = work.get()
+                if item is None:
+                    break
+                path, ctx, parent = item
+                try:
+                    if self.cancel is not None and self.cancel.cancelled:
+                        continue
+                    try:
+                        listing, subdirs = lister(path)
+                    except OSError:
+                        listing, subdirs = None, []
+                    children = self._children(subdirs, ctx, descend)
+                    if tracker is not None:
+                        tracker.start(path, ctx, parent, len(children))
+                    for child, child_ctx in children:
+                        work.put((child, child_ctx, path))
+                    try:
+                        if listing is not None:
+                            subtotal += visit(listing, ctx)
+                    except OSError:
+                        pass  # as with jobs=1, the directory still finishes
+                    if tracker is not None:
+                        tracker.finish(path)
+                except OSError:
+                    pass
+                except BaseException as e:
+                    errors.append(e)
+                finally:
+                    work.task_done()
+            totals.append(subtotal)
+
+        futures = [self._pool().submit(worker) for _ in range(self.jobs)]
+        work.join()
+        for _ in futures:
+            work.put(None)
+        for future in futures:
+            future.result()
+        if errors:
+            raise errors[0]
+        return sum(totals)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.jobs,
+                                                    thread_name_prefix="cache-walker")
+            return self._executor
+
+    def shutdown(self):
+        """Stop the worker threads; the walker can still be used afterwards"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class _SubtreeTracker:
+    """Counts each directory's unfinished children so subtrees can be reported in post-order"""
+
+    def __init__(self, on_done: Callable[[str, Any], None]):
+        self.on_done = on_done
+        self._pending: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def start(self, path: str, ctx: Any, parent: Optional[str], children: int):
+        # Registered before the children are queued; the extra count is the directory itself
+        with self._lock:
+            self._pending[path] = [children + 1, parent, ctx]
+
+    def finish(self, path: Optional[str]):
+        # A parent is only released once on_done has returned for its child
+        while path is not None:
+            with self._lock:
+                record = self._pending[path]
+                record[0] -= 1
+                if record[0]:
+                    return
+                del self._pending[path]
+            self.on_done(path, record[2])
+            path = record[1]
+
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+_USE_DIR_FD = ({os.open, os.unlink, os.rmdir} <= os.supports_dir_fd
+               and os.scandir in os.supports_fd)
+
+
+class DirectoryCache:
+    """Directory descriptors shared by the unlink workers, each path opened once.
+
+    A directory is opened by name relative to its parent's descriptor,
+    which comes from the cache too, so a batch costs one open() once its
+    parent has been seen, and no symlink is followed on the way down from
+    the nearest anchor (or /). The `limit` most recently used directories
+    stay open. Descriptors are counted while in use; one that is evicted,
+    forgotten or cleared is closed once its last user has released it.
+    """
+
+    def __init__(self, anchors: Iterable[Union[str, Path]] = (), limit: int = 64):
+        # Opened by path in one call: only the system can change their ancestors
+        self.anchors = {os.path.abspath(a) for a in anchors}
+        # Well below the 256 descriptors a macOS process gets by default
+        self.limit = limit
+        self._fds: 'OrderedDict[str, int]' = OrderedDict()
+        self._cached: set = set()
+        self._users: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, path: str, keep: bool = True) -> int:
+        """Open (or reuse) a descriptor for path; hand it back with release().
+
+        Without keep, a directory that isn't cached yet is closed on release
+        rather than cached: right for a batch's own directory, which is
+        rarely needed again, unlike the parents it is opened from.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            fd = self._fds.get(path)
+            if fd is not None:
+                self._fds.move_to_end(path)
+                self._users[fd] += 1
+                return fd
+        parent, name = os.path.split(path)
+        if not name or path in self.anchors:
+            fd = os.open(path, _DIR_FLAGS)
+        else:
+            parent_fd = self.acquire(parent)
+            try:
+                fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+            finally:
+                self.release(parent_fd)
+        with self._lock:
+            cached = self._fds.get(path)
+            if cached is not None:
+                # Another worker opened it in the meantime
+                os.close(fd)
+                self._users[cached] += 1
+                return cached
+            self._users[fd] = 1
+            if keep:
+                if len(self._fds) >= self.limit:
+                    self._uncache(self._fds.popitem(last=False)[1])
+                self._fds[path] = fd
+                self._cached.add(fd)
+        return fd
+
+    def release(self, fd: int):
+        with self._lock:
+            self._users[fd] -= 1
+            self._close_unused(fd)
+
+    def forget(self, path: str, below: bool = False):
+        """Stop handing out path's descriptor (and, with below, its subdirectories')"""
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            paths = ([p for p in self._fds if p == path or p.startswith(prefix)] if below
+                     else [path] if path in self._fds else [])
+            for p in paths:
+                self._uncache(self._fds.pop(p))
+
+    def clear(self):
+        """Forget every directory, so none is held open longer than needed"""
+        self.forget(os.sep, below=True)
+
+    def _uncache(self, fd: int):
+        self._cached.discard(fd)
+        self._close_unused(fd)
+
+    def _close_unused(self, fd: int):
+        if fd not in self._cached and not self._users[fd]:
+            del self._users[fd]
+            os.close(fd)
+
+
+class DeletionPipeline:
+    """Deletes files on a dedicated pool of unlink workers.
+
+    Scanners hand over deletion candidates one directory at a time through a
+    bounded queue, so a fast scan blocks instead of buffering the whole tree.
+    Workers remove entries relative to a descriptor of their directory
+    (os.unlink(name, dir_fd=...), os.rmdir), so paths are not resolved again
+    per file. Descriptors come from a DirectoryCache, which opens each
+    directory once, by name from its parent, so a symlink anywhere below /
+    is never followed; it is cleared whenever the queue drains. Freed bytes,
+    as reported by charge(stat) for each removed file, are totalled per
+    owner until drain() is called.
+
+    Once a cancel token is set, queued batches are dropped unprocessed and
+    whole-tree removals stop at the next directory.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 64,
+                 on_error: Optional[Callable[[str, OSError], None]] = None,
+                 charge: Optional[Callable[[os.stat_result], int]] = None,
+                 anchors: Iterable[Union[str, Path]] = ()):
+        self.workers = max(1, workers)
+        self.on_error = on_error
+        self.charge = charge or (lambda st: st.st_size)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._freed: Dict[Any, int] = {}
+        self._errors: List[BaseException] = []
+        self._dirs = DirectoryCache(anchors)
+        self.cancel: Optional[CancelToken] = None
+
+    def submit_files(self, owner: Any, dirpath: str, files: List[ScanEntry]):
+        """Queue files that all live directly in dirpath"""
+        if files:
+            self._start()
+            self._queue.put((owner, dirpath, files))
+
+    def submit_tree(self, owner: Any, path: str):
+        """Queue a whole directory, which is removed together with everything in it"""
+        self._start()
+        self._queue.put((owner, path, None))
+
+    def remove_empty_dirs(self, paths: Iterable[str]) -> int:
+        """rmdir each path in order (children before parents) and count the removals.
+
+        Directories that turn out not to be empty, or are already gone, are
+        left alone without an error report.
+        """
+        removed = 0
+        for path in paths:
+            if self.cancel is not None and self.cancel.cancelled:
+                break
+            parent, name = os.path.split(path)
+            try:
+                if _USE_DIR_FD:
+                    parent_fd = self._dirs.acquire(parent or os.curdir)
+                    try:
+                        os.rmdir(name, dir_fd=parent_fd)
+                    finally:
+                        self._dirs.release(parent_fd)
+                    self._dirs.forget(path)
+                else:
+                    os.rmdir(path)
+                removed += 1
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST, errno.ENOENT):
+                    self._report(path, e)
+        return removed
+
+    def drain(self) -> Dict[Any, int]:
+        """Wait for all queued deletions and return the bytes freed per owner"""
+        self._queue.join()
+        self._dirs.clear()
+        with self._lock:
+            freed, self._freed = self._freed, {}
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+        return freed
+
+    def close(self):
+        """Stop the workers once the queue is empty"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._dirs.clear()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"cache-unlink-{i}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            owner, path, files = job
+            try:
+                if self.cancel is not None and self.cancel.cancelled:
+                    continue
+                if files is None:
+                    freed = self._remove_tree(path)
+                else:
+                    freed = self._remove_files(path, files)
+                if freed:
+                    with self._lock:
+                        self._freed[owner] = self._freed.get(owner, 0) + freed
+            except BaseException as e:
+                with self._lock:
+                    self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def _report(self, path: str, error: OSError):
+        if self.on_error is not None:
+            self.on_error(path, error)
+
+    def _remove_files(self, dirpath: str, files: List[ScanEntry]) -> int:
+        freed = 0
+        if not _USE_DIR_FD:
+            for entry in files:
+                try:
+                    os.unlink(entry.path)
+                    freed += self.charge(entry.stat)
+                except OSError as e:
+                    self._report(entry.path, e)
+            return freed
+        try:
+            dir_fd = self._dirs.acquire(dirpath, keep=False)
+        except OSError as e:
+            self._report(dirpath, e)
+            return 0
+        try:
+            for entry in files:
+                try:
+                    os.unlink(entry.name, dir_fd=dir_fd)
+                    freed += self.charge(entry.stat)
+                except OSError as e:
+                    self._report(entry.path, e)
+        finally:
+            self._dirs.release(dir_fd)
+        return freed
+
+    def _remove_tree(self, path: str) -> int:
+        if not _USE_DIR_FD:
+            freed = sum(self.charge(entry.stat) for entry in scan_tree(path))
+            try:
+                shutil.rmtree(path)
+            except OSError as e:
+                self._report(path, e)
+                return 0
+            return freed
+        parent, name = os.path.split(path)
+        try:
+            parent_fd = self._dirs.acquire(parent or os.curdir)
+        except OSError as e:
+            self._report(path, e)
+            return 0
+        try:
+            return self._remove_tree_at(parent_fd, name, path)
+        finally:
+            self._dirs.release(parent_fd)
+            self._dirs.forget(path, below=True)
+
+    def _remove_tree_at(self, parent_fd: int, name: str, path: str) -> int:
+        freed = 0
+        try:
+            dir_fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+        except OSError as e:
+            self._report(path, e)
+            return 0
+        try:
+            with os.scandir(dir_fd) as it:
+                entries = list(it)
+            for entry in entries:
+                entry_path = os.path.join(path, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.cancel is not None and self.cancel.cancelled:
+                            continue
+                        freed += self._remove_tree_at(dir_fd, entry.name, entry_path)
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        os.unlink(entry.name, dir_fd=dir_fd)
+                        freed += self.charge(st)
+                except OSError as e:
+                    self._report(entry_path, e)
+        except OSError as e:
+            self._report(path, e)
+        finally:
+            os.close(dir_fd)
+        if self.cancel is not None and self.cancel.cancelled:
+            return freed  # subdirectories may have been left behind
+        try:
+            os.rmdir(name, dir_fd=parent_fd)
+        except OSError as e:
+            self._report(path, e)
+        return freed
+
+
+def default_index_path(home_dir: Optional[Path] = None) -> Path:
+    """Location of the scan index, outside every directory the cleaner touches"""
+    home_dir = home_dir or Path.home()
+    return home_dir / "Library/Application Support/Cache Cleaner/scan_index.sqlite3"
+
+
+def default_checkpoint_path(home_dir: Optional[Path] = None) -> Path:
+    """Location of the checkpoint journal used by --resume, next to the scan index"""
+    return default_index_path(home_dir).with_name("checkpoint.jsonl")
+
+
+class CheckpointJournal:
+    """Append-only record of the roots and subtrees a real run has finished.
+
+    One JSON object per line: a header with the start time, then {"done": path}
+    entries. A stopped or crashed run leaves the journal behind; the next run
+    with resume=True skips everything it lists, as long as the journal is
+    younger than MAX_AGE. A run that completes deletes it.
+    """
+
+    MAX_AGE = 24 * 3600
+
+    def __init__(self, path: Union[str, Path], resume: bool = False):
+        self.path = Path(path)
+        # Only what earlier runs finished is skipped; this run's entries are just recorded
+        self.finished: set = set()
+        self.started = time.time()
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a' if self.finished else 'w', encoding='utf-8')
+        if not self.finished:
+            self._write({"started": self.started})
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break  # a crash can leave the last line cut short
+        if not entries or time.time() - entries[0].get("started", 0) > self.MAX_AGE:
+            return
+        self.started = entries[0]["started"]
+        self.finished = {entry["done"] for entry in entries[1:] if "done" in entry}
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def is_done(self, path: Union[str, Path]) -> bool:
+        return os.fspath(path) in self.finished
+
+    def mark_done(self, *paths: Union[str, Path]):
+        """Record finished roots or subtrees; call only once their deletions have drained"""
+        if not paths:
+            return
+        with self._lock:
+            for path in paths:
+                self._write({"done": os.fspath(path)})
+            self._file.flush()
+
+    def complete(self):
+        """The run finished: nothing is left to resume"""
+        with self._lock:
+            self._file.close()
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def default_plan_path(home_dir: Optional[Path] = None) -> Path:
+    """Where the GUI keeps the plan of its last scan"""
+    return default_index_path(home_dir).with_name("last_scan.plan")
+
+
+class PlanEntry(NamedTuple):
+    """One file, or one whole subtree, that a dry run found to remove"""
+    name: str
+    is_tree: bool
+    category: str
+    dev: int
+    ino: int
+    size: int
+    mtime_ns: int
+
+
+class DeletionPlan:
+    """What a dry run would delete, grouped by parent directory, to be applied later.
+
+    The file format is a magic number, the creation time and the category
+    names, followed by one record per parent directory: its path, then for
+    each entry the name, kind, category index, st_dev, st_ino, size and
+    st_mtime_ns. Applying a plan lstat()s each entry once and skips anything
+    whose device, inode or mtime no longer match, so nothing is re-walked.
+    """
+
+    MAGIC = b'CCPLAN\x00\x01'
+    _HEADER = struct.Struct('<dI')
+    _GROUP = struct.Struct('<II')
+    _ENTRY = struct.Struct('<HBHQQqq')
+
+    def __init__(self):
+        self.created = time.time()
+        self.groups: Dict[str, List[PlanEntry]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.groups.values())
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entries in self.groups.values() for entry in entries)
+
+    def add_files(self, category: str, dirpath: str, files: List[ScanEntry],
+                  sizes: Optional[List[int]] = None):
+        """Record files that all live directly in dirpath, with their charged sizes"""
+        if not files:
+            return
+        if sizes is None:
+            sizes = [f.stat.st_size for f in files]
+        entries = [PlanEntry(f.name, False, category, f.stat.st_dev, f.stat.st_ino, size,
+                             f.stat.st_mtime_ns) for f, size in zip(files, sizes)]
+        with self._lock:
+            self.groups.setdefault(dirpath, []).extend(entries)
+
+    def add_tree(self, category: str, path: str, st: os.stat_result, size: int):
+        """Record a directory that is removed together with everything in it"""
+        parent, name = os.path.split(path)
+        entry = PlanEntry(name, True, category, st.st_dev, st.st_ino, size, st.st_mtime_ns)
+        with self._lock:
+            self.groups.setdefault(parent, []).append(entry)
+
+    def save(self, path: Union[str, Path]):
+        categories = sorted({e.category for entries in self.groups.values() for e in entries})
+        numbers = {category: i for i, category in enumerate(categories)}
+        out = [self.MAGIC, self._HEADER.pack(self.created, len(categories))]
+        for category in categories:
+            name = category.encode('utf-8')
+            out.append(struct.pack('<H', len(name)) + name)
+        for dirpath, entries in self.groups.items():
+            encoded = os.fsencode(dirpath)
+            out.append(self._GROUP.pack(len(encoded), len(entries)) + encoded)
+            for e in entries:
+                name = os.fsencode(e.name)
+                out.append(self._ENTRY.pack(len(name), e.is_tree, numbers[e.category],
+                                            e.dev, e.ino, e.size, e.mtime_ns) + name)
+        Path(path).write_bytes(b''.join(out))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'DeletionPlan':
+        data = Path(path).read_bytes()
+        if not data.startswith(cls.MAGIC):
+            raise ValueError(f"{path} is not a deletion plan")
+        plan = cls()
+        try:
+            offset = len(cls.MAGIC)
+            plan.created, count = cls._HEADER.unpack_from(data, offset)
+            offset += cls._HEADER.size
+            categories = []
+            for _ in range(count):
+                (length,) = struct.unpack_from('<H', data, offset)
+                offset += 2
+                categories.append(data[offset:offset + length].decode('utf-8'))
+                offset += length
+            while offset < len(data):
+                length, count = cls._GROUP.unpack_from(data, offset)
+                offset += cls._GROUP.size
+                dirpath = os.fsdecode(data[offset:offset + length])
+                offset += length
+                entries = plan.groups.setdefault(dirpath, [])
+                for _ in range(count):
+                    length, is_tree, category, dev, ino, size, mtime_ns = \
+                        cls._ENTRY.unpack_from(data, offset)
+                    offset += cls._ENTRY.size
+                    name = os.fsdecode(data[offset:offset + length])
+                    offset += length
+                    entries.append(PlanEntry(name, bool(is_tree), categories[category],
+                                             dev, ino, size, mtime_ns))
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"{path} is truncated or corrupt: {e}") from None
+        return plan
+
+
+class _RootNode:
+    __slots__ = ('children', 'root')
+
+    def __init__(self):
+        self.children: Dict[str, '_RootNode'] = {}
+        self.root: Optional[str] = None
+
+
+class RootPlan:
+    """Assigns every requested cache root to exactly one directory walk.
+
+    Roots are stored in a prefix tree of path components. A root nested inside
+    another requested root is not walked again: the walk of its ancestor
+    visits it once, charges the files below it to it, and records the result
+    so that its own category can still report what it freed.
+
+    When several categories request the same root, the one registered last
+    owns it, so the broad System Caches sweep leaves Safari to Browser Data.
+    """
+
+    def __init__(self):
+        self._tree = _RootNode()
+        self.owners: Dict[str, str] = {}
+        self.results: Dict[str, int] = {}
+
+    def add(self, category: str, roots: Iterable[Union[str, Path]]):
+        """Register the roots a category will clean"""
+        for root in roots:
+            key = os.fspath(root)
+            node = self._tree
+            for part in Path(key).parts:
+                node = node.children.setdefault(part, _RootNode())
+            node.root = key
+            self.owners[key] = category
+
+    def owner(self, root: Union[str, Path]) -> Optional[str]:
+        """Return the category that reports a root, or None if it isn't planned"""
+        return self.owners.get(os.fspath(root))
+
+    def is_walked(self, root: Union[str, Path]) -> bool:
+        """Whether a root has already been visited, on its own or by an ancestor"""
+        return os.fspath(root) in self.results
+
+    def nested_roots(self, root: Union[str, Path]) -> List[str]:
+        """Return the planned roots strictly below root"""
+        node = self._tree
+        for part in Path(root).parts:
+            node = node.children.get(part)
+            if node is None:
+                return []
+        nested = []
+        stack = list(node.children.values())
+        while stack:
+            node = stack.pop()
+            if node.root is not None:
+                nested.append(node.root)
+            stack.extend(node.children.values())
+        return nested
+
+    def descend(self, path: str, owner: str) -> Optional[str]:
+        """TreeWalker hook: charge a subtree to its own root and skip finished ones"""
+        if path in self.owners:
+            return None if path in self.results else path
+        return owner
+
+    def record(self, root: Union[str, Path], freed_by_root: Dict[str, int]):
+        """Store the outcome of walking root, including every root nested in it"""
+        key = os.fspath(root)
+        for nested in self.nested_roots(key):
+            if nested not in self.results:
+                self.results[nested] = freed_by_root.get(nested, 0)
+        self.results[key] = freed_by_root.get(key, 0)
+
+    def take(self, root: Union[str, Path]) -> int:
+        """Return the bytes recorded for a root that was covered by an earlier walk"""
+        return self.results.get(os.fspath(root), 0)
+
+
+def format_size(size_bytes: int) -> str:
+    """Format bytes into human readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} PB"
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as 45s, 3m 20s or 1h 05m"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+class ProgressSnapshot(NamedTuple):
+    """How far a run has got, as passed to MacOSCacheCleaner.report_progress()"""
+    files: int
+    bytes: int
+    total_files: int
+    total_bytes: Optional[int]  # None when some root was estimated without sizes
+    fraction: float
+    eta: Optional[float]  # seconds left, once there is enough to go on
+
+
+class Progress:
+    """Files and bytes processed against a pre-scan estimate, reported at a fixed rate.
+
+    advance() runs on walker threads for every directory; it only adds to the
+    counters unless `interval` seconds have passed since the last report.
+    When a root finishes, the count is raised to at least its estimate, so
+    subtrees removed without being walked and skipped roots still count.
+    The fraction is by bytes when the estimate has them, by files otherwise,
+    and stays below 1 until finish(), since the estimate can be short.
+    """
+
+    def __init__(self, estimates: Dict[str, Tuple[int, Optional[int]]],
+                 report: Callable[[ProgressSnapshot], None], interval: float = 0.25):
+        self.estimates = estimates
+        self.report = report
+        self.interval = interval
+        self.total_files = sum(files for files, _ in estimates.values())
+        self.total_bytes = (None if any(size is None for _, size in estimates.values())
+                            else sum(size for _, size in estimates.values()))
+        self.files = 0
+        self.bytes = 0
+        self._finished_files = 0
+        self._finished_bytes = 0
+        self._started = time.monotonic()
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def advance(self, files: int, nbytes: int):
+        with self._lock:
+            self.files += files
+            self.bytes += nbytes
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+            snapshot = self._snapshot(now)
+        self.report(snapshot)
+
+    def finish_root(self, root: Union[str, Path]):
+        estimate = self.estimates.get(os.fspath(root))
+        if estimate is None:
+            return
+        with self._lock:
+            self._finished_files += estimate[0]
+            self._finished_bytes += estimate[1] or 0
+
+    def finish(self):
+        with self._lock:
+            snapshot = self._snapshot(time.monotonic())._replace(fraction=1.0, eta=0.0)
+        self.report(snapshot)
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            return self._snapshot(time.monotonic())
+
+    def _snapshot(self, now: float) -> ProgressSnapshot:
+        files = max(self.files, self._finished_files)
+        nbytes = max(self.bytes, self._finished_bytes)
+        if self.total_bytes:
+            fraction = nbytes / self.total_bytes
+        elif self.total_files:
+            fraction = files / self.total_files
+        else:
+            fraction = 0.0
+        fraction = min(fraction, 0.99)
+        elapsed = now - self._started
+        eta = elapsed * (1 - fraction) / fraction if fraction >= 0.01 and elapsed >= 1 else None
+        return ProgressSnapshot(files, nbytes, self.total_files, self.total_bytes, fraction, eta)
+
+
+class DiskUsage(NamedTuple):
+    """Space on one mounted volume, from os.statvfs"""
+    mount: str
+    total: int
+    used: int
+    available: int  # free space usable by an unprivileged process
+
+    @property
+    def percent(self) -> int:
+        """Percentage full, rounded up the way df reports it"""
+        usable = self.used + self.available
+        return -(-self.used * 100 // usable) if usable else 0
+
+    def describe(self) -> str:
+        return (f"{self.mount}: {format_size(self.used)} used of {format_size(self.total)} "
+                f"({self.percent}% full) - {format_size(self.available)} available")
+
+
+class DiskMonitor:
+    """In-process disk usage for the volumes cache roots live on.
+
+    Volume lookups are cached per st_dev and statvfs results for `ttl`
+    seconds, so repeated refreshes from the GUI cost a couple of syscalls
+    at most. Pass fresh=True where the number must reflect deletions that
+    just happened.
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._mounts: Dict[int, str] = {}
+        self._usage: Dict[str, Tuple[float, DiskUsage]] = {}
+        self._lock = threading.Lock()
+
+    def mount_for(self, path: Union[str, Path]) -> str:
+        """Mount point of the volume holding `path` (or its nearest existing parent)"""
+        path = os.path.abspath(path)
+        while True:
+            try:
+                dev = os.stat(path).st_dev
+                break
+            except OSError:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    return path
+                path = parent
+        mount = self._mounts.get(dev)
+        if mount is None:
+            mount = os.path.realpath(path)
+            while not os.path.ismount(mount):
+                mount = os.path.dirname(mount)
+            self._mounts[dev] = mount
+        return mount
+
+    def usage(self, path: Union[str, Path] = '/', fresh: bool = False) -> DiskUsage:
+        mount = self.mount_for(path)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._usage.get(mount)
+            if cached is not None and not fresh and now - cached[0] < self.ttl:
+                return cached[1]
+        st = os.statvfs(mount)
+        usage = DiskUsage(mount, st.f_blocks * st.f_frsize,
+                          (st.f_blocks - st.f_bfree) * st.f_frsize, st.f_bavail * st.f_frsize)
+        with self._lock:
+            self._usage[mount] = (now, usage)
+        return usage
+
+    def volumes(self, paths: Iterable[Union[str, Path]], fresh: bool = False) -> Dict[str, DiskUsage]:
+        """Usage of every distinct volume that one of `paths` lives on, keyed by mount point"""
+        result: Dict[str, DiskUsage] = {}
+        for path in paths:
+            mount = self.mount_for(path)
+            if mount not in result:
+                result[mount] = self.usage(mount, fresh)
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            self._usage.clear()
+
+
+class EventStream:
+    """Writes cleaner events as newline-delimited JSON, one compact object per line.
+
+    Lines are buffered and written out at most every `interval` seconds (or
+    when an event asks for a flush), and progress ticks are coalesced to the
+    same rate, so consumers get a steady trickle of small writes no matter
+    how fast the walk runs. A timer writes out lines no later event comes
+    along for, so none wait through a long drain. Safe to call from walker
+    threads.
+    """
+
+    def __init__(self, stream: TextIO, interval: float = 0.25):
+        self.stream = stream
+        self.interval = interval
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._last_tick = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+    def emit(self, event: str, flush: bool = False, **fields):
+        line = json.dumps({"event": event, **fields}, separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+            wait = self.interval - (time.monotonic() - self._last_flush)
+            if flush or wait <= 0:
+                self._write()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def scanned(self, files: int, nbytes: int):
+        """Count scanned files, emitting a progress tick at most once per interval"""
+        with self._lock:
+            self.files_scanned += files
+            self.bytes_scanned += nbytes
+            now = time.monotonic()
+            if now - self._last_tick < self.interval:
+                return
+            self._last_tick = now
+            self._buffer.append(json.dumps(
+                {"event": "progress", "files": self.files_scanned, "bytes": self.bytes_scanned},
+                separators=(',', ':')))
+            self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            self.stream.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+
+class EventLog(io.TextIOBase):
+    """Stand-in for stdout in --json-events mode: each printed line becomes a "log" event"""
+
+    def __init__(self, events: EventStream):
+        self.events = events
+        self._partial = ''
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.events.emit("log", message=line)
+        return len(text)
+
+
+class LaneOutput(io.TextIOBase):
+    """stdout proxy used while categories run concurrently.
+
+    Threads inside capture() have their output held back and written out in
+    one piece when the block ends, so each category's report stays together
+    instead of interleaving line by line with the others. Everything else is
+    passed straight through, one write at a time.
+    """
+
+    def __init__(self, target: TextIO):
+        self.target = target
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            buffer.append(text)
+        else:
+            with self._lock:
+                self.target.write(text)
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            self.target.flush()
+
+    @contextlib.contextmanager
+    def capture(self):
+        self._local.buffer = []
+        try:
+            yield
+        finally:
+            text, self._local.buffer = ''.join(self._local.buffer), None
+            with self._lock:
+                self.target.write(text)
+                self.target.flush()
+
+
+def load_config_file(path: Union[str, Path]) -> Dict[str, Any]:
+    """Read a JSON config file, or a TOML one on Python 3.11 and later"""
+    path = Path(path)
+    if path.suffix.lower() == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(f"Reading {path} needs Python 3.11 or later (tomllib)")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+class _RuleNode:
+    __slots__ = ('children', 'protected')
+
+    def __init__(self):
+        self.children: Dict[str, '_RuleNode'] = {}
+        self.protected = False
+
+
+# Walk state for paths that can no longer reach a protected prefix
+_OUTSIDE_PROTECTED = _RuleNode()
+
+
+class SafetyRules:
+    """Compiled form of the checks behind is_safe_to_delete().
+
+    Protected prefixes live in a trie of lowercased path components, so
+    "/usr" protects /usr/lib but not /usr2. Exclusions are combined into one
+    case-insensitive regex: those without a path separator are matched
+    against single path components, the rest against the whole path.
+
+    During a walk, state_for() checks the walk root once and child_state()
+    checks only what a subdirectory adds to its already-checked parent.
+    """
+
+    PROTECTED = [
+        '/System', '/usr', '/bin', '/sbin', '/etc',
+        '/Applications', '/Library/Frameworks',
+        '/Library/Extensions', '/Library/Preferences',
+    ]
+
+    def __init__(self, protected: Iterable[str] = (), exclude: Iterable[str] = ()):
+        self.protected = list(protected)
+        self.exclude = list(exclude)
+        self._tree = _RuleNode()
+        for prefix in self.protected:
+            node = self._tree
+            for part in Path(prefix).parts:
+                node = node.children.setdefault(part.lower(), _RuleNode())
+            node.protected = True
+        component = [e for e in self.exclude if os.sep not in e]
+        full_path = [e for e in self.exclude if os.sep in e]
+        self._component_match = self._compile(component)
+        self._path_match = self._compile(full_path)
+
+    @staticmethod
+    def _compile(patterns: List[str]):
+        if not patterns:
+            return None
+        return re.compile('|'.join(re.escape(p) for p in patterns), re.IGNORECASE).search
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], protected: Iterable[str] = (),
+                  exclude: Iterable[str] = ()) -> 'SafetyRules':
+        """Extend the given rules with the "protected" and "exclude" lists of a config file"""
+        config = load_config_file(path)
+        return cls(list(protected) + list(config.get('protected', [])),
+                   list(exclude) + list(config.get('exclude', [])))
+
+    def state_for(self, path: Union[str, Path]) -> Optional[_RuleNode]:
+        """Check a path in full; returns its walk state, or None if it must not be touched"""
+        path = os.fspath(path)
+        if self._path_match is not None and self._path_match(path):
+            return None
+        node = self._tree
+        for part in Path(path).parts:
+            if self._component_match is not None and self._component_match(part):
+                return None
+            if node is not _OUTSIDE_PROTECTED:
+                node = node.children.get(part.lower(), _OUTSIDE_PROTECTED)
+                if node.protected:
+                    return None
+        return node
+
+    def child_state(self, state: _RuleNode, path: str) -> Optional[_RuleNode]:
+        """Check a subdirectory whose parent had the given state"""
+        name = os.path.basename(path)
+        if self._component_match is not None and self._component_match(name):
+            return None
+        if self._path_match is not None and self._path_match(path):
+            return None
+        if state is _OUTSIDE_PROTECTED:
+            return state
+        node = state.children.get(name.lower(), _OUTSIDE_PROTECTED)
+        return None if node.protected else node
+
+    def is_safe(self, path: Union[str, Path]) -> bool:
+        return self.state_for(path) is not None
+
+
+def _compile_globs(patterns: Iterable[str]):
+    """One case-insensitive matcher for a list of shell-style file name patterns"""
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns), re.IGNORECASE).match
+
+
+class CleaningPolicy:
+    """Compiled retention rule for the files below one cache root.
+
+    A file is selected for deletion when it passes the glob filters and is
+    older than the age cutoff (by mtime or atime) or larger than the size
+    cap. With a quota, the files that survive are then trimmed least
+    recently used first until what is left fits. A wipe policy selects
+    everything, and a root it applies to is emptied outright.
+    """
+
+    AGE_FIELDS = ('mtime', 'atime')
+
+    def __init__(self, max_age: Optional[float] = 7 * SECONDS_PER_DAY, age_by: str = 'mtime',
+                 max_file_size: Optional[int] = None, quota: Optional[int] = None,
+                 include: Iterable[str] = (), exclude: Iterable[str] = (), wipe: bool = False,
+                 now: Optional[float] = None):
+        if age_by not in self.AGE_FIELDS:
+            raise ValueError(f"age_by must be one of {', '.join(self.AGE_FIELDS)}, not {age_by!r}")
+        self.max_age = max_age
+        self.age_by = age_by
+        self.restart(now)
+        self.max_file_size = max_file_size
+        self.quota = quota
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.wipe = wipe
+        self._age_attr = 'st_' + age_by
+        self._include = _compile_globs(self.include)
+        self._exclude = _compile_globs(self.exclude)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], file_patterns: Iterable[str] = (),
+                  now: Optional[float] = None) -> 'CleaningPolicy':
+        """Build a policy from a config table; sizes are in MB, ages in days.
+
+        include = "file_patterns" stands for the cleaner's built-in patterns.
+        Without max_age_days, a policy with a quota has no age rule and any
+        other policy keeps the 7-day default.
+        """
+        include = data.get('include', ())
+        if include == 'file_patterns':
+            include = file_patterns
+        mb = lambda key: int(data[key] * 1024 * 1024) if key in data else None
+        if 'max_age_days' in data:
+            max_age = data['max_age_days'] * SECONDS_PER_DAY
+        else:
+            max_age = None if 'quota_mb' in data else 7 * SECONDS_PER_DAY
+        return cls(max_age=max_age, age_by=data.get('age_by', 'mtime'),
+                   max_file_size=mb('max_file_mb'), quota=mb('quota_mb'), include=include,
+                   exclude=data.get('exclude', ()), wipe=bool(data.get('wipe', False)), now=now)
+
+    def restart(self, now: Optional[float] = None):
+        """Measure the age cutoff from `now` (default: the current time), for a new run"""
+        self.cutoff = (now or time.time()) - self.max_age if self.max_age is not None else None
+
+    @property
+    def by_mtime_only(self) -> bool:
+        """Whether mtime histograms (as kept by the scan index) are enough to apply it"""
+        return (self.age_by == 'mtime' and self.cutoff is not None and not self.wipe
+                and self.max_file_size is None and self.quota is None
+                and self._include is None and self._exclude is None)
+
+    def matches(self, name: str) -> bool:
+        """Whether a file name passes the include and exclude filters"""
+        if self._include is not None and not self._include(name):
+            return False
+        return self._exclude is None or not self._exclude(name)
+
+    def split(self, files: List[ScanEntry]) -> Tuple[List[ScanEntry], List[ScanEntry]]:
+        """Return (files to delete, files kept) for one directory listing.
+
+        Files excluded by the filters are in neither list: they are never
+        deleted and don't count towards the quota.
+        """
+        selected, kept = [], []
+        for f in files:
+            if not self.matches(f.name):
+                continue
+            if (self.wipe
+                    or (self.cutoff is not None and getattr(f.stat, self._age_attr) < self.cutoff)
+                    or (self.max_file_size is not None and f.stat.st_size > self.max_file_size)):
+                selected.append(f)
+            else:
+                kept.append(f)
+        return selected, kept
+
+
+class LRUQuota:
+    """Streaming least-recently-used selection that keeps a root under a byte quota.
+
+    Files are offered as the walk lists them and kept in a min-heap on atime.
+    Whenever the kept bytes exceed the quota the oldest are evicted, so memory
+    is bounded by the files that fit in the quota rather than by the tree.
+    Every evicted file is one an exact LRU pass would also delete; a file
+    offered after a newer one was evicted may be kept if it still fits.
+    """
+
+    def __init__(self, quota: int):
+        self.quota = quota
+        self.kept = 0
+        self._heap: List[Tuple[float, int, int, Any, ScanEntry]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def offer(self, owner: Any, files: List[ScanEntry],
+              usage: Callable[[os.stat_result], int]) -> List[Tuple[Any, ScanEntry]]:
+        """Keep files, returning (owner, entry) for each file evicted to stay in quota"""
+        evicted = []
+        with self._lock:
+            for f in files:
+                size = usage(f.stat)
+                self._seq += 1
+                heapq.heappush(self._heap, (f.stat.st_atime, self._seq, size, owner, f))
+                self.kept += size
+                while self.kept > self.quota:
+                    _, _, size, old_owner, old = heapq.heappop(self._heap)
+                    self.kept -= size
+                    evicted.append((old_owner, old))
+        return evicted
+
+
+class PolicySet:
+    """Which CleaningPolicy applies to each cache root and to directories below it.
+
+    Roots and subdirectories listed in the config get their own policy, which
+    the walk switches to on entering them. Other roots get the wipe policy if
+    they are named like a temp or log directory, and the default otherwise.
+    """
+
+    WIPE_NAMES = ('tmp', 'Logs', 'CrashReporter')
+
+    def __init__(self, policies: Optional[Dict[str, CleaningPolicy]] = None,
+                 default: Optional[CleaningPolicy] = None):
+        self.policies = {os.path.normpath(path): policy
+                         for path, policy in (policies or {}).items()}
+        self.default = default or CleaningPolicy()
+        self.wipe = CleaningPolicy(max_age=None, wipe=True)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], homes: Iterable[Path],
+                  file_patterns: Iterable[str] = ()) -> 'PolicySet':
+        """Load a [default] table and [[policy]] entries with a "path" each.
+
+        A path starting with "~" applies to that directory in every home.
+        """
+        config = load_config_file(path)
+        now = time.time()
+        homes = list(homes)
+        default = CleaningPolicy.from_dict(config.get('default', {}), file_patterns, now)
+        policies = {}
+        for entry in config.get('policy', []):
+            if 'path' not in entry:
+                raise ValueError(f"{path}: every [[policy]] needs a path")
+            policy = CleaningPolicy.from_dict(entry, file_patterns, now)
+            for root in expand_home_path(entry['path'], homes):
+                policies[os.fspath(root)] = policy
+        return cls(policies, default)
+
+    def restart(self, now: Optional[float] = None):
+        """Measure every policy's age cutoff from `now`, for a new run.
+
+        Cutoffs are fixed when a policy is built, so a cleaner that serves
+        run after run moves them forward before each one.
+        """
+        now = now or time.time()
+        for policy in {self.default, self.wipe, *self.policies.values()}:
+            policy.restart(now)
+
+    def add(self, path: Union[str, Path], policy: CleaningPolicy, replace: bool = True):
+        path = os.path.normpath(os.fspath(path))
+        if replace or path not in self.policies:
+            self.policies[path] = policy
+
+    def for_root(self, root: Union[str, Path]) -> CleaningPolicy:
+        root = os.fspath(root)
+        policy = self.policies.get(root)
+        if policy is not None:
+            return policy
+        return self.wipe if os.path.basename(root) in self.WIPE_NAMES else self.default
+
+    def for_child(self, path: str, inherited: CleaningPolicy) -> CleaningPolicy:
+        """Policy of a subdirectory during a walk: its own, or its parent's"""
+        return self.policies.get(path, inherited) if self.policies else inherited
+
+    def has_rules_below(self, root: Union[str, Path]) -> bool:
+        prefix = os.fspath(root).rstrip(os.sep) + os.sep
+        return any(path.startswith(prefix) for path in self.policies)
+
+
+def outermost_paths(paths: Iterable[Union[str, Path]]) -> List[str]:
+    """The paths that aren't below another one of them, sorted"""
+    outermost: List[str] = []
+    for path in sorted({os.fspath(p) for p in paths}):
+        if not any(path.startswith(o.rstrip(os.sep) + os.sep) for o in outermost):
+            outermost.append(path)
+    return outermost
+
+
+def is_home_path(path: str) -> bool:
+    """Whether a root is written relative to the home directory"""
+    return path == '~' or path.startswith('~/')
+
+
+def expand_home_path(path: str, homes: Iterable[Path]) -> List[Path]:
+    """A "~" or "~/..." path once for each home; any other path as is.
+
+    Symlinks are resolved (/tmp is /private/tmp on macOS), so walks and
+    deletions can refuse every symlink below the root.
+    """
+    if is_home_path(path):
+        return [Path(os.path.realpath(home / path[2:])) for home in homes]
+    return [Path(os.path.realpath(path))]
+
+
+def is_inside_home(path: Path, home: Path) -> bool:
+    """Whether a resolved root lies in `home` and belongs to the home's owner.
+
+    A user can point ~/.cache anywhere, so a root cleaning someone else's
+    home only follows it if it stays there. A root that doesn't exist yet
+    passes; it is opened later without following symlinks, so one planted
+    in its place after this check is refused then.
+    """
+    real_home = os.path.realpath(home)
+    if os.path.commonpath([os.fspath(path), real_home]) != real_home:
+        return False
+    try:
+        return os.lstat(path).st_uid == os.stat(real_home).st_uid
+    except FileNotFoundError:
+        return True
+
+
+def expand_homes(patterns: Iterable[Union[str, Path]]) -> List[Path]:
+    """Home directories from paths and glob patterns such as /Users/*"""
+    homes = []
+    for pattern in patterns:
+        pattern = os.fspath(pattern)
+        if glob.has_magic(pattern):
+            homes.extend(Path(p) for p in sorted(glob.glob(pattern)) if os.path.isdir(p))
+        else:
+            homes.append(Path(pattern))
+    return homes
+
+
+class RootRegistry:
+    """The cache roots of each cleaning category, for one or more home directories.
+
+    Roots are written as "~/..." for per-user directories, which expand once
+    per home, or as absolute paths, which are cleaned once however many homes
+    there are. Categories are cleaned in the order they are listed.
+
+    A confined registry drops "~/..." roots that resolve outside their home
+    or are owned by another user (see is_inside_home()), for runs that
+    clean homes other than the invoking user's.
+    """
+
+    DEFAULTS: Dict[str, List[str]] = {
+        "System Caches": [
+            "~/Library/Caches",
+            "~/Library/Caches/com.apple.Safari",
+            "~/Library/Caches/com.google.Chrome",
+            "~/Library/Caches/org.mozilla.firefox",
+            "~/Library/Caches/com.microsoft.edgemac",
+            "~/Library/Caches/pip",
+            "~/Library/Caches/com.docker.docker",
+            "~/Library/Caches/com.apple.akd",
+            "~/Library/Caches/com.apple.bird",
+            "~/Library/Caches/CloudKit",
+            "~/Library/Caches/com.apple.iTunes",
+            "~/Library/Caches/com.apple.Music",
+        ],
+        "Browser Data": [
+            "~/Library/Caches/com.apple.Safari",
+            "~/Library/Caches/com.google.Chrome",
+        ],
+        "Temporary Files": ["/tmp", "/var/tmp"],
+        "Development Caches": [
+            "~/.npm/_cacache",
+            "~/.yarn/cache",
+            "~/Library/Caches/pip",
+            "~/.cache",
+            "~/Library/Developer/Xcode/DerivedData",
+        ],
+        "Log Files": ["~/Library/Logs", "/var/log"],
+    }
+
+    # Searched by scan_large_files(), never cleaned
+    LARGE_FILE_DIRS = ["~/Downloads", "~/Desktop", "~/Documents", "~/Movies"]
+
+    def __init__(self, homes: Optional[Iterable[Union[str, Path]]] = None,
+                 categories: Optional[Dict[str, List[str]]] = None,
+                 large_file_dirs: Optional[List[str]] = None, confined: bool = False):
+        homes = [Path(home) for home in homes] if homes is not None else [Path.home()]
+        if not homes:
+            raise ValueError("at least one home directory is needed")
+        self.homes = homes
+        self.categories = {category: list(roots)
+                           for category, roots in (self.DEFAULTS if categories is None
+                                                   else categories).items()}
+        self.large_file_dirs = list(self.LARGE_FILE_DIRS if large_file_dirs is None
+                                    else large_file_dirs)
+        self.confined = confined
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path],
+                  homes: Optional[Iterable[Union[str, Path]]] = None) -> 'RootRegistry':
+        """Load "homes" (globs allowed), a "roots" table and "large_file_dirs".
+
+        Each category listed under roots replaces that category's default
+        roots (an empty list turns it off); new names add categories. Homes
+        passed in take precedence over the file's.
+        """
+        config = load_config_file(path)
+        categories = dict(cls.DEFAULTS)
+        for category, roots in config.get('roots', {}).items():
+            if not isinstance(roots, list):
+                raise ValueError(f"{path}: roots.{category} must be a list of paths")
+            categories[category] = roots
+        if homes is None and 'homes' in config:
+            homes = expand_homes(config['homes'])
+        return cls(homes, categories, config.get('large_file_dirs'))
+
+    def expand(self, roots: Iterable[str]) -> List[Path]:
+        return [path for root in roots for path in expand_home_path(root, self.homes)
+                if not (self.confined and is_home_path(root)) or self._in_a_home(path)]
+
+    def _in_a_home(self, path: Path) -> bool:
+        return any(is_inside_home(path, home) for home in self.homes)
+
+    def escaped_roots(self) -> List[Path]:
+        """The "~/..." roots a confined registry drops, for reporting"""
+        if not self.confined:
+            return []
+        roots = {root for roots in self.categories.values() for root in roots}
+        roots.update(self.large_file_dirs)
+        return [path for root in sorted(roots) if is_home_path(root)
+                for path in expand_home_path(root, self.homes) if not self._in_a_home(path)]
+
+    def roots(self, category: str) -> List[Path]:
+        return self.expand(self.categories.get(category, []))
+
+    def category_roots(self) -> Dict[str, List[Path]]:
+        return {category: self.expand(roots) for category, roots in self.categories.items()}
+
+    def large_file_roots(self) -> List[Path]:
+        return self.expand(self.large_file_dirs)
+
+    def anchors(self) -> List[Path]:
+        """Directories deletions may open by path, then descend from one name at a time.
+
+        Each home and absolute root, whose ancestors only the system can
+        change, and unless confined every other root too: only the user it
+        cleans for could swap one of their ancestors for a symlink.
+        """
+        roots = [r for roots in self.categories.values() for r in roots
+                 if not (self.confined and is_home_path(r))]
+        return [Path(os.path.realpath(home)) for home in self.homes] + self.expand(roots)
+
+    def shared(self) -> 'RootRegistry':
+        """Only the absolute roots, which are the same whichever home is cleaned"""
+        categories = {category: [r for r in roots if not is_home_path(r)]
+                      for category, roots in self.categories.items()}
+        return RootRegistry(self.homes, {c: r for c, r in categories.items() if r},
+                            [d for d in self.large_file_dirs if not is_home_path(d)])
+
+    def for_home(self, home: Union[str, Path]) -> 'RootRegistry':
+        """Only the "~/..." roots, expanded for the one home and confined to it"""
+        categories = {category: [r for r in roots if is_home_path(r)]
+                      for category, roots in self.categories.items()}
+        return RootRegistry([home], {c: r for c, r in categories.items() if r},
+                            [d for d in self.large_file_dirs if is_home_path(d)],
+                            confined=True)
+
+
 class MacOSCacheCleaner:
-    def __init__(self, dry_run: bool = False, verbose: bool = False):
+    # Finished subtrees at most this many levels below a root are journaled for --resume,
+    # at most once per CHECKPOINT_INTERVAL seconds
+    CHECKPOINT_DEPTH = 2
+    CHECKPOINT_INTERVAL = 2.0
+    
+    # Run one after the other by run_maintenance_scripts(), with what to report on success
+    MAINTENANCE_COMMANDS = [
+        (['sudo', 'periodic', 'daily'], "Daily maintenance completed"),
+        (['sudo', 'update_dyld_shared_cache', '-force'], "Dynamic linker cache rebuilt"),
+    ]
+
+    def __init__(self, dry_run: bool = False, verbose: bool = False, jobs: int = 1,
+                 index_path: Optional[Path] = None, rebuild_index: bool = False,
+                 accounting: str = 'apparent', rules_path: Optional[Path] = None,
+                 events: Optional[EventStream] = None, parallel_categories: int = 1,
+                 category_jobs: Optional[Dict[str, int]] = None,
+                 checkpoint_path: Optional[Path] = None, resume: bool = False,
+                 policy_path: Optional[Path] = None, max_cache_size: Optional[int] = None,
+                 home_dir: Optional[Path] = None, roots: Optional[RootRegistry] = None):
         self.dry_run = dry_run
         self.verbose = verbose
+        self.events = events
+        self.jobs = jobs
+        self.parallel_categories = max(1, parallel_categories)
+        self.category_jobs = dict(category_jobs or {})
         self.total_freed = 0
-        self.home_dir = Path.home()
-        
-        # Cache directories to clean
-        self.cache_dirs = [
-            # User-specific caches
-            self.home_dir / "Library/Caches",
-            self.home_dir / "Library/Logs",
-            self.home_dir / "Library/Application Support/CrashReporter",
-            self.home_dir / "Library/Containers",
-            
-            # System temp directories
-            Path("/tmp"),
-            Path("/var/tmp"),
-            Path("/var/folders"),
-            
-            # Browser caches
-            self.home_dir / "Library/Caches/com.apple.Safari",
-            self.home_dir / "Library/Caches/com.google.Chrome",
-            self.home_dir / "Library/Caches/org.mozilla.firefox",
-            self.home_dir / "Library/Caches/com.microsoft.edgemac",
-            
-            # Development caches
-            self.home_dir / ".npm/_cacache",
-            self.home_dir / ".yarn/cache",
-            self.home_dir / "Library/Caches/pip",
-            self.home_dir / ".cache",
-            self.home_dir / "Library/Caches/com.docker.docker",
-            self.home_dir / "Library/Developer/Xcode/DerivedData",
-            
-            # macOS specific
-            self.home_dir / "Library/Caches/com.apple.akd",
-            self.home_dir / "Library/Caches/com.apple.bird",
-            self.home_dir / "Library/Caches/CloudKit",
-            self.home_dir / "Library/Caches/com.apple.iTunes",
-            self.home_dir / "Library/Caches/com.apple.Music",
-        ]
+        self.category_freed: Dict[str, int] = {}
+        # Per-thread state while categories run concurrently (see clean_concurrently)
+        self._lane = threading.local()
+        self._totals_lock = threading.Lock()
+        self.cancel_token = CancelToken()
+        self.disk = DiskMonitor()
+        # Measured change in free space per category and volume (real runs only)
+        self.disk_freed: Dict[str, Dict[str, int]] = {}
+        # Off when other processes delete from the same volumes at the same time
+        self.measure_deltas = True
+        # Whether run() estimates the work first and reports progress against it
+        self.estimate_progress = events is not None
+        self.progress: Optional[Progress] = None
+        # What to clean, and for which homes; home_dir alone means just that home
+        self.roots = roots or RootRegistry([home_dir] if home_dir is not None else None)
+        self.accounting = SpaceAccounting(accounting)
+        self.removed_links = LinkTally()
+        self._walker, self._deleter = self._workers(jobs)
+        self.root_plan: Optional[RootPlan] = None
+        # Set to a DeletionPlan to record what a dry run would delete
+        self.deletion_plan: Optional[DeletionPlan] = None
+        self.index: Optional[ScanIndex] = None
+        if index_path is not None:
+            try:
+                self.index = ScanIndex(index_path, rebuild=rebuild_index,
+                                       accounting=self.accounting)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Warning: Scan index unavailable ({e}), scanning without it")
+        # Only real runs change anything worth resuming
+        self.checkpoint_path = checkpoint_path
+        self.journal: Optional[CheckpointJournal] = None
+        self._open_journal(resume)
         
         # Files/patterns to specifically target
         self.file_patterns = [
@@ -71,187 +2125,740 @@ class MacOSCacheCleaner:
             "Thumbs.db",
         ]
         
+        # Retention rules per root; the built-in ones wipe temp and log
+        # directories and remove other cache files after 7 days
+        self.policies = (PolicySet.from_file(policy_path, self.roots.homes, self.file_patterns)
+                         if policy_path is not None else PolicySet())
+        if max_cache_size is not None:
+            self.limit_cache_size(max_cache_size)
+        
         # Directories to exclude from cleaning
         self.exclude_dirs = {
             "com.apple.akd",  # Keep some essential system caches
             "com.apple.LaunchServices",
             "com.apple.spotlight",
         }
+        
+        # Compiled from exclude_dirs and the optional rules file on first use
+        self.rules_path = rules_path
+        self._rules: Optional[SafetyRules] = None
+        self._rules_excludes: frozenset = frozenset()
+        self.safety_rules()
+
+    def _open_journal(self, resume: bool):
+        if self.checkpoint_path is None or self.dry_run:
+            return
+        try:
+            self.journal = CheckpointJournal(self.checkpoint_path, resume=resume)
+        except OSError as e:
+            print(f"Warning: Checkpoint journal unavailable ({e}), --resume will not work")
+
+    def start_run(self, dry_run: bool, verbose: bool = False, resume: bool = False,
+                  events: Optional[EventStream] = None):
+        """Reset the totals and per-run state so one cleaner can serve run after run.
+
+        The scan index with the rows it has loaded, the walker and unlink
+        threads and the compiled rules and policies are kept; the policies'
+        age cutoffs are measured from now.
+        """
+        self.policies.restart()
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.events = events
+        self.estimate_progress = events is not None
+        self.progress = None
+        self.total_freed = 0
+        self.category_freed = {}
+        self.disk_freed = {}
+        self.removed_links = LinkTally()
+        self.deletion_plan = None
+        self.cancel_token = CancelToken()
+        self._walker.cancel = self._deleter.cancel = self.cancel_token
+        self._walker.on_progress = self.scanned if events is not None else None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self._open_journal(resume)
+
+    def _workers(self, jobs: int) -> Tuple[TreeWalker, DeletionPipeline]:
+        walker = TreeWalker(jobs)
+        if self.events is not None or self.progress is not None:
+            walker.on_progress = self.scanned
+        deleter = DeletionPipeline(workers=jobs, on_error=self._report_delete_error,
+                                   charge=self.charge_removal, anchors=self.roots.anchors())
+        walker.cancel = deleter.cancel = self.cancel_token
+        return walker, deleter
+
+    @property
+    def home_dir(self) -> Path:
+        """The first home; its Trash is the one empty_trash() empties.
+
+        Read-only: the policies and quota roots are expanded for the homes
+        when the cleaner is built, so pass home_dir or roots to the
+        constructor instead.
+        """
+        return self.roots.homes[0]
+
+    @property
+    def cache_dirs(self) -> List[Path]:
+        """Every root of every category, each listed once"""
+        return list(dict.fromkeys(root for roots in self.category_roots().values()
+                                  for root in roots))
+
+    def cancel(self):
+        """Ask a running clean to stop at the next batch boundary; safe from any thread"""
+        self.cancel_token.cancel()
+
+    @property
+    def walker(self) -> TreeWalker:
+        """Directory walker of the category running on this thread"""
+        return getattr(self._lane, 'walker', None) or self._walker
+
+    @property
+    def deleter(self) -> DeletionPipeline:
+        """Deletion pipeline of the category running on this thread"""
+        return getattr(self._lane, 'deleter', None) or self._deleter
+
+    @property
+    def current_category(self) -> Optional[str]:
+        return getattr(self._lane, 'category', None)
+
+    @current_category.setter
+    def current_category(self, category: Optional[str]):
+        self._lane.category = category
+
+    def add_freed(self, category: str, freed: int):
+        with self._totals_lock:
+            self.total_freed += freed
+            self.category_freed[category] = self.category_freed.get(category, 0) + freed
+
+    def emit(self, event: str, **fields):
+        """Send a structured event when running with --json-events"""
+        if self.events is not None:
+            self.events.emit(event, **fields)
+
+    def scanned(self, files: int, nbytes: int):
+        """Walker progress callback: count scanned files towards the estimate or the event stream"""
+        if self.progress is not None:
+            self.progress.advance(files, nbytes)
+        elif self.events is not None:
+            self.events.scanned(files, nbytes)
+
+    def estimate(self, roots: Iterable[Path]) -> Dict[str, Tuple[int, Optional[int]]]:
+        """Files and bytes below each of the outermost roots, for progress reporting.
+
+        Roots the scan index has seen are answered from it with one query;
+        the others are counted from directory listings without stat'ing
+        anything, so their size is unknown.
+        """
+        estimates: Dict[str, Tuple[int, Optional[int]]] = {}
+        for path in outermost_paths(roots):
+            self.cancel_token.check()
+            if not os.path.isdir(path) or not self.is_safe_to_delete(Path(path)):
+                continue
+            estimate = self.index.estimate(path) if self.index is not None else None
+            estimates[path] = estimate or (self.walker.count(path), None)
+        return estimates
+
+    def start_progress(self, roots: Iterable[Path]):
+        """Estimate the work below roots, then report progress against it from the walkers"""
+        print("📏 Estimating the work...")
+        estimates = self.estimate(roots)
+        self.progress = Progress(estimates, self.report_progress)
+        self._walker.on_progress = self.scanned
+        total_files = self.progress.total_files
+        total_bytes = self.progress.total_bytes
+        self.emit("estimate", files=total_files, bytes=total_bytes)
+        print(f"  About {total_files:,} files"
+              + (f" ({self.format_size(total_bytes)})" if total_bytes is not None else ""))
+        print()
+
+    def finish_root(self, root: Union[str, Path]):
+        if self.progress is not None:
+            self.progress.finish_root(root)
+
+    def report_progress(self, progress: ProgressSnapshot):
+        """Called at most every 250ms during a run with a progress estimate"""
+        self.emit("progress", files=progress.files, bytes=progress.bytes,
+                  total_files=progress.total_files, total_bytes=progress.total_bytes,
+                  fraction=round(progress.fraction, 4),
+                  eta=None if progress.eta is None else round(progress.eta, 1))
 
     def get_dir_size(self, path: Path) -> int:
         """Calculate directory size in bytes"""
-        try:
-            total = 0
-            for entry in path.rglob('*'):
-                if entry.is_file():
-                    try:
-                        total += entry.stat().st_size
-                    except (OSError, PermissionError):
-                        continue
-            return total
-        except (OSError, PermissionError):
-            return 0
+        tally = LinkTally()
+        
+        def add_sizes(summary: DirSummary, _) -> int:
+            return summary.size + sum(tally.size_once(f) for f in summary.linked)
+        
+        return self.walker.walk_summaries(path, add_sizes, index=self.index,
+                                          accounting=self.accounting)
+
+    def charge_removal(self, st: os.stat_result) -> int:
+        """Bytes freed by removing one file, under the configured accounting mode"""
+        if self.accounting.is_linked(st):
+            return self.removed_links.remove(self.accounting.linked(st))
+        return self.accounting.usage(st)
 
     def format_size(self, size_bytes: int) -> str:
         """Format bytes into human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f} PB"
+        return format_size(size_bytes)
+
+    def safety_rules(self) -> SafetyRules:
+        """Compiled protection rules, rebuilt if exclude_dirs has been changed"""
+        excludes = frozenset(self.exclude_dirs)
+        if self._rules is None or self._rules_excludes != excludes:
+            protected = SafetyRules.PROTECTED
+            if self.rules_path is not None:
+                self._rules = SafetyRules.from_file(self.rules_path, protected, excludes)
+            else:
+                self._rules = SafetyRules(protected, excludes)
+            self._rules_excludes = excludes
+        return self._rules
 
     def is_safe_to_delete(self, path: Path) -> bool:
         """Check if path is safe to delete"""
-        path_str = str(path).lower()
+        return self.safety_rules().is_safe(path)
+
+    def clean_directory(self, cache_dir: Path) -> int:
+        """Clean a specific cache directory according to its policy"""
+        if not cache_dir.exists():
+            if self.verbose:
+                print(f"  Directory doesn't exist: {cache_dir}")
+            return 0
+            
+        rules = self.safety_rules()
+        root_state = rules.state_for(cache_dir)
+        if root_state is None:
+            if self.verbose:
+                print(f"  Skipping protected directory: {cache_dir}")
+            return 0
+
+        freed = 0
         
-        # Never delete these critical directories
-        critical_paths = [
-            '/system', '/usr', '/bin', '/sbin', '/etc',
-            '/applications', '/library/frameworks',
-            '/library/extensions', '/library/preferences'
-        ]
+        try:
+            print(f"  Cleaning: {cache_dir}")
+            
+            if self.wipes_contents(cache_dir):
+                # For temp and log directories, clean contents but keep directory
+                freed = self._wipe_contents(cache_dir, rules, root_state)
+            else:
+                plan = self.root_plan
+                if plan is not None and plan.is_walked(cache_dir):
+                    # Already visited by the walk of an enclosing root
+                    freed = plan.take(cache_dir)
+                else:
+                    freed = self._clean_by_policy(cache_dir, rules, root_state)
+                            
+        except (OSError, PermissionError) as e:
+            print(f"  Error accessing {cache_dir}: {e}")
+            return 0
         
-        for critical in critical_paths:
-            if path_str.startswith(critical):
-                return False
-                
-        # Check exclude list
-        for exclude in self.exclude_dirs:
-            if exclude in path_str:
-                return False
-                
-        return True
+        if self.index is not None and not self.dry_run:
+            self.index.forget(cache_dir)
+        if self.journal is not None and not self.cancel_token.cancelled:
+            self.journal.mark_done(cache_dir)
+            
+        if freed > 0:
+            print(f"    Freed: {self.format_size(freed)}")
+        elif self.verbose:
+            print(f"    Nothing to clean")
+        self.emit("directory", path=os.fspath(cache_dir), category=self.current_category,
+                  freed=freed)
+            
+        return freed
+
+    def _wipe_contents(self, cache_dir: Path, rules: SafetyRules, root_state) -> int:
+        if self.dry_run and self.index is not None and self.deletion_plan is None:
+            return self._wipe_size(cache_dir, rules, root_state)
+        files, subdirs = scan_directory(cache_dir)
+        subdirs = [d for d in subdirs if rules.child_state(root_state, d) is not None]
+        key = os.fspath(cache_dir)
+        if not self.dry_run:
+            self.deleter.submit_files(key, key, files)
+            for subdir in subdirs:
+                self.deleter.submit_tree(key, subdir)
+            return self.deleter.drain().get(key, 0)
+        recorder = self.deletion_plan
+        sizes = [self.charge_removal(f.stat) for f in files]
+        freed = sum(sizes)
+        if recorder is not None:
+            recorder.add_files(self.category_of(key), key, files, sizes)
+        for subdir in subdirs:
+            size = self.walker.walk(subdir, lambda files, _: sum(
+                self.charge_removal(f.stat) for f in files))
+            freed += size
+            if recorder is not None:
+                try:
+                    recorder.add_tree(self.category_of(key), subdir, os.lstat(subdir), size)
+                except OSError:
+                    pass
+        return freed
+
+    def _wipe_size(self, cache_dir: Path, rules: SafetyRules, root_state) -> int:
+        """What _wipe_contents() would free, from index summaries where they are current"""
+        def descend(path: str, below_root: bool) -> Optional[bool]:
+            # Like _wipe_contents(), only the root's own subdirectories are checked
+            if below_root or rules.child_state(root_state, path) is not None:
+                return True
+            return None
+        
+        def add_sizes(summary: DirSummary, _) -> int:
+            return summary.size + sum(self.removed_links.remove(f) for f in summary.linked)
+        
+        return self.walker.walk_summaries(cache_dir, add_sizes, descend, False,
+                                          index=self.index)
+
+    def _clean_by_policy(self, cache_dir: Path, rules: SafetyRules, root_state) -> int:
+        """Walk a root once, deleting (or counting) the files its policies select.
+
+        Quota policies are applied after the walk, to the files that survived
+        their age and size rules.
+        """
+        root = os.fspath(cache_dir)
+        # Resolved here, on the category's lane thread: the closures below run
+        # on walker threads, which would see the shared walker and pipeline
+        walker, deleter = self.walker, self.deleter
+        category = self.current_category
+        plan = self.root_plan
+        policies = self.policies
+        root_policy = policies.for_root(root)
+        recorder = self.deletion_plan
+        journal = self.journal
+        freed_by_root: Dict[str, int] = {}
+        quotas: Dict[CleaningPolicy, LRUQuota] = {}
+        lock = threading.Lock()
+        
+        def charge(owner: str, batch_freed: int) -> int:
+            if batch_freed:
+                with lock:
+                    freed_by_root[owner] = freed_by_root.get(owner, 0) + batch_freed
+            return batch_freed
+        
+        # Directories that still hold something after this run (a pruned
+        # subdirectory, a file kept by the policy), until they are finished
+        # and pass it on to their parent. A finished directory this run
+        # queued deletions under is left empty once they drain, and is
+        # removed in post-order; one that was empty already (a lock or tmp
+        # directory an application just made) is left alone.
+        keep = set()
+        queued: Dict[str, int] = {}
+        emptied: List[str] = []
+        
+        # A dry run can only use index summaries when the policy is a pure
+        # mtime rule; a plan needs file names and other policies need more
+        # than mtimes, neither of which the index keeps
+        summaries = (self.dry_run and self.index is not None and recorder is None
+                     and root_policy.by_mtime_only and not policies.has_rules_below(root))
+        # Only for sizing: a real run decides what to delete from its own lstat
+        # of every file, since a row can be MAX_AGE old and a file rewritten in
+        # place doesn't change its directory's mtime. Having listed a stale
+        # subtree, it unlinks the files by name and removes the emptied
+        # directories in post-order; a recursive delete would list and lstat
+        # the subtree a second time.
+        index = self.index if summaries else None
+        stale_trees: Dict[str, Optional[int]] = {}
+        
+        def stale_subtree(path: str, ctx: tuple) -> Optional[int]:
+            """Bytes below path if the index shows nothing there is newer than the cutoff"""
+            if path in stale_trees:
+                return stale_trees[path]
+            size = None
+            cached = index.cached(path)
+            if cached is not None:
+                summary, subdirs = cached
+                if summary.newest_mtime < ctx[2].cutoff and not summary.linked:
+                    size = summary.size
+                    for subdir in subdirs:
+                        # The whole subtree must share this owner, policy and safety state
+                        child = child_context(subdir, ctx)
+                        if child is None or child[0] != ctx[0] or child[2] is not ctx[2]:
+                            size = None
+                        else:
+                            child_size = stale_subtree(subdir, child)
+                            size = None if child_size is None else size + child_size
+                        if size is None:
+                            break
+            stale_trees[path] = size
+            return size
+        
+        def descend(path: str, ctx: tuple) -> Optional[tuple]:
+            child = child_context(path, ctx)
+            if child is not None and index is not None and child[2].by_mtime_only:
+                size = stale_subtree(path, child)
+                if size is not None:
+                    # Entirely stale: counted in one go, without listing its files
+                    charge(child[0], size)
+                    return None
+            if child is None and not self.dry_run:
+                with lock:
+                    keep.add(os.path.dirname(path))
+            return child
+        
+        # Walk context: (root the files are charged to, safety rule state, policy)
+        def child_context(path: str, ctx: tuple) -> Optional[tuple]:
+            owner, state, policy = ctx
+            state = rules.child_state(state, path)
+            if state is None:
+                return None
+            if journal is not None and journal.is_done(path):
+                return None
+            if plan is not None:
+                owner = plan.descend(path, owner)
+                if owner is None:
+                    return None
+            return owner, state, policies.for_child(path, policy)
+        
+        def select(files: List[ScanEntry], ctx: tuple) -> List[ScanEntry]:
+            owner, _, policy = ctx
+            stale, kept = policy.split(files)
+            if policy.quota is not None and kept:
+                with lock:
+                    quota = quotas.get(policy)
+                    if quota is None:
+                        quota = quotas[policy] = LRUQuota(policy.quota)
+                evict(quota.offer(owner, kept, self.accounting.usage))
+            return stale
+        
+        def evict(evicted: List[Tuple[str, ScanEntry]]):
+            batches: Dict[Tuple[str, str], List[ScanEntry]] = {}
+            for owner, f in evicted:
+                batches.setdefault((owner, os.path.dirname(f.path)), []).append(f)
+            for (owner, dirpath), batch in batches.items():
+                if not self.dry_run:
+                    with lock:
+                        queued[dirpath] = queued.get(dirpath, 0) + len(batch)
+                    deleter.submit_files(owner, dirpath, batch)
+                    continue
+                sizes = [self.charge_removal(f.stat) for f in batch]
+                if recorder is not None:
+                    recorder.add_files(self.category_of(owner, category), dirpath, batch, sizes)
+                charge(owner, sum(sizes))
+        
+        def queue_stale_files(files: List[ScanEntry], ctx: tuple) -> int:
+            if not files:
+                return 0
+            stale = select(files, ctx)
+            dirpath = os.path.dirname(files[0].path)
+            with lock:
+                if len(stale) < len(files):
+                    keep.add(dirpath)
+                if stale:
+                    queued[dirpath] = queued.get(dirpath, 0) + len(stale)
+            if stale:
+                deleter.submit_files(ctx[0], dirpath, stale)
+            return 0
+        
+        def count_stale_files_exact(files: List[ScanEntry], ctx: tuple) -> int:
+            stale = select(files, ctx)
+            sizes = [self.charge_removal(f.stat) for f in stale]
+            if recorder is not None and stale:
+                recorder.add_files(self.category_of(ctx[0], category),
+                                   os.path.dirname(stale[0].path), stale, sizes)
+            return charge(ctx[0], sum(sizes))
+        
+        def count_stale_files(summary: DirSummary, ctx: tuple) -> int:
+            cutoff = ctx[2].cutoff
+            stale = summary.size_older_than(cutoff)
+            if stale is None:
+                # Files on the cutoff day need their exact mtimes
+                files, _ = scan_directory(summary.path)
+                return count_stale_files_exact(files, ctx)
+            stale += sum(self.removed_links.remove(f) for f in summary.linked
+                         if f.mtime < cutoff)
+            return charge(ctx[0], stale)
+        
+        # Subtrees this far below the root are journaled once their deletions
+        # have drained, every CHECKPOINT_INTERVAL seconds. A quota covers the
+        # whole root, so a root under one can't resume from a partial walk.
+        quota_below = root_policy.quota is not None or policies.has_rules_below(root)
+        finished: List[str] = []
+        removed_dirs = [0]
+        last_checkpoint = [time.monotonic()]
+        checkpoint_lock = threading.Lock()
+        
+        def checkpoint():
+            with checkpoint_lock:
+                with lock:
+                    done = finished[:]
+                    del finished[:]
+                    empty = emptied[:]
+                    del emptied[:]
+                for owner, batch_freed in deleter.drain().items():
+                    charge(owner, batch_freed)
+                removed_dirs[0] += deleter.remove_empty_dirs(empty)
+                # Once cancelled, the drain may have dropped queued deletions
+                if journal is not None and not self.cancel_token.cancelled:
+                    journal.mark_done(*done)
+                last_checkpoint[0] = time.monotonic()
+        
+        checkpointing = journal is not None and not quota_below
+        
+        def subtree_done(path: str, ctx: tuple):
+            if path == root:
+                return
+            parent = os.path.dirname(path)
+            with lock:
+                count = queued.pop(path, 0)
+                if count:
+                    queued[parent] = queued.get(parent, 0) + count
+                if path in keep:
+                    keep.discard(path)
+                    keep.add(parent)
+                elif count and (plan is None or plan.owner(path) is None):
+                    emptied.append(path)
+                else:
+                    # Left in place, so its parent isn't emptied either
+                    keep.add(parent)
+                if (checkpointing and
+                        path[len(root) + 1:].count(os.sep) < self.CHECKPOINT_DEPTH):
+                    finished.append(path)
+            if checkpointing and time.monotonic() - last_checkpoint[0] >= self.CHECKPOINT_INTERVAL:
+                checkpoint()
+        
+        context = (root, root_state, root_policy)
+        if not self.dry_run:
+            walker.walk(cache_dir, queue_stale_files, descend, context,
+                             on_done=subtree_done)
+            checkpoint()
+            if removed_dirs[0] and self.verbose:
+                print(f"    Removed {removed_dirs[0]} empty directories")
+        elif summaries:
+            walker.walk_summaries(cache_dir, count_stale_files, descend, context,
+                                       index=self.index)
+        else:
+            walker.walk(cache_dir, count_stale_files_exact, descend, context)
+        
+        if plan is not None and not self.cancel_token.cancelled:
+            plan.record(cache_dir, freed_by_root)
+        return freed_by_root.get(root, 0)
+
+    def category_of(self, root: str, category: Optional[str] = None) -> str:
+        """Category a root's files are reported under.
+
+        Off the category's own thread, pass its category: walker threads
+        don't see current_category.
+        """
+        owner = self.root_plan.owner(root) if self.root_plan is not None else None
+        return owner or category or self.current_category or "Other"
+
+    def apply_plan(self, plan: DeletionPlan) -> int:
+        """Delete what a saved dry-run plan lists, without walking any directory.
+
+        Each entry is checked with one lstat(): it is skipped if its device,
+        inode or mtime changed since the scan, or if it is now protected.
+        """
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(plan.created))
+        print(f"📋 Applying deletion plan from {created}: {len(plan)} entries, "
+              f"{self.format_size(plan.size)}")
+        self.emit("start", dry_run=False, categories=sorted(
+            {e.category for entries in plan.groups.values() for e in entries}))
+        rules = self.safety_rules()
+        skipped = 0
+        try:
+            for dirpath, entries in plan.groups.items():
+                self.cancel_token.check()
+                state = rules.state_for(dirpath)
+                if state is None:
+                    skipped += len(entries)
+                    continue
+                files_by_category: Dict[str, List[ScanEntry]] = {}
+                for entry in entries:
+                    path = os.path.join(dirpath, entry.name)
+                    try:
+                        st = os.lstat(path)
+                    except OSError:
+                        skipped += 1
+                        continue
+                    if ((st.st_dev, st.st_ino, st.st_mtime_ns) != (entry.dev, entry.ino, entry.mtime_ns)
+                            or S_ISDIR(st.st_mode) != entry.is_tree):
+                        skipped += 1
+                    elif entry.is_tree:
+                        if rules.child_state(state, path) is None:
+                            skipped += 1
+                        else:
+                            self.deleter.submit_tree(entry.category, path)
+                    else:
+                        files_by_category.setdefault(entry.category, []).append(
+                            ScanEntry(path, entry.name, S_ISLNK(st.st_mode), st))
+                for category, files in files_by_category.items():
+                    self.deleter.submit_files(category, dirpath, files)
+        finally:
+            for category, freed in sorted(self.deleter.drain().items()):
+                self.add_freed(category, freed)
+            if self.index is not None:
+                for dirpath in plan.groups:
+                    self.index.forget(dirpath)
+        
+        for category, freed in self.category_freed.items():
+            print(f"  {category}: {self.format_size(freed)}")
+        if skipped:
+            print(f"  Skipped {skipped} entries that changed or became protected since the scan")
+        print(f"Total space freed: {self.format_size(self.total_freed)}")
+        self.emit("complete", dry_run=False, total_freed=self.total_freed,
+                  categories=self.category_freed, skipped=skipped)
+        return self.total_freed
+
+    def _report_delete_error(self, path: str, error: OSError):
+        if self.verbose:
+            print(f"    Warning: Could not delete {path}: {error}")
+
+    def wipes_contents(self, cache_dir: Path) -> bool:
+        """Whether a directory is emptied completely rather than file by file"""
+        policy = self.policies.for_root(cache_dir)
+        return policy.wipe and not policy.include and not policy.exclude
+
+    # Package and build caches that are rebuilt on a miss, so trimming them by
+    # access time keeps the hot entries instead of expiring them by age
+    QUOTA_ROOTS = [
+        "~/.npm/_cacache",
+        "~/.yarn/cache",
+        "~/Library/Caches/pip",
+        "~/Library/Developer/Xcode/DerivedData",
+    ]
+
+    def limit_cache_size(self, max_bytes: int):
+        """Trim each of QUOTA_ROOTS to max_bytes, least recently used first.
 
-    def clean_directory(self, cache_dir: Path) -> int:
-        """Clean a specific cache directory"""
-        if not cache_dir.exists():
-            if self.verbose:
-                print(f"  Directory doesn't exist: {cache_dir}")
-            return 0
-            
-        if not self.is_safe_to_delete(cache_dir):
-            if self.verbose:
-                print(f"  Skipping protected directory: {cache_dir}")
-            return 0
+        Roots with their own entry in the policy file keep it.
+        """
+        policy = CleaningPolicy(max_age=None, age_by='atime', quota=max_bytes)
+        for root in self.roots.expand(self.QUOTA_ROOTS):
+            self.policies.add(root, policy, replace=False)
 
-        size_before = self.get_dir_size(cache_dir)
-        freed = 0
-        
+    def category_roots(self) -> Dict[str, List[Path]]:
+        """Cache roots cleaned by each category, in the order run() visits them"""
+        return self.roots.category_roots()
+
+    def plan_roots(self, categories: Optional[Iterable[str]] = None) -> RootPlan:
+        """Build a RootPlan so overlapping roots of these categories are walked once"""
+        plan = RootPlan()
+        for category, roots in self.category_roots().items():
+            if categories is None or category in categories:
+                plan.add(category, [r for r in roots
+                                    if not self.wipes_contents(r) and self.is_safe_to_delete(r)])
+        return plan
+
+    def measure_disk(self, roots: Iterable[Path]) -> Dict[str, DiskUsage]:
+        """Fresh usage of the volumes `roots` live on, for a before/after delta"""
+        if (self.dry_run or not self.measure_deltas
+                or getattr(self._lane, 'walker', None) is not None):
+            # Concurrent categories would see each other's deletions
+            return {}
         try:
-            print(f"  Cleaning: {cache_dir}")
-            
-            if cache_dir.name in ['tmp', 'Logs', 'CrashReporter']:
-                # For temp and log directories, clean contents but keep directory
-                for item in cache_dir.iterdir():
-                    try:
-                        if item.is_file():
-                            if not self.dry_run:
-                                item.unlink()
-                            freed += item.stat().st_size
-                        elif item.is_dir() and self.is_safe_to_delete(item):
-                            item_size = self.get_dir_size(item)
-                            if not self.dry_run:
-                                shutil.rmtree(item)
-                            freed += item_size
-                    except (OSError, PermissionError) as e:
-                        if self.verbose:
-                            print(f"    Warning: Could not delete {item}: {e}")
-            else:
-                # For other cache dirs, clean old files (>7 days)
-                cutoff_time = time.time() - (7 * 24 * 3600)  # 7 days ago
-                
-                for item in cache_dir.rglob('*'):
-                    try:
-                        if item.is_file() and item.stat().st_mtime < cutoff_time:
-                            file_size = item.stat().st_size
-                            if not self.dry_run:
-                                item.unlink()
-                            freed += file_size
-                    except (OSError, PermissionError) as e:
-                        if self.verbose:
-                            print(f"    Warning: Could not delete {item}: {e}")
-                            
-        except (OSError, PermissionError) as e:
-            print(f"  Error accessing {cache_dir}: {e}")
-            return 0
-            
-        if freed > 0:
-            print(f"    Freed: {self.format_size(freed)}")
-        elif self.verbose:
-            print(f"    Nothing to clean")
-            
-        return freed
+            return self.disk.volumes(roots, fresh=True)
+        except OSError:
+            return {}
+
+    def record_disk_delta(self, category: str, before: Dict[str, DiskUsage]):
+        """Store how much free space each volume gained since `before` was measured"""
+        if not before:
+            return
+        after = self.measure_disk(before)
+        self.disk_freed[category] = {mount: after[mount].available - usage.available
+                                     for mount, usage in before.items() if mount in after}
+
+    def print_disk_usage(self, roots: Iterable[Path]):
+        """Print usage for every volume that one of the cache roots lives on"""
+        try:
+            volumes = self.disk.volumes(roots)
+        except OSError:
+            return
+        print("💾 Current Disk Usage:")
+        for usage in volumes.values():
+            print(f"  {usage.describe()}")
+        print()
+
+    def clean_category(self, category: str, roots: List[Path]):
+        """Clean the roots of one category, skipping those another category reports"""
+        own_plan = self.root_plan is None
+        if own_plan:
+            self.root_plan = self.plan_roots([category])
+        self.current_category = category
+        self.emit("category_start", category=category)
+        before = self.measure_disk(roots)
+        try:
+            for cache_dir in roots:
+                self.cancel_token.check()
+                owner = self.root_plan.owner(cache_dir)
+                if owner is not None and owner != category:
+                    continue
+                if self.journal is not None and self.journal.is_done(cache_dir):
+                    print(f"  Already cleaned before the interruption: {cache_dir}")
+                    self.finish_root(cache_dir)
+                    continue
+                self.add_freed(category, self.clean_directory(cache_dir))
+                self.finish_root(cache_dir)
+            self.cancel_token.check()
+        finally:
+            self.current_category = None
+            self.record_disk_delta(category, before)
+            self.emit("category_end", category=category,
+                      freed=self.category_freed.get(category, 0),
+                      disk_freed=self.disk_freed.get(category, {}))
+            if own_plan:
+                self.root_plan = None
 
     def clean_browser_data(self):
         """Clean browser cache and temporary data"""
         print("\n🌐 Cleaning Browser Data...")
         
-        # Safari
-        safari_cache = self.home_dir / "Library/Caches/com.apple.Safari"
-        if safari_cache.exists():
-            freed = self.clean_directory(safari_cache)
-            self.total_freed += freed
-            
-        # Chrome
-        chrome_cache = self.home_dir / "Library/Caches/com.google.Chrome"
-        if chrome_cache.exists():
-            freed = self.clean_directory(chrome_cache)
-            self.total_freed += freed
+        roots = self.roots.roots("Browser Data")
+        self.clean_category("Browser Data", [d for d in roots if d.exists()])
 
     def clean_system_caches(self):
         """Clean system-level caches"""
         print("\n🖥️  Cleaning System Caches...")
         
-        for cache_dir in [d for d in self.cache_dirs if 'Library/Caches' in str(d)]:
-            freed = self.clean_directory(cache_dir)
-            self.total_freed += freed
+        self.clean_category("System Caches", self.roots.roots("System Caches"))
 
     def clean_temp_files(self):
         """Clean temporary files"""
         print("\n🗑️  Cleaning Temporary Files...")
         
-        temp_dirs = [Path("/tmp"), Path("/var/tmp")]
-        for temp_dir in temp_dirs:
-            freed = self.clean_directory(temp_dir)
-            self.total_freed += freed
+        self.clean_category("Temporary Files", self.roots.roots("Temporary Files"))
 
     def clean_development_caches(self):
         """Clean development-related caches"""
         print("\n💻 Cleaning Development Caches...")
         
-        dev_caches = [
-            self.home_dir / ".npm/_cacache",
-            self.home_dir / ".yarn/cache", 
-            self.home_dir / "Library/Caches/pip",
-            self.home_dir / ".cache",
-            self.home_dir / "Library/Developer/Xcode/DerivedData",
-        ]
-        
-        for cache_dir in dev_caches:
-            if cache_dir.exists():
-                freed = self.clean_directory(cache_dir)
-                self.total_freed += freed
+        roots = self.roots.roots("Development Caches")
+        self.clean_category("Development Caches", [d for d in roots if d.exists()])
 
     def clean_logs(self):
         """Clean log files"""
         print("\n📋 Cleaning Log Files...")
         
-        log_dirs = [
-            self.home_dir / "Library/Logs",
-            Path("/var/log"),
-        ]
+        roots = self.roots.roots("Log Files")
+        self.clean_category("Log Files", [d for d in roots if d.exists()])
+
+    def clean_roots(self, category: str):
+        """Clean a registry category that has no clean_* method of its own"""
+        print(f"\n🧽 Cleaning {category}...")
         
-        for log_dir in log_dirs:
-            if log_dir.exists():
-                freed = self.clean_directory(log_dir)
-                self.total_freed += freed
+        roots = self.roots.roots(category)
+        self.clean_category(category, [d for d in roots if d.exists()])
+
+    def category_cleaners(self) -> Dict[str, Callable[[], None]]:
+        """The clean_* method of each registry category, in registry order"""
+        builtin = {
+            "System Caches": self.clean_system_caches,
+            "Browser Data": self.clean_browser_data,
+            "Temporary Files": self.clean_temp_files,
+            "Development Caches": self.clean_development_caches,
+            "Log Files": self.clean_logs,
+        }
+        return {category: builtin.get(category) or functools.partial(self.clean_roots, category)
+                for category in self.roots.categories}
 
     def empty_trash(self):
         """Empty the Trash"""
         print("\n🗂️  Emptying Trash...")
         
+        self.emit("category_start", category="Trash")
+        trash_dir = self.home_dir / ".Trash"
+        before = self.measure_disk([trash_dir])
         try:
-            trash_dir = self.home_dir / ".Trash"
             if trash_dir.exists():
                 size_before = self.get_dir_size(trash_dir)
                 if not self.dry_run:
@@ -259,69 +2866,214 @@ class MacOSCacheCleaner:
                     subprocess.run(['osascript', '-e', 'tell application "Finder" to empty trash'], 
                                  capture_output=True)
                 print(f"  Freed: {self.format_size(size_before)}")
-                self.total_freed += size_before
+                self.add_freed("Trash", size_before)
         except Exception as e:
             print(f"  Error emptying trash: {e}")
+        self.record_disk_delta("Trash", before)
+        self.emit("category_end", category="Trash", freed=self.category_freed.get("Trash", 0),
+                  disk_freed=self.disk_freed.get("Trash", {}))
 
     def run_maintenance_scripts(self):
         """Run built-in macOS maintenance scripts"""
         print("\n🔧 Running macOS Maintenance...")
         
+        self.emit("category_start", category="Maintenance")
         if not self.dry_run:
             try:
-                # Run periodic daily maintenance
-                subprocess.run(['sudo', 'periodic', 'daily'], capture_output=True)
-                print("  ✓ Daily maintenance completed")
+                for command, done in self.MAINTENANCE_COMMANDS:
+                    self.cancel_token.check()
+                    subprocess.run(command, capture_output=True)
+                    print(f"  ✓ {done}")
                 
-                # Rebuild dyld cache
-                subprocess.run(['sudo', 'update_dyld_shared_cache', '-force'], capture_output=True)
-                print("  ✓ Dynamic linker cache rebuilt")
+            except CleaningCancelled:
+                raise
+            except Exception as e:
+                print(f"  Error running maintenance: {e}")
+        else:
+            print("  (Dry run - maintenance scripts not executed)")
+        self.emit("category_end", category="Maintenance", freed=0)
+
+    async def run_maintenance_async(self):
+        """run_maintenance_scripts() for the event loop: the commands run as asyncio subprocesses"""
+        print("\n🔧 Running macOS Maintenance...")
+        
+        self.emit("category_start", category="Maintenance")
+        if not self.dry_run:
+            try:
+                for command, done in self.MAINTENANCE_COMMANDS:
+                    self.cancel_token.check()
+                    process = await asyncio.create_subprocess_exec(
+                        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+                    await process.communicate()
+                    print(f"  ✓ {done}")
                 
+            except CleaningCancelled:
+                raise
             except Exception as e:
                 print(f"  Error running maintenance: {e}")
         else:
             print("  (Dry run - maintenance scripts not executed)")
+        self.emit("category_end", category="Maintenance", freed=0)
+
+    def category_groups(self, skip_trash: bool = False) -> List[List[Tuple[str, Callable[[], None]]]]:
+        """Split the cleaning categories into groups that can run concurrently.
+
+        Categories whose roots are nested in one another share directory walks
+        through the RootPlan, so they are put in the same group and keep their
+        run() order. Categories in different groups never touch the same files.
+        """
+        cleaners = self.category_cleaners()
+        roots = {category: [Path(r).parts for r in paths]
+                 for category, paths in self.category_roots().items()}
+        if not skip_trash:
+            cleaners["Trash"] = self.empty_trash
+            roots["Trash"] = [(self.home_dir / ".Trash").parts]
+
+        def overlap(a: str, b: str) -> bool:
+            return any(x[:len(y)] == y or y[:len(x)] == x for x in roots[a] for y in roots[b])
+
+        groups: List[List[str]] = []
+        for category in cleaners:
+            joined = [g for g in groups if any(overlap(category, other) for other in g)]
+            merged = [c for g in joined for c in g] + [category]
+            groups = [g for g in groups if g not in joined] + [merged]
+        order = list(cleaners)
+        return [[(c, cleaners[c]) for c in sorted(g, key=order.index)] for g in groups]
+
+    async def clean_concurrently(self, skip_trash: bool = False, skip_maintenance: bool = False):
+        """Run the independent categories and the maintenance scripts at the same time.
 
-    def scan_large_files(self, min_size_mb: int = 100):
-        """Find large files that could be candidates for deletion"""
+        At most parallel_categories categories clean at once, each on its own
+        executor thread with its own walker and deletion pipeline sized by
+        category_jobs (default: jobs). Output is buffered per category.
+        """
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(self.parallel_categories)
+        executor = ThreadPoolExecutor(max_workers=self.parallel_categories,
+                                      thread_name_prefix='cache-category')
+        output = LaneOutput(sys.stdout)
+
+        async def run_group(group):
+            for category, clean in group:
+                async with limit:
+                    await loop.run_in_executor(executor, self._clean_in_lane,
+                                               category, clean, output)
+
+        tasks = [run_group(group) for group in self.category_groups(skip_trash)]
+        if not skip_maintenance:
+            tasks.append(self.run_maintenance_async())
+        before = self.measure_disk([Path('/'), *(r for roots in self.category_roots().values()
+                                                 for r in roots)])
+        try:
+            with contextlib.redirect_stdout(output):
+                await asyncio.gather(*tasks)
+        finally:
+            executor.shutdown()
+            self.record_disk_delta("Total", before)
+
+    def clean_categories(self, skip_trash: bool = True, skip_maintenance: bool = True):
+        """Clean every registry category, walking overlapping roots once.
+
+        With parallel_categories above 1 the trash and maintenance steps run
+        alongside unless skipped; one after another, they are left to run().
+        """
+        self.root_plan = self.plan_roots()
+        try:
+            if self.parallel_categories > 1:
+                asyncio.run(self.clean_concurrently(skip_trash, skip_maintenance))
+            else:
+                for clean in self.category_cleaners().values():
+                    clean()
+        finally:
+            self.root_plan = None
+
+    def close_journal(self, cancelled: bool):
+        """Keep the checkpoint journal for --resume after a stopped run, drop it after a full one"""
+        if self.journal is None:
+            return
+        if cancelled:
+            self.journal.close()
+        else:
+            self.journal.complete()
+
+    def _clean_in_lane(self, category: str, clean: Callable[[], None], output: LaneOutput):
+        walker, deleter = self._workers(self.category_jobs.get(category, self.jobs))
+        self._lane.walker, self._lane.deleter = walker, deleter
+        try:
+            with output.capture():
+                clean()
+        finally:
+            self._lane.walker = self._lane.deleter = None
+            walker.shutdown()
+            deleter.close()
+
+    def scan_large_files(self, min_size_mb: int = 100, top: int = 10) -> List[Tuple[Path, int]]:
+        """Find large files that could be candidates for deletion.
+
+        Only the `top` largest files are kept, in a bounded min-heap. Each file
+        that makes it into the heap is reported through report_large_file() as
+        soon as it is found. With a scan index, directories whose files add up
+        to no more than the threshold are skipped without being listed.
+        """
         print(f"\n🔍 Scanning for files larger than {min_size_mb}MB...")
         
-        large_files = []
+        self.emit("category_start", category="Large Files")
         min_size_bytes = min_size_mb * 1024 * 1024
+        largest: List[Tuple[int, str]] = []
+        found = 0
+        lock = threading.Lock()
         
-        search_dirs = [
-            self.home_dir / "Downloads",
-            self.home_dir / "Desktop", 
-            self.home_dir / "Documents",
-            self.home_dir / "Movies",
-        ]
+        search_dirs = self.roots.large_file_roots()
+        
+        def keep_largest(files: List[ScanEntry], _) -> int:
+            nonlocal found
+            for entry in files:
+                size = self.accounting.usage(entry.stat)
+                if size <= min_size_bytes:
+                    continue
+                with lock:
+                    found += 1
+                    if len(largest) < top:
+                        heapq.heappush(largest, (size, entry.path))
+                    elif size > largest[0][0]:
+                        heapq.heapreplace(largest, (size, entry.path))
+                    else:
+                        continue
+                self.report_large_file(Path(entry.path), size)
+            return 0
+        
+        def keep_largest_indexed(summary: DirSummary, ctx) -> int:
+            if summary.size + sum(f.size for f in summary.linked) <= min_size_bytes:
+                return 0
+            files, _ = scan_directory(summary.path)
+            return keep_largest(files, ctx)
         
         for search_dir in search_dirs:
             if search_dir.exists():
-                try:
-                    for file_path in search_dir.rglob('*'):
-                        if file_path.is_file():
-                            try:
-                                size = file_path.stat().st_size
-                                if size > min_size_bytes:
-                                    large_files.append((file_path, size))
-                            except (OSError, PermissionError):
-                                continue
-                except (OSError, PermissionError):
-                    continue
+                if self.index is not None:
+                    self.walker.walk_summaries(search_dir, keep_largest_indexed, index=self.index)
+                else:
+                    self.walker.walk(search_dir, keep_largest)
         
-        # Sort by size (largest first)
-        large_files.sort(key=lambda x: x[1], reverse=True)
+        large_files = [(Path(path), size) for size, path in sorted(largest, reverse=True)]
         
         if large_files:
-            print(f"  Found {len(large_files)} large files:")
-            for file_path, size in large_files[:10]:  # Show top 10
+            print(f"  Found {found} large files, largest {len(large_files)}:")
+            for file_path, size in large_files:
                 print(f"    {self.format_size(size)} - {file_path}")
         else:
             print("  No large files found")
+        self.emit("category_end", category="Large Files", freed=0, found=found)
+        return large_files
+
+    def report_large_file(self, path: Path, size: int):
+        """Called as soon as a file enters the running top-K of scan_large_files()"""
+        self.emit("large_file", path=os.fspath(path), size=size)
+        if self.verbose:
+            print(f"    Found: {self.format_size(size)} - {path}")
 
     def run(self, skip_trash: bool = False, skip_maintenance: bool = False, 
-            find_large_files: bool = False):
+            find_large_files: bool = False, min_size_mb: int = 100, top: int = 10):
         """Run the complete cleaning process"""
         print("🧹 macOS Silicon Cache & Temp File Cleaner")
         print("=" * 50)
@@ -330,38 +3082,911 @@ class MacOSCacheCleaner:
             print("🔍 DRY RUN MODE - No files will be deleted")
             print()
         
-        # Show initial disk usage
-        try:
-            result = subprocess.run(['df', '-h', '/'], capture_output=True, text=True)
-            print("💾 Current Disk Usage:")
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                print(f"  {lines[1]}")
-            print()
-        except:
-            pass
-        
-        self.clean_system_caches()
-        self.clean_browser_data()
-        self.clean_temp_files()
-        self.clean_development_caches()
-        self.clean_logs()
-        
+        categories = list(self.category_roots())
         if not skip_trash:
-            self.empty_trash()
-            
+            categories.append("Trash")
         if not skip_maintenance:
-            self.run_maintenance_scripts()
-            
+            categories.append("Maintenance")
         if find_large_files:
-            self.scan_large_files()
+            categories.append("Large Files")
+        self.emit("start", dry_run=self.dry_run, categories=categories)
+        
+        # Show initial disk usage for every volume a cache root lives on
+        all_roots = [root for roots in self.category_roots().values() for root in roots]
+        self.print_disk_usage([Path('/'), *all_roots])
+        
+        if self.journal is not None and self.journal.finished:
+            started = time.strftime('%Y-%m-%d %H:%M', time.localtime(self.journal.started))
+            print(f"↩️  Resuming the run interrupted after {started}, "
+                  f"{len(self.journal.finished)} finished roots and subtrees will be skipped")
+            print()
+        
+        cancelled = False
+        try:
+            if self.estimate_progress:
+                self.start_progress(all_roots)
+            self.clean_categories(skip_trash, skip_maintenance)
+            if self.progress is not None:
+                # Later steps (trash, maintenance, large files) aren't part of the estimate
+                self.progress.finish()
+                self.progress = None
+            
+            if self.parallel_categories == 1:
+                if not skip_trash:
+                    self.cancel_token.check()
+                    self.empty_trash()
+                    
+                if not skip_maintenance:
+                    self.run_maintenance_scripts()
+                
+            if find_large_files:
+                self.cancel_token.check()
+                self.scan_large_files(min_size_mb, top)
+        except CleaningCancelled:
+            cancelled = True
         
         print("\n" + "=" * 50)
-        print(f"🎉 Cleaning Complete!")
+        print(f"⏹️  Cleaning Stopped" if cancelled else f"🎉 Cleaning Complete!")
         print(f"Total space freed: {self.format_size(self.total_freed)}")
+        if "Total" in self.disk_freed:
+            measured = sum(self.disk_freed["Total"].values())
+            print(f"Free space change: {'+' if measured >= 0 else '-'}"
+                  f"{self.format_size(abs(measured))}")
+        for category, freed in self.category_freed.items():
+            measured = sum(self.disk_freed.get(category, {}).values())
+            if category in self.disk_freed:
+                print(f"  {category}: {self.format_size(freed)} "
+                      f"(free space {'+' if measured >= 0 else '-'}{self.format_size(abs(measured))})")
+            else:
+                print(f"  {category}: {self.format_size(freed)}")
         
         if self.dry_run:
             print("(This was a dry run - no files were actually deleted)")
+        if self.journal is not None and cancelled:
+            print("Run again with --resume to continue where it stopped")
+        self.close_journal(cancelled)
+        self.emit("complete", dry_run=self.dry_run, total_freed=self.total_freed,
+                  categories=self.category_freed, disk_freed=self.disk_freed,
+                  cancelled=cancelled)
+        if cancelled:
+            raise CleaningCancelled()
+
+
+def home_state_path(path: Path, home: Path) -> Path:
+    """`path` with the home worked into the file name, so every home gets its own file"""
+    slug = '-'.join(home.parts[1:]) or 'root'
+    return path.with_name(f"{path.stem}.{slug}{path.suffix}")
+
+
+class HomeReport(NamedTuple):
+    """What clean_home() did for one home, sent back from its worker process"""
+    home: str
+    total_freed: int
+    category_freed: Dict[str, int]
+    large_files: List[Tuple[str, int]]
+    output: str  # printed text, or JSON event lines with --json-events
+    cancelled: bool = False
+    error: Optional[str] = None
+
+
+# Set in each worker process by _init_fleet_worker(); stops the clean_home() calls running there
+_fleet_stop = None
+
+
+def _init_fleet_worker(stop):
+    global _fleet_stop
+    _fleet_stop = stop
+    # Ctrl-C reaches the whole process group; the parent decides and sets `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def clean_home(roots: RootRegistry, options: Dict[str, Any], json_events: bool = False,
+               find_large_files: bool = False, min_size_mb: int = 100,
+               top: int = 10) -> HomeReport:
+    """Clean the "~/..." roots of one home; the body of a FleetCleaner worker process.
+
+    Output is collected and returned with the totals, so the parent can
+    print each home's report in one piece.
+    """
+    home = roots.homes[0]
+    output = io.StringIO()
+    events = EventStream(output) if json_events else None
+    cleaner = None
+    large_files: List[Tuple[str, int]] = []
+    cancelled = False
+    error = None
+    finished = threading.Event()
+
+    def watch_stop():
+        while not finished.is_set():
+            if _fleet_stop.wait(0.25):
+                cleaner.cancel()
+                return
+
+    with contextlib.redirect_stdout(EventLog(events) if events is not None else output):
+        try:
+            for path in roots.escaped_roots():
+                print(f"  Skipping {path}: outside {home} or not owned by its user")
+            cleaner = MacOSCacheCleaner(roots=roots, events=events, **options)
+            # Other homes are deleting from the same volumes; the parent measures the total
+            cleaner.measure_deltas = False
+            if _fleet_stop is not None:
+                threading.Thread(target=watch_stop, daemon=True).start()
+            cleaner.clean_categories()
+            if find_large_files:
+                cleaner.cancel_token.check()
+                large_files = [(os.fspath(path), size)
+                               for path, size in cleaner.scan_large_files(min_size_mb, top)]
+        except CleaningCancelled:
+            cancelled = True
+        except Exception as e:
+            error = str(e)
+            print(f"  Error cleaning {home}: {e}")
+        finally:
+            finished.set()
+            if cleaner is not None:
+                cleaner.close_journal(cancelled or error is not None)
+                if cleaner.index is not None:
+                    cleaner.index.close()
+            if events is not None:
+                events.flush()
+    return HomeReport(os.fspath(home), cleaner.total_freed if cleaner else 0,
+                      dict(cleaner.category_freed) if cleaner else {}, large_files,
+                      output.getvalue(), cancelled, error)
+
+
+class FleetCleaner:
+    """Cleans many home directories in one run, for shared hosts with many users.
+
+    Absolute roots such as /tmp and /var/log are the same for every user, so
+    they are walked once, here, while a pool of worker processes cleans the
+    "~/..." roots of one home per task. Homes are handed out as workers free
+    up, so one large home holds up a single worker rather than the run.
+    Each worker gets its own scan index and checkpoint journal, named after
+    the home. The Trash is left alone: Finder can only empty the invoking
+    user's.
+    """
+
+    def __init__(self, roots: RootRegistry, processes: Optional[int] = None,
+                 events: Optional[EventStream] = None, index_path: Optional[Path] = None,
+                 checkpoint_path: Optional[Path] = None, **options):
+        self.roots = roots
+        self.homes = list(roots.homes)
+        self.processes = max(1, min(processes or os.cpu_count() or 1, len(self.homes)))
+        self.events = events
+        self.index_path = index_path
+        self.checkpoint_path = checkpoint_path
+        self.options = options
+        self.shared = MacOSCacheCleaner(roots=roots.shared(), events=events,
+                                        index_path=index_path, checkpoint_path=checkpoint_path,
+                                        **options)
+        self.reports: Dict[str, HomeReport] = {}
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+
+    def cancel(self):
+        """Stop the shared roots and every worker at their next batch boundary"""
+        self.shared.cancel()
+        self._stop.set()
+
+    def home_options(self, home: Path) -> Dict[str, Any]:
+        """Constructor arguments of the cleaner a worker runs for `home`"""
+        return dict(self.options,
+                    index_path=(home_state_path(self.index_path, home)
+                                if self.index_path is not None else None),
+                    checkpoint_path=(home_state_path(self.checkpoint_path, home)
+                                     if self.checkpoint_path is not None else None))
+
+    def _collect(self, future, home: Path) -> HomeReport:
+        try:
+            return future.result()
+        except Exception as e:
+            return HomeReport(os.fspath(home), 0, {}, [], f"  Error cleaning {home}: {e}\n",
+                              error=str(e))
+
+    def _print_report(self, report: HomeReport):
+        if self.events is not None:
+            # The worker's output is already JSON event lines
+            self.events.flush()
+            self.events.stream.write(report.output)
+            self.events.emit("home_complete", flush=True, home=report.home,
+                             total_freed=report.total_freed, categories=report.category_freed,
+                             cancelled=report.cancelled, error=report.error)
+        else:
+            print(f"\n👤 {report.home}")
+            sys.stdout.write(report.output)
+
+    def run(self, skip_trash: bool = False, skip_maintenance: bool = False,
+            find_large_files: bool = False, min_size_mb: int = 100, top: int = 10):
+        """Clean the shared roots and every home, then report per home and overall"""
+        shared = self.shared
+        print("🧹 macOS Silicon Cache & Temp File Cleaner")
+        print("=" * 50)
+        print(f"👥 Cleaning {len(self.homes)} homes with {self.processes} worker processes")
+        if shared.dry_run:
+            print("🔍 DRY RUN MODE - No files will be deleted")
+        print()
+        
+        shared.emit("start", dry_run=shared.dry_run, homes=[os.fspath(h) for h in self.homes],
+                    categories=list(self.roots.categories))
+        shared_roots = [r for roots in shared.category_roots().values() for r in roots]
+        shared.print_disk_usage([Path('/'), *self.homes, *shared_roots])
+        before = shared.measure_disk([Path('/'), *self.homes, *shared_roots])
+        if not skip_trash:
+            print("Trash is not emptied when cleaning several homes")
+        
+        cancelled = False
+        futures: Dict[Any, Path] = {}
+        pool = ProcessPoolExecutor(self.processes, mp_context=self._context,
+                                   initializer=_init_fleet_worker, initargs=(self._stop,))
+        try:
+            futures = {pool.submit(clean_home, self.roots.for_home(home), self.home_options(home),
+                                   self.events is not None, find_large_files, min_size_mb,
+                                   top): home
+                       for home in self.homes}
+            # The shared roots are walked here while the workers clean the homes
+            shared.measure_deltas = False
+            try:
+                shared.clean_categories()
+                if not skip_maintenance:
+                    shared.run_maintenance_scripts()
+            except CleaningCancelled:
+                cancelled = True
+                self._stop.set()
+            for future in as_completed(futures):
+                report = self._collect(future, futures[future])
+                self.reports[report.home] = report
+                self._print_report(report)
+        finally:
+            # Homes not started yet are dropped (shutdown's cancel_futures needs 3.9)
+            for future in futures:
+                future.cancel()
+            pool.shutdown()
+        cancelled = cancelled or any(r.cancelled for r in self.reports.values())
+        shared.measure_deltas = True
+        shared.record_disk_delta("Total", before)
+        
+        reports = [self.reports[os.fspath(home)] for home in self.homes
+                   if os.fspath(home) in self.reports]
+        categories: Dict[str, int] = {category: shared.category_freed.get(category, 0)
+                                      for category in self.roots.categories}
+        for report in reports:
+            for category, freed in report.category_freed.items():
+                categories[category] = categories.get(category, 0) + freed
+        total = shared.total_freed + sum(r.total_freed for r in reports)
+        
+        print("\n" + "=" * 50)
+        print(f"⏹️  Cleaning Stopped" if cancelled else f"🎉 Cleaning Complete!")
+        print(f"Total space freed: {format_size(total)} across {len(reports)} homes")
+        if "Total" in shared.disk_freed:
+            measured = sum(shared.disk_freed["Total"].values())
+            print(f"Free space change: {'+' if measured >= 0 else '-'}"
+                  f"{format_size(abs(measured))}")
+        for category, freed in categories.items():
+            print(f"  {category}: {format_size(freed)}")
+        print("Per home:")
+        print(f"  Shared roots: {format_size(shared.total_freed)}")
+        for report in sorted(reports, key=lambda r: r.total_freed, reverse=True):
+            status = (" (stopped)" if report.cancelled
+                      else f" (error: {report.error})" if report.error else "")
+            print(f"  {report.home}: {format_size(report.total_freed)}{status}")
+        if find_large_files:
+            largest = heapq.nlargest(top, (f for r in reports for f in r.large_files),
+                                     key=lambda f: f[1])
+            if largest:
+                print("Largest files across all homes:")
+                for path, size in largest:
+                    print(f"    {format_size(size)} - {path}")
+        
+        if shared.dry_run:
+            print("(This was a dry run - no files were actually deleted)")
+        if cancelled and self.checkpoint_path is not None:
+            print("Run again with --resume to continue where it stopped")
+        shared.close_journal(cancelled)
+        shared.emit("complete", dry_run=shared.dry_run, total_freed=total, categories=categories,
+                    homes={r.home: r.total_freed for r in reports},
+                    disk_freed=shared.disk_freed, cancelled=cancelled)
+        if cancelled:
+            raise CleaningCancelled()
+
+
+class WatchEvent(NamedTuple):
+    """One change reported by a WatchBackend.
+
+    kind is "changed" (a file's contents or times), "created", "removed",
+    or "overflow" when the backend has dropped events and everything it
+    watches must be rescanned. path is the entry that changed, or the
+    watched directory itself when that directory is removed.
+    """
+    kind: str
+    path: str = ''
+    is_dir: bool = False
+
+
+class WatchBackend:
+    """Source of file system events for an IndexWatcher.
+
+    A backend either watches one directory at a time, and add() is called
+    for every directory below a root, or watches whole trees (recursive),
+    and add() is only called for the roots. add() returns False once the
+    system's limit on watches has been reached.
+    """
+
+    recursive = False
+
+    def add(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def remove(self, path: str):
+        """Stop watching path and every directory below it"""
+
+    def read(self, timeout: float) -> List[WatchEvent]:
+        """The events that arrive within timeout seconds, or [] if none do"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(WatchBackend):
+    """Linux inotify through libc, with one watch per directory.
+
+    The number of watches is limited by fs.inotify.max_user_watches, and a
+    full event queue (fs.inotify.max_queued_events) is reported as overflow.
+    """
+
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_EXCL_UNLINK = 0x04000000
+    IN_ISDIR = 0x40000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+            | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._paths: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+
+    def add(self, path: str) -> bool:
+        wd = self._add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                return False
+            raise OSError(code, os.strerror(code), path)
+        # A directory that was moved keeps its watch, now under the new path
+        old = self._paths.get(wd)
+        if old is not None and self._watches.get(old) == wd:
+            del self._watches[old]
+        self._paths[wd] = path
+        self._watches[path] = wd
+        return True
+
+    def remove(self, path: str):
+        prefix = path.rstrip(os.sep) + os.sep
+        for watched in [p for p in self._watches if p == path or p.startswith(prefix)]:
+            wd = self._watches.pop(watched)
+            del self._paths[wd]
+            self._rm_watch(self._fd, wd)  # fails harmlessly if the kernel has dropped it
+
+    def read(self, timeout: float) -> List[WatchEvent]:
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self._fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append(WatchEvent("overflow"))
+                continue
+            directory = self._paths.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                # The directory is gone, so is its watch
+                del self._paths[wd]
+                if self._watches.get(directory) == wd:
+                    del self._watches[directory]
+            elif mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                events.append(WatchEvent("removed", directory, True))
+            elif name:  # nameless events are about the watched directory's own inode
+                is_dir = bool(mask & self.IN_ISDIR)
+                path = os.path.join(directory, name)
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    events.append(WatchEvent("created", path, is_dir))
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    events.append(WatchEvent("removed", path, is_dir))
+                else:
+                    events.append(WatchEvent("changed", path, is_dir))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def watch_backend() -> WatchBackend:
+    """The file system event backend for this platform; raises OSError if there is none"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyBackend()
+        except AttributeError:  # a libc without inotify
+            raise OSError(errno.ENOSYS, "inotify is not available") from None
+    # FSEvents would go here for macOS, as a recursive backend
+    raise OSError(errno.ENOSYS, f"no file system event backend for {sys.platform}")
+
+
+class IndexWatcher:
+    """Keeps the scan index current for a set of roots from file system events.
+
+    Each root is first walked once on the watcher's thread, every directory
+    watched and then summarized afresh, after which the index trusts its
+    rows for that root (ScanIndex.trust()): scans answer directories from
+    memory without lstat'ing them. An event invalidates its directory right
+    away, but the directory is only summarized again once events have been
+    quiet for `debounce` seconds (at most MAX_DELAY after the first), so a
+    burst of changes costs one listing per directory. New directories are
+    walked and watched, removed ones forgotten.
+
+    When the backend overflows, every root goes back to the ordinary mtime
+    checks until it has been walked again. A root that runs into the watch
+    limit stays on them.
+    """
+
+    DEBOUNCE = 0.5
+    MAX_DELAY = 5.0
+
+    def __init__(self, index: ScanIndex, roots: Iterable[Union[str, Path]],
+                 backend: Optional[WatchBackend] = None, debounce: float = DEBOUNCE):
+        self.index = index
+        self.roots = outermost_paths(roots)
+        self.backend = backend
+        self.debounce = debounce
+        # Set once every root has been walked for the first time
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dirty: Dict[str, None] = {}
+        self._rescan: set = set()
+        self._first = self._last = 0.0
+
+    @property
+    def live(self) -> List[str]:
+        """The roots scans currently answer from memory"""
+        return [root for root in self.roots if self.index.is_trusted(root)]
+
+    def start(self):
+        """Start watching on a background thread; raises OSError without a backend"""
+        if self.backend is None:
+            self.backend = watch_backend()
+        self._thread = threading.Thread(target=self._run, name="cache-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for root in self.roots:
+            self.index.distrust(root)
+        if self.backend is not None:
+            self.backend.close()
+
+    def _run(self):
+        try:
+            for root in self.roots:
+                if self._stop.is_set():
+                    return
+                self._rescan_root(root)
+            self.ready.set()
+            while not self._stop.is_set():
+                timeout = 1.0
+                if self._dirty or self._rescan:
+                    timeout = min(timeout, max(0.0, self._due() - time.monotonic()))
+                for event in self.backend.read(timeout):
+                    self._handle(event)
+                if (self._dirty or self._rescan) and time.monotonic() >= self._due():
+                    self._apply()
+        except Exception as e:
+            # Never leave the index trusting roots nobody is watching any more
+            for root in self.roots:
+                self.index.distrust(root)
+            print(f"Warning: Stopped watching for changes ({e})", file=sys.stderr)
+        finally:
+            self.ready.set()
+
+    def _due(self) -> float:
+        return min(self._last + self.debounce, self._first + self.MAX_DELAY)
+
+    def _covers(self, path: str) -> bool:
+        return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+                   for root in self.roots)
+
+    def _handle(self, event: WatchEvent):
+        now = time.monotonic()
+        if not (self._dirty or self._rescan):
+            self._first = now
+        self._last = now
+        if event.kind == "overflow":
+            for root in self.roots:
+                self.index.distrust(root)
+            self._rescan = set(self.roots)
+            self._dirty = {}
+            return
+        if event.is_dir:
+            if event.kind == "removed":
+                self.index.forget(event.path)
+                self.backend.remove(event.path)
+            elif event.kind == "created":
+                self.index.invalidate(event.path)
+                self._rescan.add(event.path)
+            else:
+                return  # a subdirectory's own times; its contents have their own events
+        parent = os.path.dirname(event.path)
+        if self._covers(parent):
+            self.index.invalidate(parent)
+            self._dirty[parent] = None
+
+    def _apply(self):
+        rescan, self._rescan = self._rescan, set()
+        dirty, self._dirty = self._dirty, {}
+        walked = outermost_paths(rescan)
+        for path in walked:
+            if path in self.roots:
+                self._rescan_root(path)
+            else:
+                self.index.forget(path)
+                try:
+                    if not self._walk(path):
+                        for root in self.roots:
+                            if path.startswith(root.rstrip(os.sep) + os.sep):
+                                self.index.distrust(root)
+                except OSError:
+                    pass  # already gone again
+        for path in dirty:
+            if any(path == w or path.startswith(w.rstrip(os.sep) + os.sep) for w in walked):
+                continue
+            try:
+                self.index.refresh(path)
+            except OSError:
+                self.index.forget(path)
+        self.index.flush()
+
+    def _rescan_root(self, root: str):
+        self.index.distrust(root)
+        self.index.forget(root)
+        try:
+            complete = self._walk(root)
+        except OSError:
+            return  # missing or unreadable, so it can't be watched
+        finally:
+            self.index.flush()
+        if not complete:
+            return
+        # Whatever changed during the walk has to be invalidated before the rows are trusted
+        for event in self.backend.read(0):
+            self._handle(event)
+        if root not in self._rescan:
+            self.index.trust(root)
+
+    def _walk(self, top: str) -> bool:
+        """Watch and summarize every directory below top; False unless all are watched.
+
+        Raises OSError if top itself can't be watched or listed.
+        """
+        watched = True
+        if self.backend.recursive:
+            watched = self.backend.add(top)
+        stack = [top]
+        while stack and not self._stop.is_set():
+            path = stack.pop()
+            try:
+                # Watched before it is listed, so no change can fall in between
+                if watched and not self.backend.recursive:
+                    watched = self.backend.add(path)
+                    if not watched:
+                        print(f"Warning: Ran out of file system watches in {top}, its "
+                              "directories will be checked on every scan", file=sys.stderr)
+                _, subdirs = self.index.refresh(path)
+            except OSError:
+                if path == top:
+                    raise
+                continue  # gone already, or unreadable
+            stack.extend(subdirs)
+        return watched and not self._stop.is_set()
+
+
+def default_socket_path(home_dir: Optional[Path] = None) -> Path:
+    """Where --serve listens by default, next to the scan index"""
+    return default_index_path(home_dir).with_name("daemon.sock")
+
+
+class RpcError(Exception):
+    """A JSON-RPC error response: code and message"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class RpcEvents(io.TextIOBase):
+    """EventStream target that sends each event line as a JSON-RPC "event" notification"""
+
+    def __init__(self, send: Callable[[str], None]):
+        self.send = send
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        # EventStream only ever writes whole lines of compact JSON
+        lines = [f'{{"jsonrpc":"2.0","method":"event","params":{line}}}'
+                 for line in text.split('\n') if line]
+        if lines:
+            try:
+                self.send('\n'.join(lines) + '\n')
+            except OSError:
+                pass  # the client hung up; its connection handler cancels the run
+        return len(text)
+
+
+class _RpcConnection(socketserver.StreamRequestHandler):
+    """One client connection: newline-delimited JSON-RPC 2.0 requests and responses"""
+
+    def setup(self):
+        super().setup()
+        self._write_lock = threading.Lock()
+
+    def send(self, text: str):
+        with self._write_lock:
+            self.wfile.write(text.encode('utf-8'))
+            self.wfile.flush()
+
+    def reply(self, request_id: Any, result: Any = None, error: Optional[RpcError] = None):
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            message["error"] = {"code": error.code, "message": str(error)}
+        else:
+            message["result"] = result
+        try:
+            self.send(json.dumps(message, ensure_ascii=False) + '\n')
+        except OSError:
+            pass  # the client went away
+
+    def handle(self):
+        daemon: CleanerDaemon = self.server.cleaner_daemon
+        runs = []
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.reply(None, error=RpcError(-32700, "Parse error"))
+                continue
+            try:
+                method = request["method"]
+                params = request.get("params") or {}
+                request_id = request.get("id")
+            except (KeyError, TypeError, AttributeError):
+                self.reply(None, error=RpcError(-32600, "Invalid request"))
+                continue
+            if method in daemon.RUN_METHODS:
+                # Runs answer when they finish; cancel and progress are served meanwhile
+                run = threading.Thread(target=self.call, args=(daemon, method, params, request_id),
+                                       daemon=True)
+                run.start()
+                runs.append(run)
+            else:
+                self.call(daemon, method, params, request_id)
+        # A client that hangs up takes its run with it
+        if any(run.is_alive() for run in runs):
+            daemon.cleaner.cancel()
+        for run in runs:
+            run.join()
+
+    def call(self, daemon: 'CleanerDaemon', method: str, params: Dict[str, Any], request_id: Any):
+        try:
+            result = daemon.dispatch(method, params, self.send)
+        except RpcError as e:
+            self.reply(request_id, error=e)
+        except Exception as e:
+            self.reply(request_id, error=RpcError(-32000, str(e)))
+        else:
+            if request_id is not None:  # notifications get no response
+                self.reply(request_id, result)
+
+
+class _RpcServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CleanerDaemon:
+    """Serves one long-lived cleaner over JSON-RPC 2.0 on a Unix domain socket.
+
+    Each request and response is one line of JSON. Methods:
+
+    - scan / clean: a dry or real run() with the options in params
+      (skip_trash, skip_maintenance, find_large_files, min_size_mb, top,
+      verbose, resume); its events are sent to the calling connection as
+      "event" notifications, and the result is the run's totals
+    - cancel: stop the current run at its next batch boundary
+    - progress: the current run's ProgressSnapshot, or null
+    - reclaimable: what a scan of every category would free, without its
+      output or events, and which roots were answered from watched rows
+    - disk_usage: usage of the volumes holding params["paths"] (default /)
+    - shutdown: stop serving
+
+    The cleaner's scan index, with the rows it has loaded, and its walker
+    and unlink threads stay warm between requests, so a repeat scan only
+    lstat's the directories the index already knows. With watch=True an
+    IndexWatcher keeps the index current for the cache roots, and a repeat
+    scan doesn't even do that. One run at a time.
+    """
+
+    RUN_METHODS = ('scan', 'clean', 'reclaimable')
+
+    def __init__(self, cleaner: MacOSCacheCleaner, path: Union[str, Path], watch: bool = False):
+        self.cleaner = cleaner
+        self.path = Path(path)
+        self.watch = watch
+        self.watcher: Optional[IndexWatcher] = None
+        self._run_lock = threading.Lock()
+        self._server: Optional[_RpcServer] = None
+
+    def _bind(self) -> _RpcServer:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(os.fspath(self.path))
+            except OSError:
+                self.path.unlink()  # left behind by a daemon that didn't exit cleanly
+            else:
+                raise RuntimeError(f"A cleaner daemon is already listening on {self.path}")
+            finally:
+                probe.close()
+        old_umask = os.umask(0o077)  # only this user may connect
+        try:
+            server = _RpcServer(os.fspath(self.path), _RpcConnection)
+        finally:
+            os.umask(old_umask)
+        server.cleaner_daemon = self
+        return server
+
+    def serve_forever(self):
+        self._server = self._bind()
+        print(f"Listening on {self.path}", file=sys.stderr)
+        if self.watch:
+            self.start_watcher()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+            if self.watcher is not None:
+                self.watcher.stop()
+            if self.cleaner.index is not None:
+                self.cleaner.index.close()
+
+    def start_watcher(self):
+        """Keep the scan index current for every cache root from file system events"""
+        if self.cleaner.index is None:
+            print("Warning: Not watching for changes without the scan index", file=sys.stderr)
+            return
+        watcher = IndexWatcher(self.cleaner.index, self.cleaner.cache_dirs)
+        try:
+            watcher.start()
+        except OSError as e:
+            print(f"Warning: Not watching for changes ({e})", file=sys.stderr)
+            return
+        self.watcher = watcher
+
+    def stop(self):
+        """Cancel the current run and stop serving; safe from a signal handler"""
+        self.cleaner.cancel()
+        if self._server is not None:
+            # shutdown() waits for serve_forever(), so it can't run on the serving thread
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def dispatch(self, method: str, params: Dict[str, Any], send: Callable[[str], None]) -> Any:
+        if method == 'reclaimable':
+            return self.reclaimable()
+        if method in self.RUN_METHODS:
+            return self.run(method == 'scan', params, send)
+        if method == 'cancel':
+            running = self._run_lock.locked()
+            if running:
+                self.cleaner.cancel()
+            return running
+        if method == 'progress':
+            progress = self.cleaner.progress
+            return progress.snapshot()._asdict() if progress is not None else None
+        if method == 'disk_usage':
+            volumes = self.cleaner.disk.volumes(params.get('paths') or ['/'], fresh=True)
+            return [dict(usage._asdict(), percent=usage.percent) for usage in volumes.values()]
+        if method == 'shutdown':
+            self.stop()
+            return True
+        raise RpcError(-32601, f"Unknown method: {method}")
+
+    def run(self, dry_run: bool, params: Dict[str, Any], send: Callable[[str], None]
+            ) -> Dict[str, Any]:
+        if not self._run_lock.acquire(blocking=False):
+            raise RpcError(-32000, "A scan or clean is already running")
+        cleaner = self.cleaner
+        try:
+            events = EventStream(RpcEvents(send))
+            cleaner.start_run(dry_run, verbose=bool(params.get('verbose')),
+                              resume=bool(params.get('resume')), events=events)
+            cancelled = False
+            # One run at a time, so borrowing the process-wide stdout is safe
+            with contextlib.redirect_stdout(EventLog(events)):
+                try:
+                    cleaner.run(skip_trash=bool(params.get('skip_trash')),
+                                skip_maintenance=bool(params.get('skip_maintenance')),
+                                find_large_files=bool(params.get('find_large_files')),
+                                min_size_mb=int(params.get('min_size_mb', 100)),
+                                top=int(params.get('top', 10)))
+                except CleaningCancelled:
+                    cancelled = True
+            try:
+                events.flush()
+            except OSError:
+                pass
+            return {"dry_run": dry_run, "total_freed": cleaner.total_freed,
+                    "categories": cleaner.category_freed, "disk_freed": cleaner.disk_freed,
+                    "cancelled": cancelled}
+        finally:
+            cleaner.events = None
+            self._run_lock.release()
+
+    def reclaimable(self) -> Dict[str, Any]:
+        """Dry-run every category quietly; served from memory for the watched roots"""
+        if not self._run_lock.acquire(blocking=False):
+            raise RpcError(-32000, "A scan or clean is already running")
+        cleaner = self.cleaner
+        try:
+            cleaner.start_run(True)
+            cancelled = False
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    cleaner.clean_categories()
+                except CleaningCancelled:
+                    cancelled = True
+            return {"total_freed": cleaner.total_freed, "categories": cleaner.category_freed,
+                    "live": self.watcher.live if self.watcher is not None else [],
+                    "cancelled": cancelled}
+        finally:
+            self._run_lock.release()
 
 
 def main():
@@ -376,20 +4001,156 @@ def main():
                        help='Skip running macOS maintenance scripts')
     parser.add_argument('--find-large-files', action='store_true',
                        help='Scan for large files that could be deleted')
+    parser.add_argument('--min-size', type=int, default=100, metavar='MB',
+                       help='Size threshold for --find-large-files, in MB (default: 100)')
+    parser.add_argument('--top', type=int, default=10, metavar='N',
+                       help='Number of large files to list (default: 10)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                       help='Number of threads used to walk and delete in each cache directory (default: 1)')
+    parser.add_argument('--parallel-categories', type=int, default=1, metavar='N',
+                       help='Clean up to N independent categories at once, with maintenance '
+                            'running alongside (default: 1, one after another)')
+    parser.add_argument('--accounting', choices=SpaceAccounting.MODES, default='apparent',
+                       help='Count file sizes (apparent) or allocated blocks with hard links '
+                            'counted once (allocated) (default: apparent)')
+    parser.add_argument('--safety-rules', type=Path, metavar='FILE',
+                       help='JSON or TOML file with extra "protected" paths and "exclude" names')
+    parser.add_argument('--roots', type=Path, metavar='FILE',
+                       help='JSON or TOML file with the homes to clean and the roots of each category')
+    parser.add_argument('--homes', nargs='+', metavar='HOME',
+                       help="Clean these home directories in one run (paths or globs such as "
+                            "'/Users/*'), with the shared roots walked once")
+    parser.add_argument('--processes', type=int, metavar='N',
+                       help='Worker processes cleaning homes at once with --homes '
+                            '(default: one per CPU)')
+    parser.add_argument('--policy', type=Path, metavar='FILE',
+                       help='JSON or TOML file with retention rules per cache directory')
+    parser.add_argument('--max-cache-size', type=int, metavar='MB',
+                       help='Keep the npm, Yarn, pip and Xcode DerivedData caches under MB each, '
+                            'deleting least recently used files instead of those over 7 days old')
+    parser.add_argument('--json-events', action='store_true',
+                       help='Write one JSON event per line to stdout instead of plain text')
+    parser.add_argument('--plan-out', type=Path, metavar='FILE',
+                       help='With --dry-run, save what would be deleted as a plan file')
+    parser.add_argument('--apply-plan', type=Path, metavar='FILE',
+                       help='Delete the entries of a saved plan that are unchanged, '
+                            'instead of scanning')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip the roots and subtrees an interrupted run already finished')
+    parser.add_argument('--serve', nargs='?', type=Path, const=default_socket_path(),
+                       metavar='SOCKET',
+                       help='Keep running and serve scan/clean requests as JSON-RPC on a Unix '
+                            'socket, for the desktop app (default: next to the scan index)')
+    parser.add_argument('--watch', action='store_true',
+                       help='With --serve, keep the scan index current from file system events '
+                            '(inotify on Linux), so scans skip unchanged directories unchecked')
+    parser.add_argument('--no-index', action='store_true',
+                       help='Do not use or update the persistent scan index')
+    parser.add_argument('--rebuild-index', action='store_true',
+                       help='Discard the scan index and rebuild it from a full scan')
     
     args = parser.parse_args()
     
-    try:
-        cleaner = MacOSCacheCleaner(dry_run=args.dry_run, verbose=args.verbose)
-        cleaner.run(skip_trash=args.skip_trash, 
-                   skip_maintenance=args.skip_maintenance,
-                   find_large_files=args.find_large_files)
-    except KeyboardInterrupt:
-        print("\n❌ Cleaning cancelled by user")
-        sys.exit(1)
-    except Exception as e:
-        print(f"\n❌ Error during cleaning: {e}")
-        sys.exit(1)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.top < 1:
+        parser.error('--top must be at least 1')
+    if args.parallel_categories < 1:
+        parser.error('--parallel-categories must be at least 1')
+    if args.max_cache_size is not None and args.max_cache_size < 0:
+        parser.error('--max-cache-size cannot be negative')
+    if args.plan_out and not args.dry_run:
+        parser.error('--plan-out requires --dry-run')
+    if args.apply_plan and (args.dry_run or args.plan_out):
+        parser.error('--apply-plan cannot be combined with --dry-run or --plan-out')
+    if args.processes is not None and args.processes < 1:
+        parser.error('--processes must be at least 1')
+    if args.processes is not None and not args.homes:
+        parser.error('--processes requires --homes')
+    if args.serve and (args.homes or args.plan_out or args.apply_plan or args.json_events):
+        parser.error('--serve cannot be combined with --homes, --plan-out, --apply-plan '
+                     'or --json-events')
+    if args.watch and not args.serve:
+        parser.error('--watch requires --serve')
+    if args.watch and args.no_index:
+        parser.error('--watch keeps the scan index current, so it needs it (drop --no-index)')
+    homes = expand_homes(args.homes) if args.homes else None
+    if args.homes:
+        if not homes:
+            parser.error('--homes matched no directories')
+        if args.plan_out or args.apply_plan:
+            parser.error('--homes cannot be combined with --plan-out or --apply-plan')
+    
+    events = EventStream(sys.stdout) if args.json_events else None
+    output = (contextlib.redirect_stdout(EventLog(events)) if events is not None
+              else contextlib.nullcontext())
+    
+    with output:
+        try:
+            roots = (RootRegistry.from_file(args.roots, homes) if args.roots
+                     else RootRegistry(homes) if homes else None)
+            options = dict(dry_run=args.dry_run, verbose=args.verbose, jobs=args.jobs,
+                           index_path=None if args.no_index else default_index_path(),
+                           rebuild_index=args.rebuild_index,
+                           accounting=args.accounting,
+                           rules_path=args.safety_rules,
+                           events=events,
+                           parallel_categories=args.parallel_categories,
+                           checkpoint_path=(None if args.apply_plan
+                                            else default_checkpoint_path()),
+                           resume=args.resume,
+                           policy_path=args.policy,
+                           max_cache_size=(None if args.max_cache_size is None
+                                           else args.max_cache_size * 1024 * 1024))
+            if homes:
+                cleaner = FleetCleaner(roots, processes=args.processes, **options)
+            else:
+                cleaner = MacOSCacheCleaner(roots=roots, **options)
+            
+            if args.serve:
+                daemon = CleanerDaemon(cleaner, args.serve, watch=args.watch)
+                signal.signal(signal.SIGINT, lambda signum, frame: daemon.stop())
+                signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+                daemon.serve_forever()
+                return
+            
+            # SIGINT/SIGTERM stop the run at the next batch boundary; a second Ctrl-C aborts
+            def stop(signum, frame):
+                cleaner.cancel()
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGINT, stop)
+            signal.signal(signal.SIGTERM, stop)
+            
+            if args.apply_plan:
+                cleaner.apply_plan(DeletionPlan.load(args.apply_plan))
+                return
+            if args.plan_out:
+                cleaner.deletion_plan = DeletionPlan()
+            cleaner.run(skip_trash=args.skip_trash, 
+                       skip_maintenance=args.skip_maintenance,
+                       find_large_files=args.find_large_files,
+                       min_size_mb=args.min_size,
+                       top=args.top)
+            if args.plan_out:
+                cleaner.deletion_plan.save(args.plan_out)
+                print(f"📋 Saved a plan of {len(cleaner.deletion_plan)} entries to {args.plan_out}")
+        except CleaningCancelled:
+            if events is not None:
+                events.emit("error", message="Cleaning stopped")
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print("\n❌ Cleaning cancelled by user")
+            if events is not None:
+                events.emit("error", message="Cleaning cancelled by user")
+            sys.exit(1)
+        except Exception as e:
+            print(f"\n❌ Error during cleaning: {e}")
+            if events is not None:
+                events.emit("error", message=str(e))
+            sys.exit(1)
+        finally:
+            if events is not None:
+                events.flush()
 
 
 if __name__ == "__main__":
@@ -16,11 +16,101 @@ import queue
 import sys
 import os
 from pathlib import Path
+import shutil
 import subprocess
 import time
-from cache_cleaner import MacOSCacheCleaner
+from cache_cleaner import (MacOSCacheCleaner, CleaningCancelled, DeletionPlan, DiskMonitor,
+                           default_checkpoint_path, default_index_path, default_plan_path,
+                           format_duration, format_size)
+
+class OutputLog:
+    """The full text of the output pane, on disk, while the widget keeps only the tail.
+
+    Text is appended to `path`. Past max_bytes the file is rotated to
+    path.1, path.2, ... up to `backups` files, and the oldest is dropped, so
+    the log never takes more than (backups + 1) * max_bytes. export() copies
+    the files out oldest first.
+    """
+
+    def __init__(self, path, max_bytes=8 * 1024 * 1024, backups=3):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # Set once a rotation has dropped the oldest part of the current log
+        self.truncated = False
+        self._file = None
+        self.clear()
+
+    def _backup(self, n):
+        return self.path.with_name(f"{self.path.name}.{n}")
+
+    def clear(self):
+        """Start an empty log, removing the previous run's files"""
+        self.close()
+        self.truncated = False
+        for path in [self.path] + [self._backup(n) for n in range(1, self.backups + 1)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                break
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'w', encoding='utf-8')
+        except OSError:
+            self._file = None
+
+    @property
+    def available(self):
+        """Whether the log is being written; without it only the widget's lines are kept"""
+        return self._file is not None
+
+    def write(self, text):
+        if self._file is None:
+            return
+        try:
+            self._file.write(text)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            self.close()
+
+    def _rotate(self):
+        self._file.close()
+        if self._backup(self.backups).exists():
+            self.truncated = True
+        for n in range(self.backups, 1, -1):
+            if self._backup(n - 1).exists():
+                os.replace(self._backup(n - 1), self._backup(n))
+        os.replace(self.path, self._backup(1))
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def export(self, target):
+        """Copy the whole log, oldest text first, into the open text file `target`"""
+        self._file.flush()
+        if self.truncated:
+            target.write("[Earlier output was dropped to keep the log size bounded]\n")
+        for path in [self._backup(n) for n in range(self.backups, 0, -1)] + [self.path]:
+            if path.exists():
+                with open(path, encoding='utf-8') as f:
+                    shutil.copyfileobj(f, target)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 
 class CacheCleanerGUI:
+    # Message pump: messages applied per tick, and the delay before the next tick
+    # with a backlog left over or with the queue drained
+    QUEUE_BATCH = 500
+    POLL_BUSY_MS = 10
+    POLL_IDLE_MS = 100
+    # Lines kept in the output pane; the full output goes to OutputLog
+    OUTPUT_LINES = 5000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("macOS Cache Cleaner")
@@ -35,6 +125,8 @@ class CacheCleanerGUI:
         self.cleaning_thread = None
         self.is_cleaning = False
         self.message_queue = queue.Queue()
+        self.disk = DiskMonitor()
+        self.output_log = OutputLog(default_index_path().with_name("gui_output.log"))
         
         # Create GUI
         self.create_widgets()
@@ -150,6 +242,7 @@ class CacheCleanerGUI:
         self.skip_trash_var = tk.BooleanVar(value=False)
         self.skip_maintenance_var = tk.BooleanVar(value=False)
         self.find_large_files_var = tk.BooleanVar(value=False)
+        self.record_plan_var = tk.BooleanVar(value=False)
         
         # Create checkboxes in a grid
         options_grid = ttk.Frame(options_frame)
@@ -169,6 +262,9 @@ class CacheCleanerGUI:
         
         ttk.Checkbutton(options_grid, text="🔍 Find large files", 
                        variable=self.find_large_files_var).grid(row=2, column=0, sticky="w", pady=(5, 0))
+        
+        ttk.Checkbutton(options_grid, text="📋 Record scan for Apply Last Scan", 
+                       variable=self.record_plan_var).grid(row=2, column=1, sticky="w", pady=(5, 0))
 
     def create_action_buttons_frame(self):
         """Create action buttons"""
@@ -197,6 +293,10 @@ class CacheCleanerGUI:
                                         style="Accent.TButton")
         self.clean_deep_btn.pack(side="left")
         
+        self.apply_scan_btn = ttk.Button(quick_buttons, text="✅ Apply Last Scan", 
+                                        command=self.apply_scan)
+        self.apply_scan_btn.pack(side="left", padx=(10, 0))
+        
         # Main action frame
         action_frame = ttk.Frame(buttons_frame)
         action_frame.pack(fill="x")
@@ -226,9 +326,12 @@ class CacheCleanerGUI:
         progress_frame = ttk.LabelFrame(self.root, text="Progress", padding=10)
         progress_frame.pack(fill="x", padx=20, pady=10)
         
-        # Progress bar
+        # Progress bar: indeterminate while the work is estimated, then the fraction done
         self.progress = ttk.Progressbar(progress_frame, mode='indeterminate')
-        self.progress.pack(fill="x", pady=(0, 10))
+        self.progress.pack(fill="x", pady=(0, 5))
+        
+        self.progress_detail = ttk.Label(progress_frame, text="", foreground="#666666")
+        self.progress_detail.pack(fill="x", pady=(0, 5))
         
         # Status labels
         status_frame = ttk.Frame(progress_frame)
@@ -267,20 +370,7 @@ class CacheCleanerGUI:
     def update_disk_info(self):
         """Update disk usage information"""
         try:
-            result = subprocess.run(['df', '-h', '/'], capture_output=True, text=True)
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                parts = lines[1].split()
-                if len(parts) >= 6:
-                    filesystem = parts[0]
-                    size = parts[1]
-                    used = parts[2]
-                    available = parts[3]
-                    percent = parts[4]
-                    mount = parts[5]
-                    
-                    disk_text = f"💾 {filesystem}: {used} used of {size} ({percent} full) - {available} available"
-                    self.disk_info.config(text=disk_text)
+            self.disk_info.config(text=f"💾 {self.disk.usage('/').describe()}")
         except Exception as e:
             self.disk_info.config(text=f"Error getting disk info: {e}")
 
@@ -316,21 +406,31 @@ class CacheCleanerGUI:
             return
             
         # Clear output
-        self.output_text.delete(1.0, tk.END)
+        self.clear_output()
         
         # Update UI state
         self.is_cleaning = True
         self.start_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
-        self.progress.start(10)
+        self.start_progress_bar()
         
         # Create cleaner instance
         self.cleaner = GUICleanerWrapper(
             dry_run=self.dry_run_var.get(),
             verbose=self.verbose_var.get(),
-            message_queue=self.message_queue
+            message_queue=self.message_queue,
+            index_path=default_index_path(),
+            # A run stopped with the Stop button picks up where it left off
+            checkpoint_path=default_checkpoint_path(),
+            resume=True
         )
         
+        # A scan can record what it would delete so it can be applied without
+        # rescanning. Only on request: recording needs every file name, so the
+        # scan can't size stale directories from the scan index's summaries.
+        if self.cleaner.dry_run and self.record_plan_var.get():
+            self.cleaner.deletion_plan = DeletionPlan()
+        
         # Start cleaning thread
         self.cleaning_thread = threading.Thread(
             target=self.run_cleaning,
@@ -348,61 +448,186 @@ class CacheCleanerGUI:
         try:
             self.message_queue.put(("status", "Starting cleanup..."))
             self.cleaner.run(skip_trash, skip_maintenance, find_large_files)
+            if self.cleaner.deletion_plan is not None:
+                self.cleaner.deletion_plan.save(default_plan_path())
+                self.message_queue.put(("output", "Use \"Apply Last Scan\" to delete exactly what this scan found"))
             self.message_queue.put(("complete", f"Cleanup complete! Total freed: {self.cleaner.format_size(self.cleaner.total_freed)}"))
+        except CleaningCancelled:
+            self.message_queue.put(("stopped", f"Cleanup stopped after freeing {self.cleaner.format_size(self.cleaner.total_freed)}. "
+                                               "Start again to resume where it stopped."))
         except Exception as e:
             self.message_queue.put(("error", f"Error during cleanup: {e}"))
         finally:
             self.message_queue.put(("finished", ""))
 
+    def apply_scan(self):
+        """Delete what the last Scan Only found, re-checking each entry instead of rescanning"""
+        if self.is_cleaning:
+            return
+        try:
+            plan = DeletionPlan.load(default_plan_path())
+        except (OSError, ValueError):
+            messagebox.showinfo("Apply Last Scan", "Run \"Scan Only\" with \"Record scan for Apply Last Scan\" "
+                                                   "checked first to find what can be deleted.")
+            return
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(plan.created))
+        if not messagebox.askyesno("Apply Last Scan",
+                                   f"Delete the {len(plan)} items ({format_size(plan.size)}) "
+                                   f"found by the scan of {created}?\n\n"
+                                   "Anything that changed since the scan is left alone."):
+            return
+        
+        self.clear_output()
+        self.is_cleaning = True
+        self.start_btn.config(state="disabled")
+        self.stop_btn.config(state="normal")
+        self.start_progress_bar()
+        self.cleaner = GUICleanerWrapper(
+            verbose=self.verbose_var.get(),
+            message_queue=self.message_queue,
+            index_path=default_index_path()
+        )
+        self.cleaning_thread = threading.Thread(target=self.run_apply, args=(plan,), daemon=True)
+        self.cleaning_thread.start()
+
+    def run_apply(self, plan):
+        """Apply a deletion plan"""
+        try:
+            self.cleaner.apply_plan(plan)
+            os.remove(default_plan_path())
+            self.message_queue.put(("complete", f"Scan applied! Total freed: {self.cleaner.format_size(self.cleaner.total_freed)}"))
+        except CleaningCancelled:
+            self.message_queue.put(("stopped", f"Stopped after freeing {self.cleaner.format_size(self.cleaner.total_freed)}."))
+        except Exception as e:
+            self.message_queue.put(("error", f"Error applying scan: {e}"))
+        finally:
+            self.message_queue.put(("finished", ""))
+
     def stop_cleaning(self):
         """Stop the cleaning process"""
         if self.cleaning_thread and self.cleaning_thread.is_alive():
-            # Note: Python threads can't be forcefully stopped safely
-            # This is a limitation, but the cleaning operations are generally quick
-            messagebox.showinfo("Stop Cleaning", 
-                               "Cleaning operations cannot be stopped mid-process for safety.\n" +
-                               "Please wait for the current operation to complete.")
+            # The cleaner stops at the next directory or deletion batch and
+            # journals what it finished, so nothing is cut off mid-file
+            self.cleaner.cancel()
+            self.stop_btn.config(state="disabled")
+            self.current_action.config(text="Stopping after the current batch...")
 
     def process_queue(self):
-        """Process messages from the cleaning thread"""
+        """Apply messages from the cleaning thread, at most QUEUE_BATCH per tick.
+
+        Output lines of a tick go into the text widget with one insert and one
+        scroll, and only the latest status and space-freed values are shown.
+        While a backlog remains the queue is polled again after POLL_BUSY_MS,
+        otherwise after POLL_IDLE_MS.
+        """
+        chunks = []  # text, tag, text, tag, ... for a single Text.insert
+        action = status = freed = progress = None
+        refresh_disk = finished = False
+        count = 0
         try:
-            while True:
+            while count < self.QUEUE_BATCH:
                 message_type, message = self.message_queue.get_nowait()
+                count += 1
                 
                 if message_type == "output":
-                    self.append_output(message)
+                    self.add_output_chunk(chunks, message)
                 elif message_type == "status":
-                    self.current_action.config(text=message)
-                    self.status_bar.config(text=message)
+                    action = status = message
                 elif message_type == "space_freed":
-                    self.space_freed.config(text=f"Space freed: {message}")
+                    freed = message
+                elif message_type == "progress":
+                    progress = message
                 elif message_type == "complete":
-                    self.append_output(message, "success")
-                    self.current_action.config(text="Cleanup complete!")
-                    self.update_disk_info()
+                    self.add_output_chunk(chunks, message, "success")
+                    action = "Cleanup complete!"
+                    refresh_disk = True
+                elif message_type == "stopped":
+                    self.add_output_chunk(chunks, message, "warning")
+                    action = "Cleanup stopped"
+                    refresh_disk = True
                 elif message_type == "error":
-                    self.append_output(message, "error")
-                    self.current_action.config(text="Error occurred")
+                    self.add_output_chunk(chunks, message, "error")
+                    action = "Error occurred"
                 elif message_type == "finished":
-                    self.cleanup_finished()
+                    finished = True
                     
         except queue.Empty:
             pass
         
-        # Schedule next check
-        self.root.after(100, self.process_queue)
+        if chunks:
+            self.output_text.insert(tk.END, *chunks)
+            self.output_log.write("".join(chunks[::2]))
+            self.trim_output()
+            self.output_text.see(tk.END)
+        if action is not None:
+            self.current_action.config(text=action)
+        if status is not None:
+            self.status_bar.config(text=status)
+        if freed is not None:
+            self.space_freed.config(text=f"Space freed: {freed}")
+        if progress is not None:
+            self.show_progress(progress)
+        if refresh_disk:
+            self.disk.invalidate()
+            self.update_disk_info()
+        if finished:
+            self.cleanup_finished()
+        
+        # Come back sooner while messages are piling up
+        busy = count == self.QUEUE_BATCH
+        self.root.after(self.POLL_BUSY_MS if busy else self.POLL_IDLE_MS, self.process_queue)
+
+    @staticmethod
+    def add_output_chunk(chunks, text, tag="info"):
+        """Add a line to the pending insert, joined onto the last one if the tag matches"""
+        if chunks and chunks[-1] == tag:
+            chunks[-2] += text + "\n"
+        else:
+            chunks.extend((text + "\n", tag))
 
     def append_output(self, text, tag="info"):
         """Append text to the output area"""
         self.output_text.insert(tk.END, text + "\n", tag)
+        self.output_log.write(text + "\n")
+        self.trim_output()
         self.output_text.see(tk.END)
 
+    def trim_output(self):
+        """Drop the oldest lines of the output pane beyond OUTPUT_LINES"""
+        lines = int(self.output_text.index('end-1c').split('.')[0])
+        if lines > self.OUTPUT_LINES:
+            self.output_text.delete('1.0', f'{lines - self.OUTPUT_LINES + 1}.0')
+
+    def clear_output(self):
+        """Empty the output pane and start a new log for the next run"""
+        self.output_text.delete(1.0, tk.END)
+        self.output_log.clear()
+
+    def start_progress_bar(self):
+        """Animate the progress bar until the first progress estimate arrives"""
+        self.progress.config(mode='indeterminate', value=0)
+        self.progress_detail.config(text="")
+        self.progress.start(10)
+
+    def show_progress(self, progress):
+        """Show a ProgressSnapshot: the fraction done, files so far and the time left"""
+        if str(self.progress['mode']) != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate', maximum=100)
+        self.progress.config(value=progress.fraction * 100)
+        detail = f"{progress.files:,} of about {progress.total_files:,} files"
+        if progress.eta is not None and progress.fraction < 1:
+            detail += f" - about {format_duration(progress.eta)} left"
+        self.progress_detail.config(text=detail)
+
     def cleanup_finished(self):
         """Reset UI after cleaning is finished"""
         self.is_cleaning = False
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
-        self.progress.stop()
+        # Stopping resets the value, so a determinate bar keeps where it got to
+        if str(self.progress['mode']) == 'indeterminate':
+            self.progress.stop()
         self.status_bar.config(text="Ready")
 
     def open_logs(self):
@@ -418,8 +643,7 @@ class CacheCleanerGUI:
         if not hasattr(self, 'output_text'):
             return
             
-        content = self.output_text.get(1.0, tk.END)
-        if not content.strip():
+        if not self.output_text.get(1.0, tk.END).strip():
             messagebox.showwarning("Export", "No output to export")
             return
             
@@ -435,7 +659,11 @@ class CacheCleanerGUI:
                     f.write(f"macOS Cache Cleaner Report\n")
                     f.write(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
                     f.write("=" * 50 + "\n\n")
-                    f.write(content)
+                    # The pane holds only the last lines; the log has all of them
+                    if self.output_log.available:
+                        self.output_log.export(f)
+                    else:
+                        f.write(self.output_text.get(1.0, tk.END))
                 messagebox.showinfo("Export", f"Report exported to {filename}")
             except Exception as e:
                 messagebox.showerror("Export Error", f"Failed to export report: {e}")
@@ -444,9 +672,12 @@ class CacheCleanerGUI:
 class GUICleanerWrapper(MacOSCacheCleaner):
     """Wrapper for MacOSCacheCleaner that sends output to GUI"""
     
-    def __init__(self, dry_run=False, verbose=False, message_queue=None):
-        super().__init__(dry_run, verbose)
+    def __init__(self, dry_run=False, verbose=False, message_queue=None, index_path=None,
+                 checkpoint_path=None, resume=False):
+        super().__init__(dry_run, verbose, index_path=index_path,
+                         checkpoint_path=checkpoint_path, resume=resume)
         self.message_queue = message_queue
+        self.estimate_progress = True
         
     def print_message(self, message, msg_type="output"):
         """Send message to GUI queue"""
@@ -462,6 +693,41 @@ class GUICleanerWrapper(MacOSCacheCleaner):
             self.print_message(self.format_size(self.total_freed), "space_freed")
         return freed
         
+    def print_disk_usage(self, roots):
+        """Send volume usage to the output pane"""
+        try:
+            volumes = self.disk.volumes(roots)
+        except OSError:
+            return
+        self.print_message("💾 Current Disk Usage:")
+        for usage in volumes.values():
+            self.print_message(f"  {usage.describe()}")
+        
+    def apply_plan(self, plan):
+        """Override to send the outcome to the output pane"""
+        self.print_message(f"📋 Applying the last scan: {len(plan)} items", "status")
+        freed = super().apply_plan(plan)
+        for category, category_freed in self.category_freed.items():
+            self.print_message(f"  {category}: {self.format_size(category_freed)}")
+        self.print_message(self.format_size(self.total_freed), "space_freed")
+        return freed
+        
+    def report_progress(self, progress):
+        """Send progress to the progress bar; already throttled by the core"""
+        self.print_message(progress, "progress")
+        
+    def report_large_file(self, path, size):
+        """Stream large files to the output pane as they are found"""
+        self.print_message(f"Large file: {self.format_size(size)} - {path}")
+        
+    CATEGORY_ICONS = {
+        "System Caches": "🖥️ ",
+        "Browser Data": "🌐",
+        "Temporary Files": "🗑️ ",
+        "Development Caches": "💻",
+        "Log Files": "📋",
+    }
+        
     def run(self, skip_trash=False, skip_maintenance=False, find_large_files=False):
         """Override run method with GUI updates"""
         self.print_message("🧹 macOS Silicon Cache & Temp File Cleaner")
@@ -470,53 +736,65 @@ class GUICleanerWrapper(MacOSCacheCleaner):
         if self.dry_run:
             self.print_message("🔍 DRY RUN MODE - No files will be deleted")
         
-        # Show disk usage
-        try:
-            result = subprocess.run(['df', '-h', '/'], capture_output=True, text=True)
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                self.print_message("💾 Current Disk Usage:")
-                self.print_message(f"  {lines[1]}")
-        except:
-            pass
-        
+        # Show disk usage for every volume a cache root lives on
+        all_roots = [root for roots in self.category_roots().values() for root in roots]
+        self.print_disk_usage([Path('/'), *all_roots])
         self.print_message("")
         
-        # Run cleaning operations
-        self.print_message("🖥️  Cleaning System Caches...", "status")
-        self.clean_system_caches()
+        if self.journal is not None and self.journal.finished:
+            self.print_message(f"↩️  Resuming the interrupted run, skipping "
+                               f"{len(self.journal.finished)} finished roots and subtrees")
+            self.print_message("")
         
-        self.print_message("🌐 Cleaning Browser Data...", "status") 
-        self.clean_browser_data()
-        
-        self.print_message("🗑️  Cleaning Temporary Files...", "status")
-        self.clean_temp_files()
-        
-        self.print_message("💻 Cleaning Development Caches...", "status")
-        self.clean_development_caches()
-        
-        self.print_message("📋 Cleaning Log Files...", "status")
-        self.clean_logs()
-        
-        if not skip_trash:
-            self.print_message("🗂️  Emptying Trash...", "status")
-            self.empty_trash()
+        cancelled = False
+        try:
+            if self.estimate_progress:
+                self.print_message("📏 Estimating the work...", "status")
+                self.start_progress(all_roots)
             
-        if not skip_maintenance:
-            self.print_message("🔧 Running macOS Maintenance...", "status")
-            self.run_maintenance_scripts()
+            # Run cleaning operations, walking overlapping roots only once
+            self.root_plan = self.plan_roots()
+            try:
+                for category, clean in self.category_cleaners().items():
+                    self.print_message(f"{self.CATEGORY_ICONS.get(category, '🧽')} "
+                                       f"Cleaning {category}...", "status")
+                    clean()
+            finally:
+                self.root_plan = None
+            if self.progress is not None:
+                self.progress.finish()
+                self.progress = None
             
-        if find_large_files:
-            self.print_message("🔍 Scanning for Large Files...", "status")
-            self.scan_large_files()
+            if not skip_trash:
+                self.cancel_token.check()
+                self.print_message("🗂️  Emptying Trash...", "status")
+                self.empty_trash()
+                
+            if not skip_maintenance:
+                self.print_message("🔧 Running macOS Maintenance...", "status")
+                self.run_maintenance_scripts()
+                
+            if find_large_files:
+                self.cancel_token.check()
+                self.print_message("🔍 Scanning for Large Files...", "status")
+                self.scan_large_files()
+        except CleaningCancelled:
+            cancelled = True
         
         self.print_message("")
         self.print_message("=" * 50)
-        self.print_message(f"🎉 Cleaning Complete!")
+        self.print_message(f"⏹️  Cleaning Stopped" if cancelled else f"🎉 Cleaning Complete!")
         self.print_message(f"Total space freed: {self.format_size(self.total_freed)}")
         
         if self.dry_run:
             self.print_message("(This was a dry run - no files were actually deleted)")
+        if self.journal is not None:
+            if cancelled:
+                self.journal.close()
+            else:
+                self.journal.complete()
+        if cancelled:
+            raise CleaningCancelled()
 
 
 def main():
@@ -2,11 +2,11 @@ const { app, BrowserWindow, ipcMain, dialog, shell } = require('electron');
 const path = require('path');
 const { spawn } = require('child_process');
 const fs = require('fs').promises;
+const net = require('net');
 const os = require('os');
 const AIService = require('./ai-service');
 
 let mainWindow;
-let cleanerProcess = null;
 let aiService = null;
 
 function createWindow() {
@@ -62,77 +62,188 @@ app.on('window-all-closed', () => {
 // IPC Handlers
 ipcMain.handle('get-disk-usage', async () => {
   try {
-    const result = await executeCommand('df', ['-H', '/']);
-    const lines = result.stdout.split('\n');
-    if (lines.length >= 2) {
-      const parts = lines[1].split(/\s+/);
-      if (parts.length >= 5) {
-        return {
-          total: parts[1],
-          used: parts[2],
-          available: parts[3],
-          percentage: parseInt(parts[4])
-        };
-      }
-    }
+    // statfs is a single syscall; no need to fork df and parse its output
+    const stats = await fs.statfs('/');
+    const total = stats.blocks * stats.bsize;
+    const used = (stats.blocks - stats.bfree) * stats.bsize;
+    const available = stats.bavail * stats.bsize;
+    return {
+      total: formatDiskSize(total),
+      used: formatDiskSize(used),
+      available: formatDiskSize(available),
+      percentage: Math.ceil(used * 100 / (used + available))
+    };
   } catch (error) {
     console.error('Error getting disk usage:', error);
   }
   return null;
 });
 
-ipcMain.handle('start-cleaning', async (event, options) => {
-  const pythonScript = path.join(__dirname, '..', 'cache_cleaner.py');
-  const args = [];
-  
-  if (options.dryRun) args.push('--dry-run');
-  if (options.verbose) args.push('--verbose');
-  if (options.skipTrash) args.push('--skip-trash');
-  if (options.skipMaintenance) args.push('--skip-maintenance');
-  if (options.findLargeFiles) args.push('--find-large-files');
+// Decimal units, matching what Finder and `df -H` show
+function formatDiskSize(bytes) {
+  const units = ['B', 'K', 'M', 'G', 'T'];
+  let size = bytes;
+  let unit = 0;
+  while (size >= 1000 && unit < units.length - 1) {
+    size /= 1000;
+    unit += 1;
+  }
+  return `${size < 10 ? size.toFixed(1) : Math.round(size)}${units[unit]}`;
+}
+
+// The cleaner runs as a long-lived daemon (cache_cleaner.py --serve) that keeps
+// its scan index and threads warm between runs; we talk JSON-RPC to it over a
+// Unix socket, one JSON object per line
+const daemonSocket = path.join(os.homedir(), 'Library', 'Application Support',
+                               'Cache Cleaner', 'daemon.sock');
+let daemon = null;
+let daemonConnecting = null;
+let daemonProcess = null;
 
+function connectDaemon() {
   return new Promise((resolve, reject) => {
-    cleanerProcess = spawn('python3', [pythonScript, ...args]);
-    let outputData = '';
-    let errorData = '';
-
-    cleanerProcess.stdout.on('data', (data) => {
-      const text = data.toString();
-      outputData += text;
-      event.sender.send('cleaning-output', text);
+    const socket = net.createConnection(daemonSocket);
+    socket.once('connect', () => {
+      socket.removeListener('error', reject);
+      resolve(socket);
     });
+    socket.once('error', reject);
+  });
+}
 
-    cleanerProcess.stderr.on('data', (data) => {
-      const text = data.toString();
-      errorData += text;
-      event.sender.send('cleaning-error', text);
+function spawnDaemon() {
+  const pythonScript = path.join(__dirname, '..', 'cache_cleaner.py');
+  daemonProcess = spawn('python3', [pythonScript, '--serve', daemonSocket]);
+  daemonProcess.stderr.on('data', (data) => console.log(`cleaner: ${data}`));
+  daemonProcess.on('exit', () => {
+    daemonProcess = null;
+  });
+}
+
+// Connect to the daemon, starting it if nobody is listening yet
+function getDaemon() {
+  if (daemon) return Promise.resolve(daemon);
+  if (!daemonConnecting) {
+    daemonConnecting = openDaemon().finally(() => {
+      daemonConnecting = null;
     });
+  }
+  return daemonConnecting;
+}
 
-    cleanerProcess.on('close', (code) => {
-      cleanerProcess = null;
-      if (code === 0) {
-        resolve({ success: true, output: outputData });
-      } else {
-        reject({ success: false, error: errorData });
+async function openDaemon() {
+  let socket;
+  try {
+    socket = await connectDaemon();
+  } catch (error) {
+    spawnDaemon();
+    for (let attempt = 0; !socket; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 100));
+      try {
+        socket = await connectDaemon();
+      } catch (retryError) {
+        if (attempt >= 50 || !daemonProcess) {
+          throw new Error(`Could not start the cleaner: ${retryError.message}`);
+        }
       }
-    });
+    }
+  }
 
-    cleanerProcess.on('error', (error) => {
-      cleanerProcess = null;
-      reject({ success: false, error: error.message });
-    });
+  const client = { socket, nextId: 1, pending: new Map(), onEvent: null };
+  let buffered = '';
+  socket.setEncoding('utf8');
+  // A chunk may end mid-line, so carry the tail over
+  socket.on('data', (data) => {
+    const lines = (buffered + data).split('\n');
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line) continue;
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        // Thrown here, it would escape the data handler and crash the main process
+        console.error('Ignoring malformed daemon message:', line);
+        continue;
+      }
+      if (message.method === 'event') {
+        if (client.onEvent) client.onEvent(message.params);
+      } else if (client.pending.has(message.id)) {
+        const { resolve, reject } = client.pending.get(message.id);
+        client.pending.delete(message.id);
+        if (message.error) reject(new Error(message.error.message));
+        else resolve(message.result);
+      }
+    }
+  });
+  socket.on('close', () => {
+    daemon = null;
+    for (const { reject } of client.pending.values()) {
+      reject(new Error('The cleaner stopped unexpectedly'));
+    }
+    client.pending.clear();
   });
+  daemon = client;
+  return client;
+}
+
+async function callDaemon(method, params = {}) {
+  const client = await getDaemon();
+  const id = client.nextId++;
+  return new Promise((resolve, reject) => {
+    client.pending.set(id, { resolve, reject });
+    client.socket.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+  });
+}
+
+let cleaningRunning = false;
+
+ipcMain.handle('start-cleaning', async (event, options) => {
+  const params = {
+    verbose: options.verbose,
+    skip_trash: options.skipTrash,
+    skip_maintenance: options.skipMaintenance,
+    find_large_files: options.findLargeFiles,
+    resume: options.resume
+  };
+  let errorData = '';
+
+  cleaningRunning = true;
+  try {
+    const client = await getDaemon();
+    client.onEvent = (cleanerEvent) => {
+      if (cleanerEvent.event === 'error') errorData += cleanerEvent.message + '\n';
+      event.sender.send('cleaning-event', cleanerEvent);
+    };
+    const summary = await callDaemon(options.dryRun ? 'scan' : 'clean', params);
+    if (summary.cancelled) {
+      return Promise.reject({ success: false, error: errorData || 'Cleaning stopped' });
+    }
+    return { success: true, summary };
+  } catch (error) {
+    event.sender.send('cleaning-error', error.message);
+    return Promise.reject({ success: false, error: errorData + error.message });
+  } finally {
+    cleaningRunning = false;
+    if (daemon) daemon.onEvent = null;
+  }
 });
 
 ipcMain.handle('stop-cleaning', async () => {
-  if (cleanerProcess) {
-    cleanerProcess.kill('SIGTERM');
-    cleanerProcess = null;
+  if (cleaningRunning) {
+    // The cleaner finishes the current batch, journals its progress for
+    // --resume and answers the running request with cancelled: true
+    await callDaemon('cancel');
     return true;
   }
   return false;
 });
 
+app.on('will-quit', () => {
+  // A daemon that was already running when the app started is left alone
+  if (daemonProcess) daemonProcess.kill('SIGTERM');
+});
+
 ipcMain.handle('export-report', async (event, content) => {
   const result = await dialog.showSaveDialog(mainWindow, {
     defaultPath: `cache-cleaner-report-${new Date().toISOString().split('T')[0]}.txt`,
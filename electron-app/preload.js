@@ -23,6 +23,9 @@ contextBridge.exposeInMainWorld('electronAPI', {
   onCleaningOutput: (callback) => {
     ipcRenderer.on('cleaning-output', (event, data) => callback(data));
   },
+  onCleaningEvent: (callback) => {
+    ipcRenderer.on('cleaning-event', (event, data) => callback(data));
+  },
   onCleaningError: (callback) => {
     ipcRenderer.on('cleaning-error', (event, data) => callback(data));
   },
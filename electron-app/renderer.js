@@ -13,6 +13,7 @@ const elements = {
     skipTrash: document.getElementById('skipTrash'),
     skipMaintenance: document.getElementById('skipMaintenance'),
     findLargeFiles: document.getElementById('findLargeFiles'),
+    resume: document.getElementById('resume'),
     
     // Buttons
     scanBtn: document.getElementById('scanBtn'),
@@ -61,6 +62,10 @@ let consoleOutput = [];
 let totalSpaceFreed = 0;
 let currentDiskUsage = null;
 let lastCleanupResults = '';
+let plannedCategories = [];
+let finishedCategories = 0;
+// Set once the cleaner has estimated the work; progress then comes from its fraction
+let progressEstimated = false;
 let aiReady = false;
 
 // Initialize
@@ -173,9 +178,10 @@ function setupEventListeners() {
 function setupCleaningListeners() {
     window.electronAPI.onCleaningOutput((data) => {
         addConsoleOutput(data, 'info');
-        parseOutput(data);
     });
     
+    window.electronAPI.onCleaningEvent(handleCleaningEvent);
+    
     window.electronAPI.onCleaningError((data) => {
         addConsoleOutput(data, 'error');
     });
@@ -240,16 +246,14 @@ async function startCleaning() {
     elements.progressFill.style.width = '0%';
     elements.spaceFreed.textContent = 'Space freed: 0 B';
     
-    // Start progress animation
-    animateProgress();
-    
     // Get options
     const options = {
         dryRun: elements.dryRun.checked,
         verbose: elements.verbose.checked,
         skipTrash: elements.skipTrash.checked,
         skipMaintenance: elements.skipMaintenance.checked,
-        findLargeFiles: elements.findLargeFiles.checked
+        findLargeFiles: elements.findLargeFiles.checked,
+        resume: elements.resume.checked
     };
     
     try {
@@ -282,54 +286,58 @@ async function stopCleaning() {
         elements.startBtn.disabled = false;
         elements.stopBtn.disabled = true;
         elements.progressStatus.textContent = 'Cleanup stopped';
-        addConsoleOutput('\n⚠️ Cleanup was stopped by user', 'warning');
-    }
-}
-
-// Animate progress bar
-function animateProgress() {
-    if (!isRunning) return;
-    
-    const currentWidth = parseFloat(elements.progressFill.style.width) || 0;
-    if (currentWidth < 90) {
-        elements.progressFill.style.width = `${currentWidth + Math.random() * 5}%`;
+        addConsoleOutput('\n⚠️ Cleanup was stopped by user; start it again with Resume checked to continue', 'warning');
     }
-    
-    setTimeout(animateProgress, 500);
 }
 
-// Parse output for progress updates
-function parseOutput(data) {
-    // Update status based on output
-    if (data.includes('Cleaning System Caches')) {
-        elements.progressStatus.textContent = 'Cleaning system caches...';
-        elements.progressFill.style.width = '20%';
-    } else if (data.includes('Cleaning Browser Data')) {
-        elements.progressStatus.textContent = 'Cleaning browser data...';
-        elements.progressFill.style.width = '40%';
-    } else if (data.includes('Cleaning Temporary Files')) {
-        elements.progressStatus.textContent = 'Cleaning temporary files...';
-        elements.progressFill.style.width = '60%';
-    } else if (data.includes('Cleaning Development Caches')) {
-        elements.progressStatus.textContent = 'Cleaning development caches...';
-        elements.progressFill.style.width = '80%';
-    } else if (data.includes('Running macOS Maintenance')) {
-        elements.progressStatus.textContent = 'Running system maintenance...';
-        elements.progressFill.style.width = '90%';
-    }
-    
-    // Parse freed space
-    const freedMatch = data.match(/Freed:\s*([\d.]+\s*[KMGT]?B)/i);
-    if (freedMatch) {
-        const size = parseSize(freedMatch[1]);
-        totalSpaceFreed += size;
-        elements.spaceFreed.textContent = `Space freed: ${formatSize(totalSpaceFreed)}`;
-    }
-    
-    // Parse total freed
-    const totalMatch = data.match(/Total space freed:\s*([\d.]+\s*[KMGT]?B)/i);
-    if (totalMatch) {
-        elements.spaceFreed.textContent = `Space freed: ${totalMatch[1]}`;
+// Handle a structured event from the cleaner's --json-events stream
+function handleCleaningEvent(event) {
+    switch (event.event) {
+        case 'log':
+            addConsoleOutput(event.message, 'info');
+            break;
+        case 'start':
+            plannedCategories = event.categories;
+            finishedCategories = 0;
+            progressEstimated = false;
+            break;
+        case 'estimate':
+            progressEstimated = true;
+            elements.progressStatus.textContent =
+                `About ${event.files.toLocaleString()} files to go through`;
+            break;
+        case 'category_start':
+            elements.progressStatus.textContent = `Cleaning ${event.category.toLowerCase()}...`;
+            break;
+        case 'category_end':
+            finishedCategories += 1;
+            if (!progressEstimated && plannedCategories.length > 0) {
+                const percent = Math.min(100, finishedCategories / plannedCategories.length * 100);
+                elements.progressFill.style.width = `${percent}%`;
+            }
+            break;
+        case 'directory':
+            totalSpaceFreed += event.freed;
+            elements.spaceFreed.textContent = `Space freed: ${formatSize(totalSpaceFreed)}`;
+            break;
+        case 'progress':
+            if (event.fraction === undefined) {
+                elements.progressStatus.textContent =
+                    `Scanned ${event.files.toLocaleString()} files (${formatSize(event.bytes)})`;
+                break;
+            }
+            elements.progressFill.style.width = `${event.fraction * 100}%`;
+            elements.progressStatus.textContent =
+                `${event.files.toLocaleString()} of about ${event.total_files.toLocaleString()} files` +
+                (event.eta !== null && event.fraction < 1 ? `, about ${formatDuration(event.eta)} left` : '');
+            break;
+        case 'complete':
+            totalSpaceFreed = event.total_freed;
+            elements.spaceFreed.textContent = `Space freed: ${formatSize(totalSpaceFreed)}`;
+            break;
+        case 'error':
+            addConsoleOutput(event.message, 'error');
+            break;
     }
 }
 
@@ -401,6 +409,14 @@ function parseSize(sizeStr) {
     return value * (multipliers[unit] || 1);
 }
 
+// Format seconds the way the cleaner does: 45s, 3m 20s or 1h 05m
+function formatDuration(seconds) {
+    seconds = Math.floor(seconds);
+    if (seconds < 60) return `${seconds}s`;
+    if (seconds < 3600) return `${Math.floor(seconds / 60)}m ${String(seconds % 60).padStart(2, '0')}s`;
+    return `${Math.floor(seconds / 3600)}h ${String(Math.floor(seconds % 3600 / 60)).padStart(2, '0')}m`;
+}
+
 function formatSize(bytes) {
     const units = ['B', 'KB', 'MB', 'GB', 'TB'];
     let size = bytes;
@@ -665,16 +681,14 @@ async function startCleaning() {
     elements.progressFill.style.width = '0%';
     elements.spaceFreed.textContent = 'Space freed: 0 B';
     
-    // Start progress animation
-    animateProgress();
-    
     // Get options
     const options = {
         dryRun: elements.dryRun.checked,
         verbose: elements.verbose.checked,
         skipTrash: elements.skipTrash.checked,
         skipMaintenance: elements.skipMaintenance.checked,
-        findLargeFiles: elements.findLargeFiles.checked
+        findLargeFiles: elements.findLargeFiles.checked,
+        resume: elements.resume.checked
     };
     
     try {
@@ -683,7 +697,7 @@ async function startCleaning() {
             elements.progressStatus.textContent = 'Cleanup complete!';
             elements.progressFill.style.width = '100%';
             addConsoleOutput('\n✅ Cleanup completed successfully!', 'success');
-            lastCleanupResults = result.output; // Store results
+            lastCleanupResults = consoleOutput.map(line => line.text).join('\n'); // Store results
         }
     } catch (error) {
         elements.progressStatus.textContent = 'Cleanup failed';
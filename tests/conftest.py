@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.fspath(Path(__file__).resolve().parent.parent))
+
+from cache_cleaner import MacOSCacheCleaner, RootRegistry, SECONDS_PER_DAY  # noqa: E402
+
+
+def write(path: Path, size: int = 100, age_days: float = 0) -> Path:
+    """Create a file of size bytes, last modified age_days ago"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    if age_days:
+        when = time.time() - age_days * SECONDS_PER_DAY
+        os.utime(path, (when, when))
+    return path
+
+
+@pytest.fixture
+def home(tmp_path: Path) -> Path:
+    home = tmp_path / "home"
+    home.mkdir()
+    return home
+
+
+@pytest.fixture
+def make_cleaner(home: Path):
+    """A cleaner for the given categories only, so tests never touch the real /tmp or ~"""
+    def make(categories, **options) -> MacOSCacheCleaner:
+        options.setdefault('checkpoint_path', None)
+        return MacOSCacheCleaner(roots=RootRegistry([home], categories, []), **options)
+    return make
@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import write
+
+CATEGORIES = {"Development Caches": ["~/.cache"], "Log Files": ["~/Library/Logs"]}
+
+
+def make_tree(home):
+    for i in range(10):
+        write(home / ".cache" / f"app{i}" / "sub" / "old.bin", 100, age_days=30)
+        write(home / ".cache" / f"app{i}" / "new.bin", 100)
+        write(home / "Library" / "Logs" / f"app{i}" / "log.txt", 200)
+
+
+@pytest.mark.parametrize("parallel_categories, jobs", [(1, 1), (2, 1), (2, 4), (8, 3)])
+def test_concurrent_categories_report_what_they_freed(home, make_cleaner,
+                                                      parallel_categories, jobs):
+    make_tree(home)
+    cleaner = make_cleaner(CATEGORIES, parallel_categories=parallel_categories, jobs=jobs)
+    cleaner.clean_categories()
+    assert cleaner.category_freed == {"Development Caches": 1000, "Log Files": 2000}
+    assert cleaner.total_freed == 3000
+    assert not any((home / ".cache" / f"app{i}" / "sub").exists() for i in range(10))
+    assert all((home / ".cache" / f"app{i}" / "new.bin").exists() for i in range(10))
+
@@ -0,0 +1,132 @@
+import json
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from cache_cleaner import CleanerDaemon
+
+from conftest import write
+
+RUN = {"skip_trash": True, "skip_maintenance": True}
+
+
+class Client:
+    def __init__(self, path: Path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(path))
+        self.file = self.sock.makefile('r')
+        self.events = []
+
+    def send(self, line: str):
+        self.sock.sendall(line.encode('utf-8') + b'\n')
+
+    def request(self, method, params=None, request_id=1):
+        self.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                              "params": params or {}}))
+
+    def response(self):
+        while True:
+            message = json.loads(self.file.readline())
+            if message.get("method") != "event":
+                return message
+            self.events.append(message["params"])
+
+    def call(self, method, params=None, request_id=1):
+        self.request(method, params, request_id)
+        return self.response()
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+@pytest.fixture
+def serve(make_cleaner):
+    started = []
+
+    def serve(categories):
+        cleaner = make_cleaner(categories)
+        # Unix socket paths are short, too short for most pytest tmp_paths
+        directory = tempfile.TemporaryDirectory(prefix="cc")
+        daemon = CleanerDaemon(cleaner, Path(directory.name) / "daemon.sock")
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not daemon.path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        started.append((daemon, thread, directory))
+        return daemon, Client(daemon.path)
+
+    yield serve
+    for daemon, thread, directory in started:
+        daemon.stop()
+        thread.join(5)
+        directory.cleanup()
+
+
+def test_scan_then_clean(home, serve):
+    old = write(home / ".cache" / "app" / "old.bin", 100, age_days=30)
+    new = write(home / ".cache" / "app" / "new.bin", 10)
+    _, client = serve({"Development Caches": ["~/.cache"]})
+
+    scan = client.call("scan", RUN)["result"]
+    assert scan["dry_run"] and scan["total_freed"] == 100 and not scan["cancelled"]
+    assert scan["categories"] == {"Development Caches": 100}
+    assert old.exists()
+    assert {"start", "complete"} <= {event["event"] for event in client.events}
+
+    clean = client.call("clean", RUN, request_id=2)
+    assert clean["id"] == 2
+    assert not clean["result"]["dry_run"] and clean["result"]["total_freed"] == 100
+    assert not old.exists() and new.exists()
+    client.close()
+
+
+def test_cancel_stops_the_running_scan(home, serve, monkeypatch):
+    write(home / ".cache" / "app" / "old.bin", 100, age_days=30)
+    daemon, client = serve({"Development Caches": ["~/.cache"]})
+    assert client.call("cancel")["result"] is False
+
+    cleaner, started = daemon.cleaner, threading.Event()
+
+    def clean_categories(*args):
+        started.set()
+        deadline = time.monotonic() + 5
+        while not cleaner.cancel_token.cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cleaner.cancel_token.check()
+
+    monkeypatch.setattr(cleaner, "clean_categories", clean_categories)
+    client.request("scan", RUN, request_id=1)
+    assert started.wait(5)
+    # Served while the scan is still running, so its answer comes first
+    client.request("cancel", request_id=2)
+    assert client.response() == {"jsonrpc": "2.0", "id": 2, "result": True}
+    scan = client.response()
+    assert scan["id"] == 1 and scan["result"]["cancelled"]
+
+    monkeypatch.undo()
+    assert client.call("scan", RUN, request_id=3)["result"]["total_freed"] == 100
+    client.close()
+
+
+@pytest.mark.parametrize("line, code", [
+    ("not json", -32700),
+    ('{"jsonrpc": "2.0", "id": 1', -32700),
+    ('{"jsonrpc": "2.0", "id": 1}', -32600),
+    ('[1, 2]', -32600),
+    ('"scan"', -32600),
+    ('{"jsonrpc": "2.0", "id": 1, "method": "format_disk"}', -32601),
+])
+def test_malformed_requests_get_an_error_and_the_connection_stays_open(serve, line, code):
+    _, client = serve({"Development Caches": ["~/.cache"]})
+    client.send(line)
+    error = client.response()
+    assert error["error"]["code"] == code
+    assert error["id"] == (1 if code == -32601 else None)
+    assert client.call("progress", request_id=2) == {"jsonrpc": "2.0", "id": 2, "result": None}
+    client.close()
@@ -0,0 +1,198 @@
+import json
+import os
+
+import pytest
+
+from cache_cleaner import (CleaningCancelled, DeletionPipeline, DeletionPlan, DirectoryCache,
+                           RootRegistry, scan_directory)
+
+from conftest import write
+
+
+def test_symlinked_root_is_cleaned(tmp_path, make_cleaner):
+    # /tmp, /var/tmp and /var/log are symlinks into /private on macOS
+    real = tmp_path / "private" / "tmp"
+    write(real / "a.txt", 10)
+    write(real / "sub" / "b.txt", 20)
+    (tmp_path / "tmp").symlink_to(real)
+
+    dry = make_cleaner({"Temporary Files": [os.fspath(tmp_path / "tmp")]}, dry_run=True)
+    dry.clean_categories()
+    assert dry.total_freed == 30
+
+    cleaner = make_cleaner({"Temporary Files": [os.fspath(tmp_path / "tmp")]})
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 30
+    assert os.listdir(real) == []
+    assert (tmp_path / "tmp").is_symlink()
+
+
+def test_symlinked_directory_above_the_batch_is_not_followed(tmp_path):
+    victim = tmp_path / "victim"
+    write(victim / "dir" / "old.txt")
+    write(victim / "dir" / "tree" / "f.txt")
+    cache = tmp_path / "cache"
+    write(cache / "mid" / "dir" / "old.txt")
+    files, _ = scan_directory(cache / "mid" / "dir")
+    # An intermediate directory is swapped for a symlink between the scan and the deletion
+    os.rename(cache / "mid", tmp_path / "moved")
+    (cache / "mid").symlink_to(victim)
+
+    errors = []
+    pipeline = DeletionPipeline(on_error=lambda path, e: errors.append(path))
+    pipeline.submit_files("cache", os.fspath(cache / "mid" / "dir"), files)
+    pipeline.submit_tree("cache", os.fspath(cache / "mid" / "dir" / "tree"))
+    pipeline.remove_empty_dirs([os.fspath(cache / "mid" / "dir" / "tree")])
+    pipeline.drain()
+    pipeline.close()
+    assert (victim / "dir" / "old.txt").exists()
+    assert (victim / "dir" / "tree" / "f.txt").exists()
+    assert len(errors) == 3  # refused, not silently skipped
+
+
+def test_directory_cache_refuses_symlinked_components(tmp_path):
+    (tmp_path / "real" / "sub").mkdir(parents=True)
+    (tmp_path / "link").symlink_to(tmp_path / "real")
+    dirs = DirectoryCache()
+    dirs.release(dirs.acquire(os.fspath(tmp_path / "real" / "sub")))
+    with pytest.raises(OSError):
+        dirs.acquire(os.fspath(tmp_path / "link" / "sub"))
+    dirs.clear()
+
+
+def test_other_users_roots_are_not_anchors(tmp_path, home):
+    roots = RootRegistry([home], {"Development Caches": ["~/.cache"], "Temp": ["/tmp"]}, [])
+    assert home / ".cache" in roots.anchors()
+    confined = roots.for_home(home)
+    assert confined.anchors() == [home]
+
+
+def test_directory_cache_opens_each_directory_once(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "c").mkdir()
+    dirs = DirectoryCache()
+    fd = dirs.acquire(os.fspath(tmp_path / "a" / "b"))
+    assert dirs.acquire(os.fspath(tmp_path / "a" / "b")) == fd
+    dirs.release(fd)
+    dirs.release(fd)
+    dirs.release(dirs.acquire(os.fspath(tmp_path / "a" / "c")))
+    assert len(dirs._fds) == len((tmp_path / "a" / "c").parts) + 1
+    (tmp_path / "a" / "d").mkdir()
+    dirs.release(dirs.acquire(os.fspath(tmp_path / "a" / "d"), keep=False))
+    assert os.fspath(tmp_path / "a" / "d") not in dirs._fds
+    # Forgotten while in use: closed only once released
+    fd = dirs.acquire(os.fspath(tmp_path / "a" / "b"))
+    dirs.forget(os.fspath(tmp_path / "a"), below=True)
+    os.fstat(fd)
+    dirs.release(fd)
+    with pytest.raises(OSError):
+        os.fstat(fd)
+    dirs.clear()
+
+
+def test_only_directories_this_run_emptied_are_removed(home, make_cleaner):
+    cache = home / ".cache"
+    write(cache / "app" / "old" / "a.bin", age_days=30)
+    write(cache / "app" / "old" / "deeper" / "b.bin", age_days=30)
+    # Made empty by an application, and in use: a lock or tmp directory
+    (cache / "app" / "_cacache" / "tmp").mkdir(parents=True)
+    (cache / "lock").mkdir()
+
+    cleaner = make_cleaner({"Development Caches": ["~/.cache"]})
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 200
+    assert not (cache / "app" / "old").exists()
+    assert (cache / "app" / "_cacache" / "tmp").is_dir()
+    assert (cache / "lock").is_dir()
+
+
+def test_planned_root_is_never_removed(home, make_cleaner):
+    write(home / ".cache" / "pip" / "wheel.whl", age_days=30)
+    cleaner = make_cleaner({"Development Caches": ["~/.cache"],
+                            "Python Caches": ["~/.cache/pip"]})
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 100
+    assert (home / ".cache" / "pip").is_dir()
+
+
+def test_resume_after_cancel_skips_finished_subtrees(tmp_path, home, make_cleaner):
+    categories = {"Development Caches": ["~/.cache"]}
+    journal = tmp_path / "journal.jsonl"
+    for name in "abc":
+        write(home / ".cache" / name / "old.bin", age_days=30)
+
+    cleaner = make_cleaner(categories, checkpoint_path=journal)
+    cleaner.CHECKPOINT_INTERVAL = 0
+    mark_done = cleaner.journal.mark_done
+
+    def stop_after_first(*paths):
+        mark_done(*paths)
+        if paths:
+            cleaner.cancel()
+
+    cleaner.journal.mark_done = stop_after_first
+    try:
+        cleaner.clean_categories()
+    except CleaningCancelled:
+        pass
+    cleaner.close_journal(cancelled=True)
+    with open(journal) as f:
+        done = [os.path.basename(entry["done"]) for entry in map(json.loads, f)
+                if "done" in entry]
+    assert done and len(done) < 3
+
+    # Put back in a finished subtree: a resumed run doesn't walk it again
+    write(home / ".cache" / done[0] / "old.bin", age_days=30)
+    resumed = make_cleaner(categories, checkpoint_path=journal, resume=True)
+    resumed.clean_categories()
+    resumed.close_journal(cancelled=False)
+    assert (home / ".cache" / done[0] / "old.bin").exists()
+    left = [name for name in "abc" if name not in done]
+    assert all(not (home / ".cache" / name / "old.bin").exists() for name in left)
+    assert not journal.exists()
+
+
+def test_real_run_removes_a_stale_nested_tree_and_keeps_a_fresh_sibling(tmp_path, home,
+                                                                        make_cleaner):
+    app = home / ".cache" / "app"
+    write(app / "stale" / "a" / "b" / "f.bin", age_days=30)
+    write(app / "stale" / "c" / "g.bin", age_days=30)
+    write(app / "stale" / "h.bin", age_days=30)
+    fresh = write(app / "fresh" / "i.bin")
+
+    cleaner = make_cleaner({"Development Caches": ["~/.cache"]},
+                           index_path=tmp_path / "index.sqlite3")
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 300
+    assert not (app / "stale").exists()
+    assert fresh.exists()
+    assert os.listdir(app) == ["fresh"]
+
+
+def test_applied_plan_skips_entries_changed_since_the_dry_run(tmp_path, home, make_cleaner):
+    categories = {"Development Caches": ["~/.cache"]}
+    cache = home / ".cache" / "app"
+    kept = write(cache / "kept.bin", 100, age_days=30)
+    rewritten = write(cache / "rewritten.bin", 200, age_days=30)
+    replaced = write(cache / "sub" / "replaced.bin", 400, age_days=30)
+    gone = write(cache / "sub" / "gone.bin", 800, age_days=30)
+
+    dry = make_cleaner(categories, dry_run=True)
+    dry.deletion_plan = DeletionPlan()
+    dry.clean_categories()
+    plan_path = tmp_path / "cleanup.plan"
+    dry.deletion_plan.save(plan_path)
+
+    with open(rewritten, 'r+b') as f:
+        f.write(b'fresh')
+    replaced.unlink()
+    write(replaced, 400, age_days=30)
+    gone.unlink()
+
+    plan = DeletionPlan.load(plan_path)
+    assert len(plan) == 4 and plan.size == 1500
+    cleaner = make_cleaner(categories)
+    assert cleaner.apply_plan(plan) == 100
+    assert cleaner.category_freed == {"Development Caches": 100}
+    assert not kept.exists()
+    assert rewritten.exists() and replaced.exists()
@@ -0,0 +1,19 @@
+import io
+import json
+import time
+
+from cache_cleaner import EventStream
+
+
+def test_buffered_events_are_written_without_a_later_event():
+    out = io.StringIO()
+    events = EventStream(out, interval=0.05)
+    events.emit("first")
+    events.emit("second")
+    assert [json.loads(line)["event"] for line in out.getvalue().splitlines()] == ["first"]
+
+    # Nothing else is emitted, as during a long drain
+    deadline = time.monotonic() + 2
+    while "second" not in out.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [json.loads(line)["event"] for line in out.getvalue().splitlines()] == ["first", "second"]
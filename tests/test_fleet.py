@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from cache_cleaner import RootRegistry, clean_home
+
+from conftest import write
+
+CATEGORIES = {"Development Caches": ["~/.cache", "~/.npm/_cacache"]}
+
+
+def test_home_root_symlinked_out_of_the_home_is_skipped(tmp_path, home):
+    victim = write(tmp_path / "victim" / "data.db", age_days=30)
+    (home / ".cache").symlink_to(victim.parent)
+    npm = write(home / ".npm" / "_cacache" / "old.bin", age_days=30)
+
+    roots = RootRegistry([home], CATEGORIES, []).for_home(home)
+    report = clean_home(roots, {'checkpoint_path': None})
+    assert report.error is None
+    assert victim.exists()
+    assert not npm.exists()
+    assert report.total_freed == 100
+    assert f"Skipping {victim.parent}" in report.output
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0,
+                    reason="changing a directory's owner needs root")
+def test_home_root_owned_by_another_user_is_skipped(home):
+    kept = write(home / ".cache" / "data.db", age_days=30)
+    os.chown(home / ".cache", os.stat(home).st_uid + 1, -1)
+
+    report = clean_home(RootRegistry([home], CATEGORIES, []).for_home(home),
+                        {'checkpoint_path': None})
+    assert kept.exists()
+    assert report.total_freed == 0
+
+
+def test_unconfined_registry_follows_its_own_symlinks(tmp_path, home):
+    (tmp_path / "elsewhere").mkdir()
+    (home / ".cache").symlink_to(tmp_path / "elsewhere")
+    roots = RootRegistry([home], CATEGORIES, [])
+    assert roots.roots("Development Caches")[0] == tmp_path / "elsewhere"
+    assert tmp_path / "elsewhere" not in roots.for_home(home).roots("Development Caches")
@@ -0,0 +1,91 @@
+import os
+
+from cache_cleaner import ScanIndex
+
+from conftest import write
+
+
+def test_file_rewritten_in_place_after_indexing_is_kept(tmp_path, home, make_cleaner):
+    categories = {"Development Caches": ["~/.cache"]}
+    index_path = tmp_path / "index.sqlite3"
+    db = write(home / ".cache" / "app" / "db" / "cache.sqlite", 1000, age_days=30)
+    write(home / ".cache" / "app" / "db" / "old.bin", 10, age_days=30)
+
+    dry = make_cleaner(categories, dry_run=True, index_path=index_path)
+    dry.clean_categories()
+    assert dry.total_freed == 1010
+    dry.index.close()
+
+    # Rewritten in place: the file's mtime is now, its directory's is unchanged
+    with open(db, 'r+b') as f:
+        f.write(b'fresh')
+
+    cleaner = make_cleaner(categories, index_path=index_path)
+    cleaner.clean_categories()
+    assert db.exists()
+    assert not (home / ".cache" / "app" / "db" / "old.bin").exists()
+    assert cleaner.total_freed == 10
+
+
+def test_changed_directory_is_not_served_until_its_new_row_is_flushed(tmp_path):
+    cache = tmp_path / "cache"
+    write(cache / "a.bin", 10)
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    index.summarize(os.fspath(cache))
+    index.flush()
+    index.trust(cache)
+
+    write(cache / "b.bin", 20)
+    index.invalidate(os.fspath(cache))
+    index.refresh(os.fspath(cache))
+    # Between the listing and the flush the old row must not be served
+    assert index.cached(os.fspath(cache)) is None
+    index.flush()
+    summary, _ = index.cached(os.fspath(cache))
+    assert summary.files == 2
+
+    # A change reported while the directory was being listed outlives the flush
+    index.refresh(os.fspath(cache))
+    write(cache / "c.bin", 30)
+    index.invalidate(os.fspath(cache))
+    index.flush()
+    assert index.cached(os.fspath(cache)) is None
+    index.close()
+
+
+def test_directory_whose_mtime_changed_is_listed_again(tmp_path):
+    cache = tmp_path / "cache"
+    write(cache / "a.bin", 10)
+    # Backdated, so adding an entry below is sure to move the mtime
+    past = os.stat(cache).st_mtime - 60
+    os.utime(cache, (past, past))
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    index.summarize(os.fspath(cache))
+    index.flush()
+    summary, _ = index.cached(os.fspath(cache))
+    assert summary.files == 1
+
+    write(cache / "b.bin", 20)
+    assert index.cached(os.fspath(cache)) is None
+    summary, _ = index.summarize(os.fspath(cache))
+    assert (summary.files, summary.size) == (2, 30)
+    index.close()
+
+
+def test_rebuild_index_discards_every_row(tmp_path, home, make_cleaner):
+    categories = {"Development Caches": ["~/.cache"]}
+    index_path = tmp_path / "index.sqlite3"
+    write(home / ".cache" / "app" / "old.bin", 10, age_days=30)
+    root = os.fspath(home / ".cache")
+
+    dry = make_cleaner(categories, dry_run=True, index_path=index_path)
+    dry.clean_categories()
+    dry.index.close()
+    index = ScanIndex(index_path)
+    assert index.estimate(root) is not None
+    index.close()
+
+    rebuilt = make_cleaner(categories, dry_run=True, index_path=index_path,
+                           rebuild_index=True)
+    assert rebuilt.index.estimate(root) is None
+    rebuilt.index.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from cache_cleaner import MacOSCacheCleaner, RootRegistry
+
+MB = 1024 * 1024
+
+
+def sparse(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_top_k_largest_above_min_size_in_descending_order(tmp_path, home, indexed):
+    downloads = home / "Downloads"
+    sizes = {"a.dmg": 5, "b.zip": 9, "c/d.iso": 3, "c/e/f.mov": 7, "g.tar": 2}
+    for name, mb in sizes.items():
+        sparse(downloads / name, mb * MB)
+    # At the threshold is not above it
+    sparse(downloads / "c" / "exactly.bin", 2 * MB)
+    sparse(downloads / "small.txt", MB // 2)
+
+    cleaner = MacOSCacheCleaner(
+        roots=RootRegistry([home], {}, ["~/Downloads"]), checkpoint_path=None,
+        index_path=tmp_path / "index.sqlite3" if indexed else None)
+    reported = []
+    cleaner.report_large_file = lambda path, size: reported.append(path.name)
+
+    largest = cleaner.scan_large_files(min_size_mb=2, top=3)
+    assert largest == [(downloads / "b.zip", 9 * MB),
+                       (downloads / "c" / "e" / "f.mov", 7 * MB),
+                       (downloads / "a.dmg", 5 * MB)]
+    assert "exactly.bin" not in reported and "small.txt" not in reported
+
+    assert [path.name for path, _ in cleaner.scan_large_files(min_size_mb=6, top=10)] \
+        == ["b.zip", "f.mov"]
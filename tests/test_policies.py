@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+import pytest
+
+from cache_cleaner import SECONDS_PER_DAY, CleaningPolicy, PolicySet
+
+from conftest import write
+
+
+def test_policy_cutoffs_move_forward_each_run(home, make_cleaner):
+    write(home / ".cache" / "old.bin", age_days=10)
+    cleaner = make_cleaner({"Development Caches": ["~/.cache"]}, dry_run=True)
+    # Built 30 days before the run, like a policy in a long-lived daemon
+    built = time.time() - 30 * SECONDS_PER_DAY
+    cleaner.policies = PolicySet(default=CleaningPolicy(now=built))
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 0
+
+    cleaner.start_run(dry_run=True)
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 100
+
+
+def test_restart_keeps_policies_without_an_age_rule():
+    policies = PolicySet({"/cache": CleaningPolicy(max_age=None, quota=1)})
+    policies.restart(1000.0)
+    assert policies.for_root("/cache").cutoff is None
+    assert policies.default.cutoff == 1000.0 - 7 * SECONDS_PER_DAY
+
+
+def test_policy_file_sets_per_root_rules_and_filters(tmp_path, home, make_cleaner):
+    config = tmp_path / "policies.json"
+    config.write_text(json.dumps({
+        "default": {"max_age_days": 14},
+        "policy": [
+            {"path": "~/.cache/pip", "max_age_days": 1,
+             "include": ["*.whl", "*.TAR.GZ"], "exclude": ["keep-*"]},
+            {"path": "~/.cache/big", "max_age_days": 365, "max_file_mb": 0.001},
+        ],
+    }))
+    policies = PolicySet.from_file(config, [home])
+    pip = policies.for_root(home / ".cache" / "pip")
+    assert pip.max_age == SECONDS_PER_DAY
+    assert policies.for_root(home / ".cache" / "other") is policies.default
+    assert policies.default.max_age == 14 * SECONDS_PER_DAY
+    assert pip.matches("numpy.whl") and pip.matches("src.tar.gz")
+    assert not pip.matches("keep-numpy.whl") and not pip.matches("notes.txt")
+
+    cache = home / ".cache"
+    write(cache / "pip" / "numpy.whl", 1, age_days=2)
+    write(cache / "pip" / "src.tar.gz", 2, age_days=2)
+    write(cache / "pip" / "keep-old.whl", 4, age_days=30)
+    write(cache / "pip" / "notes.txt", 8, age_days=30)
+    write(cache / "big" / "huge.bin", 2000)
+    write(cache / "big" / "small.bin", 16)
+    write(cache / "other" / "week.bin", 32, age_days=7)
+    write(cache / "other" / "month.bin", 64, age_days=30)
+
+    cleaner = make_cleaner({"Development Caches": ["~/.cache/pip", "~/.cache/big",
+                                                   "~/.cache/other"]})
+    cleaner.policies = PolicySet.from_file(config, [home])
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 1 + 2 + 2000 + 64
+    assert sorted(os.listdir(cache / "pip")) == ["keep-old.whl", "notes.txt"]
+    assert os.listdir(cache / "big") == ["small.bin"]
+    assert os.listdir(cache / "other") == ["week.bin"]
+
+
+def test_policy_without_a_path_is_rejected(tmp_path):
+    config = tmp_path / "policies.json"
+    config.write_text(json.dumps({"policy": [{"max_age_days": 1}]}))
+    with pytest.raises(ValueError, match="needs a path"):
+        PolicySet.from_file(config, [tmp_path])
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_cache_size_limit_keeps_the_most_recently_used(home, make_cleaner, jobs):
+    cacache = home / ".npm" / "_cacache"
+    now = time.time()
+    files = []
+    for i in range(8):
+        # Newest access last, spread over directories listed in any order
+        path = write(cacache / f"index-v5/{i % 3}/{i}" / "entry", 100)
+        atime = now - (8 - i) * 3600
+        os.utime(path, (atime, now))
+        files.append(path)
+
+    cleaner = make_cleaner({"Development Caches": ["~/.npm/_cacache"]}, jobs=jobs)
+    cleaner.limit_cache_size(300)
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 500
+    assert [path.exists() for path in files] == [False] * 5 + [True] * 3
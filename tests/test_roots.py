@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import write
+
+CATEGORIES = {
+    "System Caches": ["~/Library/Caches", "~/Library/Caches/com.apple.Safari"],
+    "Browser Data": ["~/Library/Caches/com.apple.Safari"],
+}
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_nested_and_repeated_roots_are_counted_once(home, make_cleaner, dry_run):
+    caches = home / "Library" / "Caches"
+    write(caches / "a.bin", 100, age_days=30)
+    write(caches / "com.apple.Safari" / "b.bin", 10, age_days=30)
+    fresh = write(caches / "com.apple.Safari" / "c.bin", 10)
+
+    cleaner = make_cleaner(CATEGORIES, dry_run=dry_run)
+    cleaner.clean_categories()
+    assert cleaner.total_freed == 110
+    assert cleaner.category_freed == {"System Caches": 100, "Browser Data": 10}
+    assert fresh.exists()
+    assert (caches / "a.bin").exists() == dry_run
@@ -0,0 +1,53 @@
+import pytest
+
+from cache_cleaner import SafetyRules
+
+
+@pytest.fixture
+def rules():
+    return SafetyRules(SafetyRules.PROTECTED, ["Keep", "/users/me/.cache/pinned"])
+
+
+@pytest.mark.parametrize("path, safe", [
+    ("/usr", False),
+    ("/usr/lib/libz.dylib", False),
+    ("/USR/Lib", False),
+    ("/library/frameworks/Foo.framework", False),
+    ("/usr2/lib", True),
+    ("/Library/Caches", True),
+    ("/Users/me/.cache/app", True),
+    ("/Users/me/.cache/KEEP/old.bin", False),
+    ("/Users/me/.cache/app/keeper", False),
+    ("/Users/Me/.cache/Pinned/x", False),
+    ("/Users/me/.cache/pin", True),
+])
+def test_protected_prefixes_and_exclusions(rules, path, safe):
+    assert rules.is_safe(path) is safe
+
+
+@pytest.mark.parametrize("root, parts", [
+    ("/", ["usr", "lib"]),
+    ("/", ["Library", "Frameworks"]),
+    ("/", ["Library", "Caches", "app"]),
+    ("/Users/me", [".cache", "Keep", "x"]),
+    ("/Users/me", [".cache", "pinned"]),
+    ("/Users/me", [".cache", "app"]),
+])
+def test_child_state_agrees_with_a_full_check(rules, root, parts):
+    path, state = root.rstrip("/"), rules.state_for(root)
+    for part in parts:
+        path = f"{path}/{part}"
+        if state is not None:
+            state = rules.child_state(state, path)
+        assert (state is not None) == rules.is_safe(path)
+
+
+def test_rules_from_file_extend_the_given_ones(tmp_path):
+    config = tmp_path / "rules.json"
+    config.write_text('{"protected": ["/Volumes/Backup"], "exclude": ["important"]}')
+    rules = SafetyRules.from_file(config, SafetyRules.PROTECTED, ["Keep"])
+    assert not rules.is_safe("/volumes/backup/cache")
+    assert not rules.is_safe("/Users/me/.cache/Important.db")
+    assert not rules.is_safe("/Users/me/.cache/keep")
+    assert not rules.is_safe("/System/Library")
+    assert rules.is_safe("/Volumes/Other/cache")
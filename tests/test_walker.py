@@ -0,0 +1,60 @@
+import os
+import threading
+
+import pytest
+
+from cache_cleaner import TreeWalker
+
+from conftest import write
+
+
+def walk(root, jobs):
+    walker = TreeWalker(jobs)
+    done = []
+    lock = threading.Lock()
+
+    def visit(files, _):
+        if files and os.path.basename(os.path.dirname(files[0].path)) == "broken":
+            raise OSError("vanished while visited")
+        return sum(f.stat.st_size for f in files)
+
+    def on_done(path, _):
+        with lock:
+            done.append(path)
+
+    try:
+        return walker.walk(root, visit, on_done=on_done), done
+    finally:
+        walker.shutdown()
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_walk_totals_and_post_order_match_across_jobs(tmp_path, jobs):
+    for i in range(5):
+        for j in range(3):
+            write(tmp_path / f"d{i}" / f"e{j}" / "f.bin", 10)
+        write(tmp_path / f"d{i}" / "g.bin", 1)
+    write(tmp_path / "d0" / "broken" / "f.bin", 1000)
+
+    total, done = walk(tmp_path, jobs)
+    assert total == 155
+    assert sorted(done) == sorted(p for p, _, _ in os.walk(tmp_path))
+    # Post-order: every directory finishes after everything below it
+    for path in done:
+        below = [p for p in done if p.startswith(path + os.sep)]
+        assert all(done.index(p) < done.index(path) for p in below)
+    assert done[-1] == os.fspath(tmp_path)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_dir_size_matches_the_rglob_sum(tmp_path, home, make_cleaner, jobs):
+    cache = home / "Library" / "Caches"
+    for i in range(6):
+        for j in range(i + 1):
+            write(cache / f"app{i}" / ("deep/" * j) / f"f{j}.bin", 100 * i + j)
+    (cache / "empty").mkdir()
+
+    expected = sum(p.stat().st_size for p in cache.rglob('*') if p.is_file())
+    cleaner = make_cleaner({}, jobs=jobs)
+    assert cleaner.get_dir_size(cache) == expected
+    assert cleaner.walker.count(cache) == sum(1 for p in cache.rglob('*') if p.is_file())